@@ -12,8 +12,8 @@ from loguru import logger
 import math # 导入 math 用于时间戳计算
 import json # <--- 在这里添加导入
 from datetime import timedelta # 导入 timedelta 用于时间戳格式化
-from fastapi import FastAPI, HTTPException, BackgroundTasks
-from fastapi.responses import FileResponse
+from fastapi import FastAPI, HTTPException, BackgroundTasks, Request, Response
+from fastapi.responses import FileResponse, StreamingResponse, JSONResponse
 from fastapi.middleware.cors import CORSMiddleware # 确保导入 CORSMiddleware
 from pydantic import BaseModel
 from typing import List, Optional
@@ -22,7 +22,7 @@ import re  # 添加正则表达式模块
 import urllib.parse  # 添加URL解析模块
 import hashlib  # 添加哈希计算模块
 import shutil  # 添加文件操作模块
-from performance_optimizer import get_performance_optimizer  # 导入性能优化器
+from performance_optimizer import get_performance_optimizer, link_or_copy_file  # 导入性能优化器
 
 # 配置日志记录
 # logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
@@ -74,6 +74,9 @@ class KeyframeRequestParams(BaseModel):
     format: str = "jpg"      # 输出格式：jpg, png
     quality: int = 85        # JPEG质量（1-100）
 
+class StatusBatchParams(BaseModel):
+    ids: List[str] = []      # 要查询的任务ID列表（下载/关键帧/视频合成批量状态接口共用）
+
 # 视频合成相关数据模型
 class Position(BaseModel):
     x: int = 0                        # X坐标
@@ -285,9 +288,9 @@ async def root():
     # return {"message": "Video Transcription API is running. Use POST /generate_text_from_video to transcribe."}
     return {"message": "视频转录 API 正在运行。请使用 POST /generate_text_from_video 进行转录。"}
 
-@app.get("/health")
+@app.api_route("/health", methods=["GET", "HEAD"])
 async def health_check():
-    """健康检查端点"""
+    """健康检查端点（支持 HEAD，仅需状态码的探活请求无需传输响应体）"""
     from datetime import datetime
     
     # 获取资源状态
@@ -660,9 +663,11 @@ async def clear_cache():
     """清空所有缓存"""
     try:
         performance_optimizer.cache_manager.clear_cache()
+        cache_stats = performance_optimizer.cache_manager.get_cache_stats()
         return {
             "status": "success",
             "message": "缓存已清空",
+            "data": cache_stats,
             "timestamp": time.time()
         }
     except Exception as e:
@@ -1680,6 +1685,11 @@ class TaskManager:
 
 
 # FFmpeg命令构建器和执行器
+# 命令注入检测：整条命令中不允许出现 && || ` $；滤镜参数以外不允许出现 ; < > |
+DANGEROUS_COMMAND_RE = re.compile(r'&&|\|\||[`$]')
+SHELL_METACHAR_RE = re.compile(r'[;<>|]')
+SHELL_METACHAR_NAMES = {';': '分号', '<': '重定向', '>': '重定向', '|': '管道'}
+
 class FFmpegCommandBuilder:
     """FFmpeg命令构建器基类"""
     
@@ -1743,64 +1753,25 @@ class FFmpegCommandBuilder:
     def validate_command(self, cmd: List[str]) -> bool:
         """验证命令的安全性"""
         # 检查危险的命令注入，但排除FFmpeg滤镜中的合法使用
-        dangerous_patterns = ['&&', '||', '`', '$']
-        cmd_str = ' '.join(cmd)
-        
-        for pattern in dangerous_patterns:
-            if pattern in cmd_str:
-                logger.warning(f"检测到潜在危险的命令模式: {pattern}")
-                return False
-        
-        # 检查分号，但排除FFmpeg滤镜中的使用
-        if ';' in cmd_str:
-            # 检查是否在滤镜上下文中
-            filter_context = False
-            for i, arg in enumerate(cmd):
-                if arg == '-filter_complex':
-                    filter_context = True
-                elif filter_context and not arg.startswith('-'):
-                    # 这是滤镜参数，允许包含分号
-                    continue
-                elif arg.startswith('-'):
-                    filter_context = False
-                
-                if not filter_context and ';' in arg:
-                    logger.warning(f"检测到潜在危险的分号: {arg}")
-                    return False
-        
-        # 检查重定向符号，但排除FFmpeg滤镜中的使用
-        if '>' in cmd_str or '<' in cmd_str:
-            # 检查是否在滤镜上下文中
-            filter_context = False
-            for i, arg in enumerate(cmd):
-                if arg == '-filter_complex':
-                    filter_context = True
-                elif filter_context and not arg.startswith('-'):
-                    # 这是滤镜参数，允许包含 > 和 <
-                    continue
-                elif arg.startswith('-'):
-                    filter_context = False
-                
-                if not filter_context and ('>' in arg or '<' in arg):
-                    logger.warning(f"检测到潜在危险的重定向: {arg}")
-                    return False
+        match = DANGEROUS_COMMAND_RE.search(' '.join(cmd))
+        if match:
+            logger.warning(f"检测到潜在危险的命令模式: {match.group()}")
+            return False
         
-        # 检查管道符号，但排除FFmpeg滤镜中的使用
-        if '|' in cmd_str:
-            # 检查是否在滤镜上下文中
+        # 一次遍历检查分号、重定向和管道符号，-filter_complex 之后的滤镜参数允许包含这些字符
+        filter_context = False
+        for arg in cmd:
+            if arg == '-filter_complex':
+                filter_context = True
+                continue
+            if filter_context and not arg.startswith('-'):
+                continue
             filter_context = False
-            for i, arg in enumerate(cmd):
-                if arg == '-filter_complex':
-                    filter_context = True
-                elif filter_context and not arg.startswith('-'):
-                    # 这是滤镜参数，允许包含 |
-                    continue
-                elif arg.startswith('-'):
-                    filter_context = False
-                
-                if not filter_context and '|' in arg:
-                    logger.warning(f"检测到潜在危险的管道: {arg}")
-                    return False
+            
+            match = SHELL_METACHAR_RE.search(arg)
+            if match:
+                logger.warning(f"检测到潜在危险的{SHELL_METACHAR_NAMES[match.group()]}: {arg}")
+                return False
         
         # 检查输入文件是否存在
         for input_entry in self.inputs:
@@ -6191,48 +6162,69 @@ def check_video_file_size_limit(video_metadata, quality="best"):
     
     return estimated_size_mb
 
+# 视频元数据缓存：同一URL在有效期内只调用一次 yt-dlp --dump-json
+# （下载任务会先取元数据再取可用格式，同一视频也常被多个任务重复提交）
+VIDEO_METADATA_CACHE_TTL = 600  # 秒
+VIDEO_METADATA_CACHE_MAX_ITEMS = 256
+video_metadata_cache = {}  # video_url -> (缓存时间, 元数据)
+
+async def fetch_video_metadata(video_url: str, timeout: int = 180) -> dict:
+    """获取视频元数据（带缓存），失败时抛出 subprocess.CalledProcessError"""
+    cached = video_metadata_cache.get(video_url)
+    if cached and time.time() - cached[0] < VIDEO_METADATA_CACHE_TTL:
+        return cached[1]
+    
+    get_meta_cmd = [
+        'yt-dlp',
+        '-v',
+        '--dump-json',
+        '--no-playlist',
+        video_url
+    ]
+    
+    process = await asyncio.create_subprocess_exec(
+        *get_meta_cmd,
+        stdout=asyncio.subprocess.PIPE,
+        stderr=asyncio.subprocess.PIPE
+    )
+    stdout, stderr = await asyncio.wait_for(process.communicate(), timeout=timeout)
+    
+    if process.returncode != 0:
+        raise subprocess.CalledProcessError(process.returncode, get_meta_cmd, stderr.decode())
+    
+    video_metadata = json.loads(stdout.decode())
+    
+    # 超出容量时淘汰最早写入的条目（dict保持插入顺序）
+    video_metadata_cache.pop(video_url, None)
+    while len(video_metadata_cache) >= VIDEO_METADATA_CACHE_MAX_ITEMS:
+        video_metadata_cache.pop(next(iter(video_metadata_cache)))
+    video_metadata_cache[video_url] = (time.time(), video_metadata)
+    return video_metadata
+
 async def get_available_formats(video_url: str):
     """获取视频的可用格式信息"""
     try:
-        cmd = [
-            'yt-dlp',
-            '--dump-json',
-            '--no-playlist',
-            video_url
-        ]
-        
-        process = await asyncio.create_subprocess_exec(
-            *cmd,
-            stdout=asyncio.subprocess.PIPE,
-            stderr=asyncio.subprocess.PIPE
-        )
-        stdout, stderr = await asyncio.wait_for(process.communicate(), timeout=60)
+        metadata = await fetch_video_metadata(video_url, timeout=60)
+        formats = metadata.get('formats', [])
+        
+        # 整理格式信息
+        video_formats = []
+        for fmt in formats:
+            if fmt.get('vcodec') != 'none':  # 只要视频格式
+                video_formats.append({
+                    'format_id': fmt.get('format_id'),
+                    'ext': fmt.get('ext'),
+                    'height': fmt.get('height'),
+                    'width': fmt.get('width'),
+                    'filesize': fmt.get('filesize'),
+                    'tbr': fmt.get('tbr'),  # 总比特率
+                    'vbr': fmt.get('vbr'),  # 视频比特率
+                    'format_note': fmt.get('format_note', ''),
+                    'quality': fmt.get('quality', 0)
+                })
         
-        if process.returncode == 0:
-            metadata = json.loads(stdout.decode())
-            formats = metadata.get('formats', [])
-            
-            # 整理格式信息
-            video_formats = []
-            for fmt in formats:
-                if fmt.get('vcodec') != 'none':  # 只要视频格式
-                    video_formats.append({
-                        'format_id': fmt.get('format_id'),
-                        'ext': fmt.get('ext'),
-                        'height': fmt.get('height'),
-                        'width': fmt.get('width'),
-                        'filesize': fmt.get('filesize'),
-                        'tbr': fmt.get('tbr'),  # 总比特率
-                        'vbr': fmt.get('vbr'),  # 视频比特率
-                        'format_note': fmt.get('format_note', ''),
-                        'quality': fmt.get('quality', 0)
-                    })
-            
-            return video_formats
-        else:
-            logger.error(f"获取格式信息失败: {stderr.decode()}")
-            return []
-            
+        return video_formats
+    
     except Exception as e:
         logger.error(f"获取格式信息异常: {e}")
         return []
@@ -6328,25 +6320,7 @@ async def extract_keyframes_async(video_url: str, task_id: str, method: str = "i
         status.progress = 10
         
         # 获取视频元数据
-        get_meta_cmd = [
-            'yt-dlp',
-            '-v',
-            '--dump-json',
-            '--no-playlist',
-            video_url
-        ]
-        
-        process = await asyncio.create_subprocess_exec(
-            *get_meta_cmd,
-            stdout=asyncio.subprocess.PIPE,
-            stderr=asyncio.subprocess.PIPE
-        )
-        stdout, stderr = await asyncio.wait_for(process.communicate(), timeout=180)
-        
-        if process.returncode != 0:
-            raise subprocess.CalledProcessError(process.returncode, get_meta_cmd, stderr.decode())
-            
-        video_metadata = json.loads(stdout.decode())
+        video_metadata = await fetch_video_metadata(video_url)
         
         # 检查视频时长
         video_duration = check_video_duration_limit(video_metadata)
@@ -6730,49 +6704,11 @@ async def download_video_async(video_url: str, task_id: str, quality: str = "bes
             'operation': 'download'
         }
         
-        cached_video = performance_optimizer.cache_manager.get_processed_video_cache(
-            video_url, processing_params
-        )
-        
-        if cached_video and os.path.exists(cached_video):
-            logger.info(f"任务 {task_id} 命中下载缓存: {cached_video}")
-            
-            # 复制缓存文件到输出目录
-            video_id = hashlib.md5(video_url.encode()).hexdigest()[:8]
-            output_filename = os.path.join(DOWNLOAD_DIR, f"{video_id}_{quality}.{format}")
-            shutil.copy2(cached_video, output_filename)
-            
-            status.status = "completed"
-            status.progress = 100
-            status.message = "下载完成 (使用缓存)"
-            status.output_file = output_filename
-            status.end_time = time.time()
-            
-            return output_filename
-        
         status.message = "获取视频信息..."
         status.progress = 10
         
         # 获取视频元数据
-        get_meta_cmd = [
-            'yt-dlp',
-            '-v',
-            '--dump-json',
-            '--no-playlist',
-            video_url
-        ]
-        
-        process = await asyncio.create_subprocess_exec(
-            *get_meta_cmd,
-            stdout=asyncio.subprocess.PIPE,
-            stderr=asyncio.subprocess.PIPE
-        )
-        stdout, stderr = await asyncio.wait_for(process.communicate(), timeout=180)
-        
-        if process.returncode != 0:
-            raise subprocess.CalledProcessError(process.returncode, get_meta_cmd, stderr.decode())
-            
-        video_metadata = json.loads(stdout.decode())
+        video_metadata = await fetch_video_metadata(video_url)
         
         # 检查视频时长和文件大小
         video_duration = check_video_duration_limit(video_metadata)
@@ -6781,6 +6717,37 @@ async def download_video_async(video_url: str, task_id: str, quality: str = "bes
         video_id = video_metadata.get('id', '')
         video_title = video_metadata.get('title', 'unknown')
         
+        # 检查下载缓存：按 (视频ID, 质量, 格式) 寻址，同一视频的不同URL写法也能命中
+        cache_source = f"{video_metadata.get('extractor_key', '')}:{video_id}"
+        cache_item = performance_optimizer.cache_manager.get_processed_video_cache_item(
+            cache_source, processing_params
+        )
+        
+        if cache_item and cache_item.get('metadata'):
+            cached_video = cache_item['video_file']
+            logger.info(f"任务 {task_id} 命中下载缓存: {cached_video}")
+            
+            # 将缓存文件链接到输出目录（跨文件系统时回退为复制）
+            output_filename = os.path.join(
+                DOWNLOAD_DIR, f"{video_id}_{quality}{os.path.splitext(cached_video)[1]}"
+            )
+            link_or_copy_file(cached_video, output_filename)
+            
+            status.file_path = output_filename
+            status.file_size = os.path.getsize(output_filename)
+            status.status = "completed"
+            status.progress = 100
+            status.message = "下载完成 (使用缓存)"
+            status.result = {
+                **cache_item['metadata'],
+                "video_url": video_url,
+                "file_path": status.file_path,
+                "file_size": status.file_size,
+                "cache_hit": True
+            }
+            
+            return output_filename
+        
         # 获取可用格式信息
         status.message = "分析可用视频格式..."
         status.progress = 15
@@ -6924,7 +6891,8 @@ async def download_video_async(video_url: str, task_id: str, quality: str = "bes
             "view_count": video_metadata.get('view_count', 0),
             "comment_count": video_metadata.get('comment_count', 0),
             "tags": video_metadata.get('tags', []),
-            "timestamp": video_metadata.get('timestamp', 0)
+            "timestamp": video_metadata.get('timestamp', 0),
+            "cache_hit": False
         }
         
         logger.info(f"下载任务 {task_id} 完成，文件大小: {status.file_size / 1024 / 1024:.1f}MB")
@@ -6933,7 +6901,7 @@ async def download_video_async(video_url: str, task_id: str, quality: str = "bes
         if status.file_path and os.path.exists(status.file_path):
             try:
                 performance_optimizer.cache_manager.set_processed_video_cache(
-                    video_url, processing_params, status.file_path
+                    cache_source, processing_params, status.file_path, metadata=status.result
                 )
                 logger.debug(f"任务 {task_id} 已保存到下载缓存")
             except Exception as cache_error:
@@ -6953,26 +6921,7 @@ async def process_video_async(video_url: str, task_id: str):
         status.progress = 10
         
         # 获取视频元数据
-        get_meta_cmd = [
-            'yt-dlp',
-            '-v',
-            '--dump-json',
-            '--no-playlist',
-            video_url
-        ]
-        
-        # 使用异步subprocess，增加元数据获取超时
-        process = await asyncio.create_subprocess_exec(
-            *get_meta_cmd,
-            stdout=asyncio.subprocess.PIPE,
-            stderr=asyncio.subprocess.PIPE
-        )
-        stdout, stderr = await asyncio.wait_for(process.communicate(), timeout=180)  # 增加到3分钟
-        
-        if process.returncode != 0:
-            raise subprocess.CalledProcessError(process.returncode, get_meta_cmd, stderr.decode())
-            
-        video_metadata = json.loads(stdout.decode())
+        video_metadata = await fetch_video_metadata(video_url)
         
         # 检查视频时长
         video_duration = check_video_duration_limit(video_metadata)
@@ -7294,6 +7243,61 @@ async def get_task_result(task_id: str):
         "result": result
     }
 
+# === 任务状态查询通用工具 ===
+
+# 批量状态接口单次最多查询的任务数
+MAX_BATCH_STATUS_IDS = 100
+
+def batch_status_response(ids: List[str], status_dict: dict, builder) -> dict:
+    """批量构建任务状态响应 {task_id: builder(task_id, status)}，不存在的任务为None"""
+    if len(ids) > MAX_BATCH_STATUS_IDS:
+        raise HTTPException(status_code=400, detail=f"单次最多查询{MAX_BATCH_STATUS_IDS}个任务")
+    
+    return {
+        task_id: builder(task_id, status_dict[task_id]) if task_id in status_dict else None
+        for task_id in ids
+    }
+
+# SSE状态推送的检查间隔，以及长时间无变化时发送保活注释的间隔（秒）
+SSE_POLL_INTERVAL = 0.5
+SSE_KEEPALIVE_INTERVAL = 15
+
+def sse_status_stream(status_dict: dict, task_id: str, snapshot_fn, build_fn) -> StreamingResponse:
+    """
+    以Server-Sent Events推送任务状态变化，任务结束或被清理后关闭连接
+    
+    snapshot_fn(status) 返回用于判断状态是否变化的元组，只在变化时推送 build_fn(task_id, status)；
+    长时间没有变化（如获取视频元数据）时定期发送保活注释，避免代理或客户端读超时断开连接。
+    """
+    async def event_generator():
+        last_snapshot = None
+        last_sent = time.monotonic()
+        while True:
+            status = status_dict.get(task_id)
+            if status is None:
+                break
+            
+            snapshot = snapshot_fn(status)
+            if snapshot != last_snapshot:
+                last_snapshot = snapshot
+                payload = build_fn(task_id, status)
+                yield f"data: {json.dumps(payload, ensure_ascii=False)}\n\n"
+                last_sent = time.monotonic()
+            elif time.monotonic() - last_sent >= SSE_KEEPALIVE_INTERVAL:
+                yield ": keepalive\n\n"
+                last_sent = time.monotonic()
+            
+            if status.status in ("completed", "failed"):
+                break
+            
+            await asyncio.sleep(SSE_POLL_INTERVAL)
+    
+    return StreamingResponse(
+        event_generator(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache"}
+    )
+
 # === 视频下载相关API端点 ===
 
 @app.post("/download_video")
@@ -7353,14 +7357,8 @@ async def download_video(request: DownloadRequestParams, background_tasks: Backg
         "format": request.format
     }
 
-@app.get("/download_status/{task_id}")
-async def get_download_status(task_id: str):
-    """获取下载任务状态（轻量级，不包含完整结果）"""
-    if task_id not in download_status:
-        raise HTTPException(status_code=404, detail="下载任务不存在")
-    
-    status = download_status[task_id]
-    
+def build_download_status_response(task_id: str, status: DownloadStatus) -> dict:
+    """构建下载任务状态响应"""
     response = {
         "task_id": task_id,
         "status": status.status,
@@ -7385,9 +7383,34 @@ async def get_download_status(task_id: str):
     
     return response
 
-@app.get("/download_result/{task_id}")
-async def get_download_result(task_id: str):
-    """获取下载任务完整结果"""
+@app.get("/download_status/{task_id}")
+async def get_download_status(task_id: str):
+    """获取下载任务状态（轻量级，不包含完整结果）"""
+    if task_id not in download_status:
+        raise HTTPException(status_code=404, detail="下载任务不存在")
+    
+    return build_download_status_response(task_id, download_status[task_id])
+
+@app.post("/download_status_batch")
+async def get_download_status_batch(request: StatusBatchParams):
+    """批量获取下载任务状态，不存在的任务返回null"""
+    return batch_status_response(request.ids, download_status, build_download_status_response)
+
+@app.get("/download_status/{task_id}/stream")
+async def stream_download_status(task_id: str):
+    """以Server-Sent Events推送下载任务状态变化，任务结束后关闭连接"""
+    if task_id not in download_status:
+        raise HTTPException(status_code=404, detail="下载任务不存在")
+    
+    # 只在状态、进度或已下载大小变化时推送，避免重复事件
+    return sse_status_stream(
+        download_status, task_id,
+        lambda status: (status.status, status.progress, status.message, status.downloaded_size),
+        build_download_status_response
+    )
+
+def get_completed_download_result(task_id: str) -> dict:
+    """返回已完成下载任务的结果字典，任务不存在、未完成或无结果时抛出 HTTPException"""
     if task_id not in download_status:
         raise HTTPException(status_code=404, detail="下载任务不存在或已过期")
     
@@ -7399,7 +7422,41 @@ async def get_download_result(task_id: str):
     if not status.result:
         raise HTTPException(status_code=404, detail="下载结果不存在")
     
-    result = status.result.copy()
+    return status.result
+
+# HEAD /download_result 返回的摘要响应头 -> 结果字段
+DOWNLOAD_RESULT_SUMMARY_HEADERS = {
+    "X-File-Path": "file_path",
+    "X-File-Size": "file_size",
+    "X-Title": "title",
+    "X-Requested-Quality": "requested_quality",
+    "X-Requested-Format": "requested_format",
+    "X-Actual-Resolution": "actual_resolution",
+    "X-Actual-Format": "actual_format",
+    "X-Format-Id": "format_id",
+}
+
+@app.head("/download_result/{task_id}")
+async def head_download_result(task_id: str):
+    """
+    以响应头返回下载结果摘要，不返回响应体，也不清理任务状态
+    
+    文本字段按UTF-8百分号编码（标题等可能包含非ASCII字符）；需要完整结果时再调用 GET。
+    """
+    result = get_completed_download_result(task_id)
+    
+    headers = {}
+    for header, field in DOWNLOAD_RESULT_SUMMARY_HEADERS.items():
+        value = result.get(field)
+        headers[header] = urllib.parse.quote("" if value is None else str(value), safe="/:")
+    headers["X-Cache"] = "HIT" if result.get("cache_hit") else "MISS"
+    return Response(headers=headers)
+
+@app.get("/download_result/{task_id}")
+async def get_download_result(task_id: str, response: Response):
+    """获取下载任务完整结果（X-Cache 响应头标明是否命中下载缓存）"""
+    result = get_completed_download_result(task_id).copy()
+    response.headers["X-Cache"] = "HIT" if result.get("cache_hit") else "MISS"
     
     # 获取结果后清理任务状态
     del download_status[task_id]
@@ -7519,14 +7576,8 @@ async def extract_keyframes(request: KeyframeRequestParams, background_tasks: Ba
         }
     }
 
-@app.get("/keyframe_status/{task_id}")
-async def get_keyframe_status(task_id: str):
-    """获取关键帧提取任务状态（轻量级，不包含完整结果）"""
-    if task_id not in keyframe_status:
-        raise HTTPException(status_code=404, detail="关键帧提取任务不存在")
-    
-    status = keyframe_status[task_id]
-    
+def build_keyframe_status_response(task_id: str, status: KeyframeStatus) -> dict:
+    """构建关键帧提取任务状态响应"""
     response = {
         "task_id": task_id,
         "status": status.status,
@@ -7550,6 +7601,25 @@ async def get_keyframe_status(task_id: str):
     
     return response
 
+@app.get("/keyframe_status/{task_id}")
+async def get_keyframe_status(task_id: str, request: Request):
+    """获取关键帧提取任务状态（轻量级，不包含完整结果）；支持ETag，状态未变化时返回304"""
+    if task_id not in keyframe_status:
+        raise HTTPException(status_code=404, detail="关键帧提取任务不存在")
+    
+    response = build_keyframe_status_response(task_id, keyframe_status[task_id])
+    
+    etag = '"' + hashlib.md5(json.dumps(response, sort_keys=True, default=str).encode()).hexdigest() + '"'
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers={"ETag": etag})
+    
+    return JSONResponse(content=response, headers={"ETag": etag})
+
+@app.post("/keyframe_status_batch")
+async def get_keyframe_status_batch(request: StatusBatchParams):
+    """批量获取关键帧提取任务状态，不存在的任务返回null"""
+    return batch_status_response(request.ids, keyframe_status, build_keyframe_status_response)
+
 @app.get("/keyframe_result/{task_id}")
 async def get_keyframe_result(task_id: str):
     """获取关键帧提取任务完整结果"""
@@ -7944,14 +8014,8 @@ def cleanup_temp_files(temp_files: List[str]):
         except Exception as e:
             logger.warning(f"清理临时文件失败 {temp_file}: {str(e)}")
 
-@app.get("/composition_status/{task_id}")
-async def get_composition_status(task_id: str):
-    """获取视频合成任务状态"""
-    if task_id not in composition_status:
-        raise HTTPException(status_code=404, detail="视频合成任务不存在")
-    
-    status = composition_status[task_id]
-    
+def build_composition_status_response(task_id: str, status: CompositionStatus) -> dict:
+    """构建视频合成任务状态响应"""
     response = {
         "task_id": task_id,
         "status": status.status,
@@ -7982,6 +8046,32 @@ async def get_composition_status(task_id: str):
     
     return response
 
+@app.get("/composition_status/{task_id}")
+async def get_composition_status(task_id: str):
+    """获取视频合成任务状态"""
+    if task_id not in composition_status:
+        raise HTTPException(status_code=404, detail="视频合成任务不存在")
+    
+    return build_composition_status_response(task_id, composition_status[task_id])
+
+@app.post("/composition_status_batch")
+async def get_composition_status_batch(request: StatusBatchParams):
+    """批量获取视频合成任务状态，不存在的任务返回null"""
+    return batch_status_response(request.ids, composition_status, build_composition_status_response)
+
+@app.get("/composition_status/{task_id}/stream")
+async def stream_composition_status(task_id: str):
+    """以Server-Sent Events推送视频合成任务状态变化，任务结束后关闭连接"""
+    if task_id not in composition_status:
+        raise HTTPException(status_code=404, detail="视频合成任务不存在")
+    
+    # 只在状态、进度或阶段变化时推送，避免重复事件
+    return sse_status_stream(
+        composition_status, task_id,
+        lambda status: (status.status, status.progress, status.message, status.current_stage),
+        build_composition_status_response
+    )
+
 @app.get("/composition_result/{task_id}")
 async def get_composition_result(task_id: str):
     """获取视频合成任务完整结果"""
@@ -14,12 +14,28 @@ import psutil
 import gc
 from typing import Dict, Any, Optional, List, Tuple
 from pathlib import Path
-from collections import OrderedDict
+from collections import OrderedDict, defaultdict
 from datetime import datetime, timedelta
 import threading
 import tempfile
 from loguru import logger
 
+def link_or_copy_file(src: str, dst: str):
+    """将 src 放到 dst：优先硬链接（不复制数据），跨文件系统时回退为复制；通过临时文件原子替换 dst"""
+    if os.path.exists(dst) and os.path.samefile(src, dst):
+        return
+    tmp_path = f"{dst}.{os.getpid()}.{threading.get_ident()}.tmp"
+    try:
+        os.link(src, tmp_path)
+    except OSError:
+        shutil.copy2(src, tmp_path)
+    try:
+        os.replace(tmp_path, dst)
+    finally:
+        # 并发写入时 tmp 与 dst 可能已是同一文件，此时 rename 不会移除 tmp
+        if os.path.lexists(tmp_path):
+            os.unlink(tmp_path)
+
 class CacheManager:
     """视频预处理缓存管理器"""
     
@@ -42,6 +58,16 @@ class CacheManager:
         self.cache_index = self._load_cache_index()
         self.lock = threading.RLock()
         
+        # 增量维护的缓存统计（随索引增删更新，避免每次统计都遍历缓存目录）
+        self._stats = {
+            'total_items': 0,
+            'total_size_bytes': 0,
+            'by_type': defaultdict(lambda: {'count': 0, 'size': 0})
+        }
+        self._stats_snapshot: Optional[Dict[str, Any]] = None
+        for item in self.cache_index.values():
+            self._track_item(item, 1)
+        
         logger.info(f"缓存管理器初始化完成，缓存目录: {self.cache_dir}, 最大大小: {max_cache_size_gb}GB")
     
     def _load_cache_index(self) -> OrderedDict:
@@ -112,7 +138,7 @@ class CacheManager:
                 self._remove_cache_item(oldest_key, oldest_item)
                 
                 # 从索引中移除
-                del self.cache_index[oldest_key]
+                self._index_pop(oldest_key)
                 
                 current_size = self._get_cache_size()
                 logger.info(f"清理缓存项: {oldest_key}, 当前缓存大小: {current_size / 1024 / 1024:.1f}MB")
@@ -128,7 +154,7 @@ class CacheManager:
             for key in expired_keys:
                 item = self.cache_index[key]
                 self._remove_cache_item(key, item)
-                del self.cache_index[key]
+                self._index_pop(key)
                 logger.info(f"清理过期缓存项: {key}")
             
             self._save_cache_index()
@@ -153,14 +179,33 @@ class CacheManager:
         except Exception as e:
             logger.error(f"删除缓存项文件失败: {e}")
     
+    def _track_item(self, item: Dict[str, Any], delta: int):
+        """更新缓存统计计数（delta 为 1 表示新增，-1 表示移除）"""
+        size = item.get('size', 0) * delta
+        self._stats['total_items'] += delta
+        self._stats['total_size_bytes'] += size
+        type_stats = self._stats['by_type'][item.get('type', 'unknown')]
+        type_stats['count'] += delta
+        type_stats['size'] += size
+        self._stats_snapshot = None
+    
+    def _index_set(self, key: str, item: Dict[str, Any]):
+        """写入缓存索引项并同步统计（覆盖已有项时先扣除旧项）"""
+        old_item = self.cache_index.get(key)
+        if old_item is not None:
+            self._track_item(old_item, -1)
+        self.cache_index[key] = item
+        self._track_item(item, 1)
+    
+    def _index_pop(self, key: str) -> Dict[str, Any]:
+        """从缓存索引中移除项并同步统计"""
+        item = self.cache_index.pop(key)
+        self._track_item(item, -1)
+        return item
+    
     def _get_cache_size(self) -> int:
-        """获取缓存总大小"""
-        total_size = 0
-        for cache_subdir in [self.metadata_cache_dir, self.video_cache_dir, self.thumbnail_cache_dir]:
-            for file_path in cache_subdir.rglob('*'):
-                if file_path.is_file():
-                    total_size += file_path.stat().st_size
-        return total_size
+        """获取缓存总大小（按索引中记录的文件大小增量统计）"""
+        return self._stats['total_size_bytes']
     
     def get_video_metadata_cache(self, video_path: str) -> Optional[Dict[str, Any]]:
         """获取视频元数据缓存"""
@@ -202,14 +247,14 @@ class CacheManager:
             
             with self.lock:
                 # 更新缓存索引
-                self.cache_index[file_hash] = {
+                self._index_set(file_hash, {
                     'type': 'metadata',
                     'original_path': video_path,
                     'metadata_file': str(metadata_file),
                     'created_time': time.time(),
                     'last_access': time.time(),
                     'size': metadata_file.stat().st_size
-                }
+                })
                 
                 # 移到末尾（最近访问）
                 self.cache_index.move_to_end(file_hash)
@@ -222,11 +267,17 @@ class CacheManager:
         except Exception as e:
             logger.error(f"设置元数据缓存失败: {e}")
     
-    def get_processed_video_cache(self, video_path: str, processing_params: Dict[str, Any]) -> Optional[str]:
-        """获取预处理视频缓存"""
+    def _get_source_hash(self, video_path: str) -> str:
+        """计算缓存源标识：本地文件按内容哈希，URL等非文件标识按字符串哈希"""
+        if os.path.isfile(video_path):
+            return self._get_file_hash(video_path)
+        return hashlib.md5(video_path.encode()).hexdigest()
+    
+    def get_processed_video_cache_item(self, video_path: str, processing_params: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """获取预处理视频缓存项（包含缓存文件路径和写入时附带的元数据）"""
         try:
             # 生成包含处理参数的缓存键
-            file_hash = self._get_file_hash(video_path)
+            file_hash = self._get_source_hash(video_path)
             params_hash = hashlib.md5(json.dumps(processing_params, sort_keys=True).encode()).hexdigest()
             cache_key = f"{file_hash}_{params_hash}"
             
@@ -241,7 +292,7 @@ class CacheManager:
                         self.cache_index.move_to_end(cache_key)
                         
                         logger.debug(f"命中预处理视频缓存: {video_path}")
-                        return str(video_file)
+                        return dict(cache_item)
             
             return None
             
@@ -249,28 +300,36 @@ class CacheManager:
             logger.error(f"获取预处理视频缓存失败: {e}")
             return None
     
-    def set_processed_video_cache(self, video_path: str, processing_params: Dict[str, Any], processed_video_path: str):
-        """设置预处理视频缓存"""
+    def get_processed_video_cache(self, video_path: str, processing_params: Dict[str, Any]) -> Optional[str]:
+        """获取预处理视频缓存"""
+        cache_item = self.get_processed_video_cache_item(video_path, processing_params)
+        return cache_item['video_file'] if cache_item else None
+    
+    def set_processed_video_cache(self, video_path: str, processing_params: Dict[str, Any], processed_video_path: str,
+                                  metadata: Optional[Dict[str, Any]] = None):
+        """设置预处理视频缓存，metadata 会随缓存项一起保存并在命中时返回"""
         try:
-            file_hash = self._get_file_hash(video_path)
+            file_hash = self._get_source_hash(video_path)
             params_hash = hashlib.md5(json.dumps(processing_params, sort_keys=True).encode()).hexdigest()
             cache_key = f"{file_hash}_{params_hash}"
             
-            # 复制处理后的视频到缓存目录
-            cached_video_file = self.video_cache_dir / f"{cache_key}.mp4"
-            shutil.copy2(processed_video_path, cached_video_file)
+            # 将处理后的视频放入缓存目录（同一文件系统上用硬链接，避免再写一份数据）
+            suffix = Path(processed_video_path).suffix or '.mp4'
+            cached_video_file = self.video_cache_dir / f"{cache_key}{suffix}"
+            link_or_copy_file(processed_video_path, str(cached_video_file))
             
             with self.lock:
                 # 更新缓存索引
-                self.cache_index[cache_key] = {
+                self._index_set(cache_key, {
                     'type': 'processed_video',
                     'original_path': video_path,
                     'processing_params': processing_params,
                     'video_file': str(cached_video_file),
+                    'metadata': metadata,
                     'created_time': time.time(),
                     'last_access': time.time(),
                     'size': cached_video_file.stat().st_size
-                }
+                })
                 
                 self.cache_index.move_to_end(cache_key)
                 self._save_cache_index()
@@ -282,29 +341,43 @@ class CacheManager:
             logger.error(f"设置预处理视频缓存失败: {e}")
     
     def get_cache_stats(self) -> Dict[str, Any]:
-        """获取缓存统计信息"""
+        """获取缓存统计信息
+        
+        统计由增量计数器得出，与缓存项数量无关；缓存未变化时直接复用上次生成的结果
+        """
+        # 快照生成后不再修改，缓存变化时整体替换，因此读取无需加锁；
+        # 返回深一层的副本，调用方修改结果（包括 items_by_type）不会影响快照
+        snapshot = self._stats_snapshot
+        if snapshot is not None:
+            return self._copy_stats_snapshot(snapshot)
+        
         with self.lock:
-            total_size = self._get_cache_size()
-            
-            stats = {
-                'total_items': len(self.cache_index),
-                'total_size_mb': total_size / 1024 / 1024,
-                'max_size_mb': self.max_cache_size_bytes / 1024 / 1024,
-                'usage_percent': (total_size / self.max_cache_size_bytes) * 100,
-                'cache_dir': str(self.cache_dir),
-                'items_by_type': {}
-            }
-            
-            # 按类型统计
-            for item in self.cache_index.values():
-                item_type = item.get('type', 'unknown')
-                if item_type not in stats['items_by_type']:
-                    stats['items_by_type'][item_type] = {'count': 0, 'size_mb': 0}
-                
-                stats['items_by_type'][item_type]['count'] += 1
-                stats['items_by_type'][item_type]['size_mb'] += item.get('size', 0) / 1024 / 1024
+            if self._stats_snapshot is None:
+                total_size = self._stats['total_size_bytes']
+                self._stats_snapshot = {
+                    'total_items': self._stats['total_items'],
+                    'total_size_mb': total_size / 1024 / 1024,
+                    'max_size_mb': self.max_cache_size_bytes / 1024 / 1024,
+                    'usage_percent': (total_size / self.max_cache_size_bytes) * 100,
+                    'cache_dir': str(self.cache_dir),
+                    # 按类型统计
+                    'items_by_type': {
+                        item_type: {'count': type_stats['count'], 'size_mb': type_stats['size'] / 1024 / 1024}
+                        for item_type, type_stats in self._stats['by_type'].items()
+                        if type_stats['count'] > 0
+                    }
+                }
             
-            return stats
+            return self._copy_stats_snapshot(self._stats_snapshot)
+    
+    @staticmethod
+    def _copy_stats_snapshot(snapshot: Dict[str, Any]) -> Dict[str, Any]:
+        """复制统计快照，包括嵌套的按类型统计"""
+        stats = dict(snapshot)
+        stats['items_by_type'] = {
+            item_type: dict(type_stats) for item_type, type_stats in snapshot['items_by_type'].items()
+        }
+        return stats
     
     def clear_cache(self):
         """清空所有缓存"""
@@ -316,8 +389,12 @@ class CacheManager:
                         if file_path.is_file():
                             file_path.unlink()
                 
-                # 清空索引
+                # 清空索引和统计
                 self.cache_index.clear()
+                self._stats['total_items'] = 0
+                self._stats['total_size_bytes'] = 0
+                self._stats['by_type'].clear()
+                self._stats_snapshot = None
                 self._save_cache_index()
                 
                 logger.info("已清空所有缓存")
@@ -332,6 +409,8 @@ class HardwareAccelerationDetector:
         self.available_encoders = {}
         self.preferred_encoder = None
         self._initialized = False
+        # 编码器参数缓存: (codec, quality) -> 参数列表；检测完成后参数只取决于这两个输入
+        self._encoder_params_cache: Dict[Tuple[str, str], List[str]] = {}
     
     def _ensure_initialized(self):
         """确保硬件检测已完成"""
@@ -419,9 +498,17 @@ class HardwareAccelerationDetector:
             return False
     
     def get_encoder_params(self, codec: str = 'h264', quality: str = 'medium') -> List[str]:
-        """获取编码器参数"""
-        self._ensure_initialized()
-        
+        """获取编码器参数（按 codec/quality 缓存，返回副本以免调用方修改缓存内容）"""
+        key = (codec, quality)
+        params = self._encoder_params_cache.get(key)
+        if params is None:
+            self._ensure_initialized()
+            params = self._build_encoder_params(codec, quality)
+            self._encoder_params_cache[key] = params
+        return list(params)
+    
+    def _build_encoder_params(self, codec: str, quality: str) -> List[str]:
+        """根据已检测到的编码器生成编码参数"""
         params = []
         
         # 选择编码器
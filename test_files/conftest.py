@@ -0,0 +1,44 @@
+#!/usr/bin/env python3
+"""
+pytest 公共配置
+为 pytest-xdist 并行执行注册标记，并按测试类分配 xdist_group，
+使用方式: pytest -n auto --dist=loadgroup
+"""
+
+import pytest
+
+# 测试类（或 "测试类.测试方法"）-> xdist分组；同组测试在同一个worker上串行执行
+XDIST_GROUPS = {
+    "TestAPIWorkflow": "workflow",
+    "TestConcurrentProcessing": "concurrent",
+    "TestResourceManagement": "resources",
+    "TestErrorRecovery": "errors",
+    # 关键帧测试大部分时间在等待服务端任务，可分散到不同worker；
+    # 方法比较测试自身已并发提交3个任务，单独分组以免超出服务端并发上限
+    "TestKeyframeIntegration": "keyframe_integration",
+    # 性能优化器各测试类互不共享状态，各自一组即可并行；同类测试共享 setUpClass 创建的夹具
+    "TestCacheManager": "cache_manager",
+    "TestHardwareAccelerationDetector": "hardware_detector",
+    "TestMemoryOptimizedProcessor": "memory_processor",
+    "TestPerformanceOptimizer": "performance_optimizer",
+    # 单元测试中会修改服务端并发限制或启动任务的测试放在同一组串行执行，其余验证类测试自由分发
+    "TestVideoProcessingAPI.test_task_lifecycle": "server_state",
+    "TestVideoProcessingAPI.test_resource_limits_enforcement": "server_state",
+}
+
+
+def pytest_configure(config):
+    """注册自定义标记（未安装pytest-xdist时也不会触发 --strict-markers 报错）"""
+    config.addinivalue_line("markers", "xdist_group(name): 将测试分配到同一个xdist worker")
+    config.addinivalue_line("markers", "slow: 耗时较长的端到端测试（可用 -m \"not slow\" 跳过）")
+
+
+def pytest_collection_modifyitems(config, items):
+    """为已登记的测试类或测试方法添加 xdist_group 标记（方法级配置优先）"""
+    for item in items:
+        if item.cls is None:
+            continue
+        class_name = item.cls.__name__
+        group = XDIST_GROUPS.get(f"{class_name}.{item.originalname}") or XDIST_GROUPS.get(class_name)
+        if group and not item.get_closest_marker("xdist_group"):
+            item.add_marker(pytest.mark.xdist_group(group))
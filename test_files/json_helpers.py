@@ -0,0 +1,22 @@
+#!/usr/bin/env python3
+"""
+测试共用的JSON编解码
+安装了 orjson 时使用 orjson（更快，可直接解析响应字节），否则回退到标准库 json
+"""
+
+import json
+
+try:
+    import orjson  # 可选依赖
+except ImportError:
+    orjson = None
+
+if orjson is not None:
+    json_loads = orjson.loads
+    json_dumps = orjson.dumps
+else:
+    json_loads = json.loads
+
+    def json_dumps(obj) -> bytes:
+        """序列化为紧凑的UTF-8字节，与 orjson.dumps 的输出一致"""
+        return json.dumps(obj, ensure_ascii=False, separators=(",", ":")).encode()
@@ -6,41 +6,116 @@
 
 import unittest
 import requests
+from requests.adapters import HTTPAdapter
 import time
 import threading
 import tempfile
 import os
+import sys
 import json
+import functools
+import subprocess
 from typing import List, Dict, Any
 import concurrent.futures
 
-class TestAPIWorkflow(unittest.TestCase):
-    """API工作流程集成测试"""
+from json_helpers import orjson  # 可选依赖，未安装时为 None
+
+TEST_SRT_CONTENT = """1
+00:00:00,000 --> 00:00:05,000
+测试字幕第一行
+
+2
+00:00:05,000 --> 00:00:10,000
+测试字幕第二行
+"""
+
+@functools.lru_cache(maxsize=1)
+def _api_available(api_base_url: str) -> bool:
+    """检查API健康状态（进程内只探测一次）"""
+    try:
+        response = requests.get(f"{api_base_url}/health", timeout=5)
+        return response.status_code == 200
+    except Exception:
+        return False
+
+def _parse_json(response: requests.Response) -> Dict[str, Any]:
+    """解析一次响应体JSON，空响应返回空字典；响应体不是合法JSON时带上状态码和内容报错"""
+    if not response.content:
+        return {}
+    try:
+        if orjson is not None:
+            return orjson.loads(response.content)
+        return response.json()
+    except ValueError as e:
+        raise AssertionError(
+            f"响应不是合法JSON (HTTP {response.status_code}): {response.text[:200]!r}"
+        ) from e
+
+def _cancel_tasks(session: requests.Session, api_base_url: str, task_ids: List[str]):
+    """并发取消测试创建的任务，忽略取消失败"""
+    if not task_ids:
+        return
+    
+    def cancel(task_id):
+        try:
+            session.post(f"{api_base_url}/system/tasks/{task_id}/cancel", timeout=5)
+        except Exception:
+            pass
+    
+    with concurrent.futures.ThreadPoolExecutor(max_workers=min(16, len(task_ids))) as executor:
+        list(executor.map(cancel, task_ids))
+
+class _APITestBase(unittest.TestCase):
+    """集成测试基类：共享HTTP会话、API可用性检查和任务清理"""
+    
+    api_base_url = "http://localhost:8000"
+    test_video_url = "https://www.youtube.com/watch?v=dQw4w9WgXcQ"
+    
+    @classmethod
+    def setUpClass(cls):
+        """创建测试类共享的连接池会话"""
+        cls.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=16)
+        cls.session.mount("http://", adapter)
+        cls.session.mount("https://", adapter)
+    
+    @classmethod
+    def tearDownClass(cls):
+        """关闭共享会话"""
+        cls.session.close()
     
     def setUp(self):
         """测试前的设置"""
-        self.api_base_url = "http://localhost:8000"
-        self.session = requests.Session()
-        self.test_video_url = "https://www.youtube.com/watch?v=dQw4w9WgXcQ"
         self.test_tasks = []  # 跟踪创建的任务以便清理
         
         # 检查API是否可用
-        try:
-            response = self.session.get(f"{self.api_base_url}/health", timeout=5)
-            if response.status_code != 200:
-                self.skipTest("API服务不可用")
-        except Exception:
+        if not _api_available(self.api_base_url):
             self.skipTest("API服务不可用")
     
     def tearDown(self):
         """测试后的清理"""
         # 清理创建的任务
-        for task_id in self.test_tasks:
-            try:
-                self.session.post(f"{self.api_base_url}/system/tasks/{task_id}/cancel")
-            except:
-                pass
-        self.session.close()
+        _cancel_tasks(self.session, self.api_base_url, self.test_tasks)
+
+class TestAPIWorkflow(_APITestBase):
+    """API工作流程集成测试"""
+    
+    @classmethod
+    def setUpClass(cls):
+        """创建测试字幕文件（整个测试类共享）"""
+        super().setUpClass()
+        with tempfile.NamedTemporaryFile(mode='w', suffix='.srt', delete=False, encoding='utf-8') as f:
+            f.write(TEST_SRT_CONTENT)
+            cls.subtitle_file = f.name
+    
+    @classmethod
+    def tearDownClass(cls):
+        """清理临时字幕文件"""
+        try:
+            os.unlink(cls.subtitle_file)
+        except OSError:
+            pass
+        super().tearDownClass()
     
     def test_complete_transcription_workflow(self):
         """测试完整的转录工作流程"""
@@ -159,118 +234,103 @@ class TestAPIWorkflow(unittest.TestCase):
         """测试完整的合成工作流程"""
         print("\n🎬 测试完整合成工作流程...")
         
-        # 创建测试字幕文件
-        srt_content = """1
-00:00:00,000 --> 00:00:05,000
-测试字幕第一行
-
-2
-00:00:05,000 --> 00:00:10,000
-测试字幕第二行
-"""
+        # 1. 启动合成任务
+        response = self.session.post(
+            f"{self.api_base_url}/compose_video",
+            json={
+                "composition_type": "audio_video_subtitle",
+                "videos": [{"video_url": self.test_video_url}],
+                "audio_file": self.test_video_url,  # 使用同一个URL作为音频源
+                "subtitle_file": self.subtitle_file,
+                "output_format": "mp4"
+            }
+        )
         
-        with tempfile.NamedTemporaryFile(mode='w', suffix='.srt', delete=False, encoding='utf-8') as f:
-            f.write(srt_content)
-            subtitle_file = f.name
+        if response.status_code == 503:
+            self.skipTest("系统资源不足")
         
-        try:
-            # 1. 启动合成任务
-            response = self.session.post(
-                f"{self.api_base_url}/compose_video",
-                json={
-                    "composition_type": "audio_video_subtitle",
-                    "videos": [{"video_url": self.test_video_url}],
-                    "audio_file": self.test_video_url,  # 使用同一个URL作为音频源
-                    "subtitle_file": subtitle_file,
-                    "output_format": "mp4"
-                }
-            )
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        task_id = data.get('task_id')
+        self.assertIsNotNone(task_id)
+        self.test_tasks.append(task_id)
+        
+        print(f"   ✅ 合成任务已启动: {task_id}")
+        
+        # 2. 监控任务状态
+        max_wait_time = 180  # 合成可能需要更长时间
+        final_status = self._stream_composition_status(task_id, max_wait_time)
+        
+        # 3. 验证最终状态
+        if final_status == 'completed':
+            print("   ✅ 合成任务成功完成")
             
-            if response.status_code == 503:
-                self.skipTest("系统资源不足")
+            # 4. 获取结果
+            response = self.session.get(f"{self.api_base_url}/composition_result/{task_id}")
+            self.assertEqual(response.status_code, 200)
             
+            result_data = response.json()
+            self.assertIn('result', result_data)
+            print("   ✅ 成功获取合成结果")
+            
+        elif final_status == 'failed':
+            print("   ⚠️ 合成任务失败（这在测试环境中是正常的）")
+        else:
+            print("   ⏰ 合成任务超时（可能需要更长时间）")
+
+    def _stream_composition_status(self, task_id: str, max_wait_time: float):
+        """通过SSE流监控合成任务状态，服务端不支持时回退到轮询"""
+        start_time = time.time()
+        
+        try:
+            with self.session.get(
+                f"{self.api_base_url}/composition_status/{task_id}/stream",
+                headers={'Accept': 'text/event-stream'},
+                stream=True,
+                timeout=(5, max_wait_time)
+            ) as response:
+                if response.status_code == 200:
+                    for line in response.iter_lines():
+                        if not line.startswith(b"data: "):
+                            continue
+                        
+                        status_data = json.loads(line[6:])
+                        status = status_data.get('status')
+                        progress = status_data.get('progress', 0)
+                        current_stage = status_data.get('current_stage', '')
+                        
+                        print(f"   📊 状态: {status}, 进度: {progress}%, 阶段: {current_stage}")
+                        
+                        if status in ['completed', 'failed']:
+                            return status
+                        if time.time() - start_time >= max_wait_time:
+                            return None
+                    return None
+        except requests.exceptions.Timeout:
+            return None
+        
+        # 回退：定期轮询状态接口
+        while time.time() - start_time < max_wait_time:
+            response = self.session.get(f"{self.api_base_url}/composition_status/{task_id}")
             self.assertEqual(response.status_code, 200)
-            data = response.json()
-            task_id = data.get('task_id')
-            self.assertIsNotNone(task_id)
-            self.test_tasks.append(task_id)
             
-            print(f"   ✅ 合成任务已启动: {task_id}")
+            status_data = response.json()
+            status = status_data.get('status')
+            progress = status_data.get('progress', 0)
+            current_stage = status_data.get('current_stage', '')
             
-            # 2. 监控任务状态
-            max_wait_time = 180  # 合成可能需要更长时间
-            start_time = time.time()
-            final_status = None
+            print(f"   📊 状态: {status}, 进度: {progress}%, 阶段: {current_stage}")
             
-            while time.time() - start_time < max_wait_time:
-                response = self.session.get(f"{self.api_base_url}/composition_status/{task_id}")
-                self.assertEqual(response.status_code, 200)
-                
-                status_data = response.json()
-                status = status_data.get('status')
-                progress = status_data.get('progress', 0)
-                current_stage = status_data.get('current_stage', '')
-                
-                print(f"   📊 状态: {status}, 进度: {progress}%, 阶段: {current_stage}")
-                
-                if status in ['completed', 'failed']:
-                    final_status = status
-                    break
-                
-                time.sleep(15)
+            if status in ['completed', 'failed']:
+                return status
             
-            # 3. 验证最终状态
-            if final_status == 'completed':
-                print("   ✅ 合成任务成功完成")
-                
-                # 4. 获取结果
-                response = self.session.get(f"{self.api_base_url}/composition_result/{task_id}")
-                self.assertEqual(response.status_code, 200)
-                
-                result_data = response.json()
-                self.assertIn('result', result_data)
-                print("   ✅ 成功获取合成结果")
-                
-            elif final_status == 'failed':
-                print("   ⚠️ 合成任务失败（这在测试环境中是正常的）")
-            else:
-                print("   ⏰ 合成任务超时（可能需要更长时间）")
+            time.sleep(15)
         
-        finally:
-            # 清理临时字幕文件
-            try:
-                os.unlink(subtitle_file)
-            except:
-                pass
+        return None
 
-class TestConcurrentProcessing(unittest.TestCase):
+class TestConcurrentProcessing(_APITestBase):
     """并发处理测试"""
     
-    def setUp(self):
-        """测试前的设置"""
-        self.api_base_url = "http://localhost:8000"
-        self.session = requests.Session()
-        self.test_video_url = "https://www.youtube.com/watch?v=dQw4w9WgXcQ"
-        self.test_tasks = []
-        
-        # 检查API是否可用
-        try:
-            response = self.session.get(f"{self.api_base_url}/health", timeout=5)
-            if response.status_code != 200:
-                self.skipTest("API服务不可用")
-        except Exception:
-            self.skipTest("API服务不可用")
-    
-    def tearDown(self):
-        """测试后的清理"""
-        # 清理创建的任务
-        for task_id in self.test_tasks:
-            try:
-                self.session.post(f"{self.api_base_url}/system/tasks/{task_id}/cancel")
-            except:
-                pass
-        self.session.close()
-    
     def test_concurrent_task_submission(self):
         """测试并发任务提交"""
         print("\n🔄 测试并发任务提交...")
@@ -285,11 +345,13 @@ class TestConcurrentProcessing(unittest.TestCase):
                     timeout=10
                 )
                 
+                body = _parse_json(response)
+                
                 return {
                     'index': task_index,
                     'status_code': response.status_code,
-                    'task_id': response.json().get('task_id') if response.status_code == 200 else None,
-                    'error': response.json().get('detail') if response.status_code != 200 else None
+                    'task_id': body.get('task_id') if response.status_code == 200 else None,
+                    'error': body.get('detail') if response.status_code != 200 else None
                 }
             except Exception as e:
                 return {
@@ -302,8 +364,7 @@ class TestConcurrentProcessing(unittest.TestCase):
         # 并发提交多个任务
         num_tasks = 5
         with concurrent.futures.ThreadPoolExecutor(max_workers=num_tasks) as executor:
-            futures = [executor.submit(submit_task, i) for i in range(num_tasks)]
-            results = [future.result() for future in concurrent.futures.as_completed(futures)]
+            results = list(executor.map(submit_task, range(num_tasks)))
         
         # 分析结果
         successful_tasks = [r for r in results if r['status_code'] == 200]
@@ -336,7 +397,7 @@ class TestConcurrentProcessing(unittest.TestCase):
         if response.status_code != 200:
             self.skipTest("无法启动测试任务")
         
-        task_id = response.json().get('task_id')
+        task_id = _parse_json(response).get('task_id')
         self.test_tasks.append(task_id)
         
         def query_status(query_index):
@@ -364,8 +425,7 @@ class TestConcurrentProcessing(unittest.TestCase):
         # 并发查询状态
         num_queries = 10
         with concurrent.futures.ThreadPoolExecutor(max_workers=num_queries) as executor:
-            futures = [executor.submit(query_status, i) for i in range(num_queries)]
-            results = [future.result() for future in concurrent.futures.as_completed(futures)]
+            results = list(executor.map(query_status, range(num_queries)))
         
         # 分析结果
         successful_queries = [r for r in results if r['status_code'] == 200]
@@ -381,26 +441,9 @@ class TestConcurrentProcessing(unittest.TestCase):
         self.assertGreater(len(successful_queries), len(failed_queries),
                           "成功的查询应该多于失败的查询")
 
-class TestResourceManagement(unittest.TestCase):
+class TestResourceManagement(_APITestBase):
     """资源管理测试"""
     
-    def setUp(self):
-        """测试前的设置"""
-        self.api_base_url = "http://localhost:8000"
-        self.session = requests.Session()
-        
-        # 检查API是否可用
-        try:
-            response = self.session.get(f"{self.api_base_url}/health", timeout=5)
-            if response.status_code != 200:
-                self.skipTest("API服务不可用")
-        except Exception:
-            self.skipTest("API服务不可用")
-    
-    def tearDown(self):
-        """测试后的清理"""
-        self.session.close()
-    
     def test_resource_monitoring(self):
         """测试资源监控功能"""
         print("\n📊 测试资源监控功能...")
@@ -409,7 +452,7 @@ class TestResourceManagement(unittest.TestCase):
         response = self.session.get(f"{self.api_base_url}/system/resources")
         self.assertEqual(response.status_code, 200)
         
-        data = response.json()
+        data = _parse_json(response)
         required_fields = [
             'cpu_percent', 'memory_percent', 'disk_percent', 
             'free_disk_gb', 'active_tasks', 'max_concurrent_tasks'
@@ -423,7 +466,7 @@ class TestResourceManagement(unittest.TestCase):
         response = self.session.get(f"{self.api_base_url}/system/resources/history?duration_minutes=1")
         self.assertEqual(response.status_code, 200)
         
-        history_data = response.json()
+        history_data = _parse_json(response)
         self.assertIn('cpu', history_data)
         self.assertIn('memory', history_data)
         self.assertIn('disk', history_data)
@@ -509,26 +552,9 @@ class TestResourceManagement(unittest.TestCase):
         print(f"      过期任务: {cleanup_results.get('expired_tasks_cleaned', 0)}")
         print(f"      临时文件: {cleanup_results.get('temp_files_cleaned', 0)}")
 
-class TestErrorRecovery(unittest.TestCase):
+class TestErrorRecovery(_APITestBase):
     """错误恢复测试"""
     
-    def setUp(self):
-        """测试前的设置"""
-        self.api_base_url = "http://localhost:8000"
-        self.session = requests.Session()
-        
-        # 检查API是否可用
-        try:
-            response = self.session.get(f"{self.api_base_url}/health", timeout=5)
-            if response.status_code != 200:
-                self.skipTest("API服务不可用")
-        except Exception:
-            self.skipTest("API服务不可用")
-    
-    def tearDown(self):
-        """测试后的清理"""
-        self.session.close()
-    
     def test_error_tracking(self):
         """测试错误跟踪功能"""
         print("\n⚠️ 测试错误跟踪功能...")
@@ -580,10 +606,9 @@ class TestErrorRecovery(unittest.TestCase):
             ("GET", "/transcription_status/invalid-task-id", None),
         ]
         
-        resilience_score = 0
-        total_tests = len(invalid_requests)
-        
-        for method, endpoint, data in invalid_requests:
+        def probe(spec):
+            """发送单个无效请求，返回状态码或异常"""
+            method, endpoint, data = spec
             try:
                 if method == "POST":
                     if isinstance(data, str):
@@ -599,16 +624,26 @@ class TestErrorRecovery(unittest.TestCase):
                         )
                 else:
                     response = self.session.get(f"{self.api_base_url}{endpoint}")
-                
-                # 系统应该优雅地处理错误，返回4xx状态码而不是崩溃
-                if 400 <= response.status_code < 500:
-                    resilience_score += 1
-                    print(f"   ✅ {method} {endpoint}: 优雅处理 ({response.status_code})")
-                else:
-                    print(f"   ⚠️ {method} {endpoint}: 意外状态码 ({response.status_code})")
-                    
+                return response.status_code, None
             except Exception as e:
-                print(f"   ❌ {method} {endpoint}: 异常 ({str(e)})")
+                return None, e
+        
+        # 各请求相互独立，并发发送
+        with concurrent.futures.ThreadPoolExecutor(max_workers=len(invalid_requests)) as executor:
+            results = list(executor.map(probe, invalid_requests))
+        
+        resilience_score = 0
+        total_tests = len(invalid_requests)
+        
+        for (method, endpoint, _), (status_code, error) in zip(invalid_requests, results):
+            if error is not None:
+                print(f"   ❌ {method} {endpoint}: 异常 ({str(error)})")
+            # 系统应该优雅地处理错误，返回4xx状态码而不是崩溃
+            elif 400 <= status_code < 500:
+                resilience_score += 1
+                print(f"   ✅ {method} {endpoint}: 优雅处理 ({status_code})")
+            else:
+                print(f"   ⚠️ {method} {endpoint}: 意外状态码 ({status_code})")
         
         resilience_percentage = (resilience_score / total_tests) * 100
         print(f"   🎯 系统弹性得分: {resilience_percentage:.1f}% ({resilience_score}/{total_tests})")
@@ -616,6 +651,18 @@ class TestErrorRecovery(unittest.TestCase):
         # 系统应该至少能优雅处理大部分无效请求
         self.assertGreater(resilience_percentage, 50, "系统应该能优雅处理大部分无效请求")
 
+def run_integration_tests_parallel() -> bool:
+    """通过 pytest-xdist 并行运行集成测试（按 conftest.py 中的 xdist_group 分组）"""
+    print("🚀 使用 pytest-xdist 并行运行集成测试")
+    print("=" * 60)
+    
+    result = subprocess.run([
+        sys.executable, "-m", "pytest", os.path.abspath(__file__),
+        "-n", "auto", "--dist=loadgroup"
+    ], cwd=os.path.dirname(os.path.abspath(__file__)))
+    
+    return result.returncode == 0
+
 def run_integration_tests():
     """运行所有集成测试"""
     print("🚀 开始运行集成测试")
@@ -667,5 +714,18 @@ def run_integration_tests():
     return result.wasSuccessful()
 
 if __name__ == "__main__":
-    success = run_integration_tests()
+    import argparse
+    
+    parser = argparse.ArgumentParser(description="视频处理API集成测试")
+    parser.add_argument(
+        "--parallel",
+        action="store_true",
+        help="使用 pytest-xdist 并行运行（需要安装 pytest-xdist）"
+    )
+    args = parser.parse_args()
+    
+    if args.parallel:
+        success = run_integration_tests_parallel()
+    else:
+        success = run_integration_tests()
     exit(0 if success else 1)
\ No newline at end of file
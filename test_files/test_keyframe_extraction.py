@@ -3,13 +3,20 @@
 关键帧提取功能测试用例
 """
 
+import asyncio
+import aiohttp
 import pytest
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 import time
-import json
 import os
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
 from typing import Dict, Any
 
+from json_helpers import json_loads  # 安装了 orjson 时使用 orjson
+
 # 测试配置
 API_BASE_URL = "http://localhost:7878"
 TEST_VIDEO_URLS = {
@@ -17,12 +24,125 @@ TEST_VIDEO_URLS = {
     "medium_video": "https://www.youtube.com/watch?v=dQw4w9WgXcQ",  # 中等长度视频
 }
 
+# 预先拼接的接口地址，轮询时只需追加task_id
+EXTRACT_KEYFRAMES_URL = API_BASE_URL + "/extract_keyframes"
+KEYFRAME_STATUS_URL = API_BASE_URL + "/keyframe_status/"
+KEYFRAME_STATUS_BATCH_URL = API_BASE_URL + "/keyframe_status_batch"
+KEYFRAME_RESULT_URL = API_BASE_URL + "/keyframe_result/"
+KEYFRAME_IMAGE_URL = API_BASE_URL + "/keyframe_image/{}/{}"
+KEYFRAME_THUMBNAIL_URL = API_BASE_URL + "/keyframe_thumbnail/"
+
+MAX_IMAGE_BYTES = 20 * 1024 * 1024  # 图片响应大小上限，超过即停止读取
+
+def read_streamed_size(response: requests.Response, max_bytes: int = MAX_IMAGE_BYTES) -> int:
+    """以64KB分块读取流式响应并统计大小，不在内存中保留响应体；超过上限时提前停止"""
+    size = 0
+    for chunk in response.iter_content(chunk_size=64 * 1024):
+        size += len(chunk)
+        if size > max_bytes:
+            break
+    return size
+
+def create_session() -> requests.Session:
+    """创建带连接池和连接失败重试的会话（requests默认已启用keep-alive和gzip）"""
+    session = requests.Session()
+    adapter = HTTPAdapter(
+        pool_connections=32,
+        pool_maxsize=32,
+        max_retries=Retry(total=3, backoff_factor=0.2)
+    )
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+def wait_for_status(session: requests.Session, url: str, terminal=("completed", "failed"),
+                    timeout: float = 300, on_poll=None) -> Dict[str, Any]:
+    """
+    以指数退避轮询任务状态，直到进入终止状态
+    
+    轮询间隔从0.1秒开始，每次乘以1.7，最长2秒。
+    使用ETag条件请求，状态未变化时不重复传输和解析响应体。
+    返回终止状态的数据；超时返回None。除200和304以外的响应（如任务已被清理的404）立即失败。
+    """
+    delay = 0.1
+    deadline = time.monotonic() + timeout
+    etag = None
+    
+    while time.monotonic() < deadline:
+        # 状态未变化时服务端返回304且不带响应体，无需重新解析
+        headers = {"If-None-Match": etag} if etag else {}
+        response = session.get(url, headers=headers)
+        if response.status_code == 200:
+            etag = response.headers.get("ETag")
+            status_data = json_loads(response.content)
+            if on_poll:
+                on_poll(status_data)
+            if status_data.get("status") in terminal:
+                return status_data
+        elif response.status_code != 304:
+            raise AssertionError(f"查询任务状态失败 (HTTP {response.status_code}): {response.text[:200]}")
+        
+        time.sleep(delay)
+        delay = min(delay * 1.7, 2.0)
+    
+    return None
+
+async def poll_keyframe_status_batch(client: aiohttp.ClientSession, task_ids) -> Dict[str, Any]:
+    """
+    通过 POST /keyframe_status_batch 一次获取多个任务状态
+    
+    返回 {task_id: 状态数据}；服务端不支持批量接口时逐个查询。
+    """
+    async with client.post(KEYFRAME_STATUS_BATCH_URL, json={"ids": list(task_ids)}) as response:
+        if response.status == 200:
+            return await response.json(loads=json_loads)
+        if response.status not in (404, 405):
+            return {}
+    
+    statuses = {}
+    for task_id in task_ids:
+        async with client.get(KEYFRAME_STATUS_URL + task_id) as response:
+            if response.status == 200:
+                statuses[task_id] = await response.json(loads=json_loads)
+    return statuses
+
+@pytest.fixture(scope="session")
+def extracted_keyframe_task():
+    """
+    按数量方法提取一次关键帧，供多个测试共享
+    
+    只等待任务完成，不调用 /keyframe_result（该接口会清理任务状态，之后无法再下载图片）。
+    """
+    session = create_session()
+    try:
+        response = session.post(
+            EXTRACT_KEYFRAMES_URL,
+            json={
+                "video_url": TEST_VIDEO_URLS["short_video"],
+                "method": "count",
+                "count": 5,  # 提取5帧
+                "width": 640,
+                "height": 360,
+                "format": "jpg"
+            }
+        )
+        
+        assert response.status_code == 200
+        task_id = response.json()["task_id"]
+        
+        # 等待完成
+        status_data = wait_for_status(session, KEYFRAME_STATUS_URL + task_id, timeout=150)
+    finally:
+        session.close()
+    
+    return {"task_id": task_id, "status": status_data}
+
 class TestKeyframeExtraction:
     """关键帧提取功能测试类"""
     
     def setup_method(self):
         """每个测试方法执行前的设置"""
-        self.session = requests.Session()
+        self.session = create_session()
         self.session.timeout = 30
         
     def teardown_method(self):
@@ -46,17 +166,21 @@ class TestKeyframeExtraction:
             "http://invalid-domain.com/video",
         ]
         
-        for url in invalid_urls:
-            response = self.session.post(
-                f"{API_BASE_URL}/extract_keyframes",
+        def post_invalid_url(url):
+            return self.session.post(
+                EXTRACT_KEYFRAMES_URL,
                 json={"video_url": url}
             )
-            assert response.status_code == 400
+        
+        # 各URL的校验相互独立，并发提交
+        with ThreadPoolExecutor(max_workers=len(invalid_urls)) as executor:
+            for response in executor.map(post_invalid_url, invalid_urls):
+                assert response.status_code == 400
     
     def test_extract_keyframes_invalid_method(self):
         """测试无效方法参数的处理"""
         response = self.session.post(
-            f"{API_BASE_URL}/extract_keyframes",
+            EXTRACT_KEYFRAMES_URL,
             json={
                 "video_url": TEST_VIDEO_URLS["short_video"],
                 "method": "invalid_method"
@@ -68,7 +192,7 @@ class TestKeyframeExtraction:
     def test_extract_keyframes_invalid_format(self):
         """测试无效格式参数的处理"""
         response = self.session.post(
-            f"{API_BASE_URL}/extract_keyframes",
+            EXTRACT_KEYFRAMES_URL,
             json={
                 "video_url": TEST_VIDEO_URLS["short_video"],
                 "format": "invalid_format"
@@ -80,7 +204,7 @@ class TestKeyframeExtraction:
     def test_extract_keyframes_invalid_dimensions(self):
         """测试无效尺寸参数的处理"""
         response = self.session.post(
-            f"{API_BASE_URL}/extract_keyframes",
+            EXTRACT_KEYFRAMES_URL,
             json={
                 "video_url": TEST_VIDEO_URLS["short_video"],
                 "width": 50,  # 太小
@@ -93,7 +217,7 @@ class TestKeyframeExtraction:
     def test_extract_keyframes_timestamps_without_list(self):
         """测试timestamps方法但未提供timestamps列表"""
         response = self.session.post(
-            f"{API_BASE_URL}/extract_keyframes",
+            EXTRACT_KEYFRAMES_URL,
             json={
                 "video_url": TEST_VIDEO_URLS["short_video"],
                 "method": "timestamps"
@@ -106,7 +230,7 @@ class TestKeyframeExtraction:
         """测试间隔方法的关键帧提取"""
         # 1. 启动提取任务
         response = self.session.post(
-            f"{API_BASE_URL}/extract_keyframes",
+            EXTRACT_KEYFRAMES_URL,
             json={
                 "video_url": TEST_VIDEO_URLS["short_video"],
                 "method": "interval",
@@ -128,33 +252,30 @@ class TestKeyframeExtraction:
         
         task_id = data["task_id"]
         
-        # 2. 轮询任务状态直到完成
-        max_attempts = 60  # 最多等待5分钟
-        for attempt in range(max_attempts):
-            response = self.session.get(f"{API_BASE_URL}/keyframe_status/{task_id}")
-            assert response.status_code == 200
-            
-            status_data = response.json()
-            assert "status" in status_data
-            assert "progress" in status_data
-            
-            print(f"提取进度: {status_data['progress']}% - {status_data['message']}")
-            
-            if status_data["status"] == "completed":
-                assert status_data["result_available"] is True
-                assert "result_summary" in status_data
-                assert status_data["total_frames"] > 0
-                assert status_data["extracted_frames"] > 0
-                break
-            elif status_data["status"] == "failed":
-                pytest.fail(f"关键帧提取失败: {status_data.get('error', '未知错误')}")
-            
-            time.sleep(5)  # 等待5秒后重试
-        else:
+        # 2. 轮询任务状态直到完成（最多等待5分钟）
+        status_data = wait_for_status(
+            self.session,
+            KEYFRAME_STATUS_URL + task_id,
+            timeout=300,
+            on_poll=lambda d: print(f"提取进度: {d['progress']}% - {d['message']}")
+        )
+        
+        if status_data is None:
             pytest.fail("关键帧提取超时")
         
+        assert "status" in status_data
+        assert "progress" in status_data
+        
+        if status_data["status"] == "failed":
+            pytest.fail(f"关键帧提取失败: {status_data.get('error', '未知错误')}")
+        
+        assert status_data["result_available"] is True
+        assert "result_summary" in status_data
+        assert status_data["total_frames"] > 0
+        assert status_data["extracted_frames"] > 0
+        
         # 3. 获取完整结果
-        response = self.session.get(f"{API_BASE_URL}/keyframe_result/{task_id}")
+        response = self.session.get(KEYFRAME_RESULT_URL + task_id)
         assert response.status_code == 200
         
         result_data = response.json()
@@ -169,12 +290,20 @@ class TestKeyframeExtraction:
         assert len(result["frames"]) == result["total_frames"]
         
         # 验证帧信息
+        frames_by_dir = defaultdict(list)
         for frame in result["frames"]:
             assert "timestamp" in frame
             assert "filename" in frame
             assert "path" in frame
-            assert "size" in frame
-            assert os.path.exists(frame["path"])
+            frames_by_dir[os.path.dirname(frame["path"])].append(frame)
+        
+        # 每个目录只扫描一次；文件大小与结果中记录的一致，可发现未写完的帧
+        for frame_dir, frames in frames_by_dir.items():
+            present = {entry.name: entry.stat() for entry in os.scandir(frame_dir)}
+            for frame in frames:
+                name = os.path.basename(frame["path"])
+                assert name in present, f"帧文件不存在: {frame['path']}"
+                assert present[name].st_size == frame["size"] > 0, f"帧文件大小异常: {frame['path']}"
         
         print(f"提取成功: {result['title']}, 共 {result['total_frames']} 帧")
         return result
@@ -184,7 +313,7 @@ class TestKeyframeExtraction:
         timestamps = [10.0, 30.0, 60.0, 90.0]  # 指定时间点
         
         response = self.session.post(
-            f"{API_BASE_URL}/extract_keyframes",
+            EXTRACT_KEYFRAMES_URL,
             json={
                 "video_url": TEST_VIDEO_URLS["short_video"],
                 "method": "timestamps",
@@ -199,21 +328,15 @@ class TestKeyframeExtraction:
         task_id = response.json()["task_id"]
         
         # 等待完成（简化版）
-        for _ in range(30):
-            response = self.session.get(f"{API_BASE_URL}/keyframe_status/{task_id}")
-            if response.status_code == 200:
-                status = response.json()["status"]
-                if status in ["completed", "failed"]:
-                    break
-            time.sleep(5)
+        status_data = wait_for_status(
+            self.session, KEYFRAME_STATUS_URL + task_id, timeout=150
+        )
         
         # 验证结果
-        response = self.session.get(f"{API_BASE_URL}/keyframe_status/{task_id}")
-        if response.status_code == 200:
-            status_data = response.json()
+        if status_data:
             if status_data["status"] == "completed":
                 # 获取完整结果
-                result_response = self.session.get(f"{API_BASE_URL}/keyframe_result/{task_id}")
+                result_response = self.session.get(KEYFRAME_RESULT_URL + task_id)
                 if result_response.status_code == 200:
                     result = result_response.json()["result"]
                     assert result["method"] == "timestamps"
@@ -221,126 +344,54 @@ class TestKeyframeExtraction:
                     assert result["total_frames"] <= len(timestamps)
                     print(f"时间点提取成功: 请求 {len(timestamps)} 个时间点，实际提取 {result['total_frames']} 帧")
     
-    def test_extract_keyframes_count_method(self):
+    def test_extract_keyframes_count_method(self, extracted_keyframe_task):
         """测试按数量平均分布方法的关键帧提取"""
-        response = self.session.post(
-            f"{API_BASE_URL}/extract_keyframes",
-            json={
-                "video_url": TEST_VIDEO_URLS["short_video"],
-                "method": "count",
-                "count": 5,  # 提取5帧
-                "width": 1280,
-                "height": 720,
-                "format": "jpg",
-                "quality": 90
-            }
-        )
-        
-        assert response.status_code == 200
-        task_id = response.json()["task_id"]
-        
-        # 等待完成（简化版）
-        for _ in range(30):
-            response = self.session.get(f"{API_BASE_URL}/keyframe_status/{task_id}")
-            if response.status_code == 200:
-                status = response.json()["status"]
-                if status in ["completed", "failed"]:
-                    break
-            time.sleep(5)
+        status_data = extracted_keyframe_task["status"]
         
-        # 验证结果
-        response = self.session.get(f"{API_BASE_URL}/keyframe_status/{task_id}")
-        if response.status_code == 200:
-            status_data = response.json()
-            if status_data["status"] == "completed":
-                result_response = self.session.get(f"{API_BASE_URL}/keyframe_result/{task_id}")
-                if result_response.status_code == 200:
-                    result = result_response.json()["result"]
-                    assert result["method"] == "count"
-                    assert result["total_frames"] == 5
-                    print(f"按数量提取成功: 提取了 {result['total_frames']} 帧")
+        # 验证结果（通过状态摘要验证，不消费结果，以便其他测试继续下载图片）
+        if status_data and status_data["status"] == "completed":
+            result_summary = status_data["result_summary"]
+            assert result_summary["method"] == "count"
+            assert result_summary["total_frames"] == 5
+            print(f"按数量提取成功: 提取了 {result_summary['total_frames']} 帧")
     
-    def test_keyframe_image_download(self):
+    def test_keyframe_image_download(self, extracted_keyframe_task):
         """测试关键帧图片下载"""
-        # 首先提取一些关键帧
-        response = self.session.post(
-            f"{API_BASE_URL}/extract_keyframes",
-            json={
-                "video_url": TEST_VIDEO_URLS["short_video"],
-                "method": "count",
-                "count": 3,
-                "width": 640,
-                "height": 360
-            }
-        )
-        
-        assert response.status_code == 200
-        task_id = response.json()["task_id"]
-        
-        # 等待完成
-        for _ in range(30):
-            response = self.session.get(f"{API_BASE_URL}/keyframe_status/{task_id}")
-            if response.status_code == 200:
-                status = response.json()["status"]
-                if status == "completed":
-                    break
-            time.sleep(5)
+        task_id = extracted_keyframe_task["task_id"]
         
         # 测试下载第一帧
-        response = self.session.get(f"{API_BASE_URL}/keyframe_image/{task_id}/0")
-        if response.status_code == 200:
-            assert response.headers["content-type"].startswith("image/")
-            assert len(response.content) > 0
-            print("关键帧图片下载成功")
+        with self.session.get(KEYFRAME_IMAGE_URL.format(task_id, 0), stream=True, timeout=30) as response:
+            if response.status_code == 200:
+                assert response.headers["content-type"].startswith("image/")
+                assert 0 < read_streamed_size(response) <= MAX_IMAGE_BYTES
+                print("关键帧图片下载成功")
         
         # 测试下载不存在的帧
-        response = self.session.get(f"{API_BASE_URL}/keyframe_image/{task_id}/999")
+        response = self.session.get(KEYFRAME_IMAGE_URL.format(task_id, 999))
         assert response.status_code == 404
     
-    def test_keyframe_thumbnail_download(self):
+    def test_keyframe_thumbnail_download(self, extracted_keyframe_task):
         """测试缩略图网格下载"""
-        # 首先提取一些关键帧
-        response = self.session.post(
-            f"{API_BASE_URL}/extract_keyframes",
-            json={
-                "video_url": TEST_VIDEO_URLS["short_video"],
-                "method": "count",
-                "count": 4,
-                "width": 640,
-                "height": 360
-            }
-        )
-        
-        assert response.status_code == 200
-        task_id = response.json()["task_id"]
-        
-        # 等待完成
-        for _ in range(30):
-            response = self.session.get(f"{API_BASE_URL}/keyframe_status/{task_id}")
-            if response.status_code == 200:
-                status = response.json()["status"]
-                if status == "completed":
-                    break
-            time.sleep(5)
+        task_id = extracted_keyframe_task["task_id"]
         
         # 测试下载缩略图
-        response = self.session.get(f"{API_BASE_URL}/keyframe_thumbnail/{task_id}")
-        if response.status_code == 200:
-            assert response.headers["content-type"] == "image/jpeg"
-            assert len(response.content) > 0
-            print("缩略图网格下载成功")
+        with self.session.get(KEYFRAME_THUMBNAIL_URL + task_id, stream=True, timeout=30) as response:
+            if response.status_code == 200:
+                assert response.headers["content-type"] == "image/jpeg"
+                assert 0 < read_streamed_size(response) <= MAX_IMAGE_BYTES
+                print("缩略图网格下载成功")
     
     def test_keyframe_status_nonexistent_task(self):
         """测试查询不存在任务的状态"""
         fake_task_id = "00000000-0000-0000-0000-000000000000"
-        response = self.session.get(f"{API_BASE_URL}/keyframe_status/{fake_task_id}")
+        response = self.session.get(KEYFRAME_STATUS_URL + fake_task_id)
         assert response.status_code == 404
         assert "关键帧提取任务不存在" in response.json()["detail"]
     
     def test_keyframe_result_nonexistent_task(self):
         """测试获取不存在任务的结果"""
         fake_task_id = "00000000-0000-0000-0000-000000000000"
-        response = self.session.get(f"{API_BASE_URL}/keyframe_result/{fake_task_id}")
+        response = self.session.get(KEYFRAME_RESULT_URL + fake_task_id)
         assert response.status_code == 404
         assert "关键帧提取任务不存在或已过期" in response.json()["detail"]
 
@@ -348,12 +399,75 @@ class TestKeyframeIntegration:
     """关键帧提取集成测试"""
     
     def setup_method(self):
-        self.session = requests.Session()
+        self.session = create_session()
         self.session.timeout = 30
     
     def teardown_method(self):
         self.session.close()
     
+    async def _submit_method(self, client: aiohttp.ClientSession, method_config: Dict[str, Any]):
+        """异步提交单个提取方法的任务，返回task_id（失败返回None）"""
+        print(f"\n测试方法: {method_config['method']}")
+        
+        async with client.post(
+            EXTRACT_KEYFRAMES_URL,
+            json={
+                "video_url": TEST_VIDEO_URLS["short_video"],
+                **method_config,
+                "width": 640,
+                "height": 360,
+                "format": "jpg"
+            }
+        ) as response:
+            if response.status != 200:
+                return None
+            return (await response.json())["task_id"]
+    
+    async def _fetch_total_frames(self, client: aiohttp.ClientSession, method: str, task_id: str):
+        """获取已完成任务的提取帧数（失败返回None）"""
+        async with client.get(KEYFRAME_RESULT_URL + task_id) as result_response:
+            if result_response.status != 200:
+                return None
+            result = (await result_response.json())["result"]
+            print(f"方法 {method} 提取了 {result['total_frames']} 帧")
+            return result["total_frames"]
+    
+    async def _compare_methods(self, methods, timeout: float = 100):
+        """并发提交所有提取方法，通过批量状态接口统一轮询"""
+        async with aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=30)) as client:
+            # 1. 同时提交所有任务
+            submitted = await asyncio.gather(
+                *(self._submit_method(client, method_config) for method_config in methods)
+            )
+            pending = {
+                method_config["method"]: task_id
+                for method_config, task_id in zip(methods, submitted)
+                if task_id
+            }
+            
+            # 2. 一次请求查询所有未完成任务的状态（简化版）
+            completed = {}
+            delay = 0.1
+            deadline = time.monotonic() + timeout
+            while pending and time.monotonic() < deadline:
+                statuses = await poll_keyframe_status_batch(client, list(pending.values()))
+                for method, task_id in list(pending.items()):
+                    status_data = statuses.get(task_id)
+                    if status_data and status_data["status"] in ["completed", "failed"]:
+                        del pending[method]
+                        if status_data["status"] == "completed":
+                            completed[method] = task_id
+                
+                if pending:
+                    await asyncio.sleep(delay)
+                    delay = min(delay * 1.7, 2.0)
+            
+            # 3. 获取结果
+            total_frames = await asyncio.gather(
+                *(self._fetch_total_frames(client, method, task_id) for method, task_id in completed.items())
+            )
+            return dict(zip(completed.keys(), total_frames))
+    
     def test_different_methods_comparison(self):
         """测试不同提取方法的比较"""
         methods = [
@@ -362,42 +476,10 @@ class TestKeyframeIntegration:
             {"method": "timestamps", "timestamps": [15.0, 45.0, 75.0]}
         ]
         
-        results = {}
+        # 各方法相互独立，同时提交并批量轮询
+        frames_by_method = asyncio.run(self._compare_methods(methods))
         
-        for method_config in methods:
-            print(f"\n测试方法: {method_config['method']}")
-            
-            # 启动提取任务
-            response = self.session.post(
-                f"{API_BASE_URL}/extract_keyframes",
-                json={
-                    "video_url": TEST_VIDEO_URLS["short_video"],
-                    **method_config,
-                    "width": 640,
-                    "height": 360,
-                    "format": "jpg"
-                }
-            )
-            
-            if response.status_code == 200:
-                task_id = response.json()["task_id"]
-                
-                # 等待完成（简化版）
-                for _ in range(20):
-                    status_response = self.session.get(f"{API_BASE_URL}/keyframe_status/{task_id}")
-                    if status_response.status_code == 200:
-                        status = status_response.json()["status"]
-                        if status in ["completed", "failed"]:
-                            break
-                    time.sleep(5)
-                
-                # 获取结果
-                if status == "completed":
-                    result_response = self.session.get(f"{API_BASE_URL}/keyframe_result/{task_id}")
-                    if result_response.status_code == 200:
-                        result = result_response.json()["result"]
-                        results[method_config["method"]] = result["total_frames"]
-                        print(f"方法 {method_config['method']} 提取了 {result['total_frames']} 帧")
+        results = {method: frames for method, frames in frames_by_method.items() if frames is not None}
         
         print(f"\n提取结果比较: {results}")
         assert len(results) > 0  # 至少有一个方法成功
@@ -415,7 +497,7 @@ def run_manual_test():
     print(f"测试关键帧提取: {test_url}")
     
     response = requests.post(
-        f"{API_BASE_URL}/extract_keyframes",
+        EXTRACT_KEYFRAMES_URL,
         json={
             "video_url": test_url,
             "method": "interval",
@@ -433,7 +515,7 @@ def run_manual_test():
         
         # 监控进度
         while True:
-            response = requests.get(f"{API_BASE_URL}/keyframe_status/{task_id}")
+            response = requests.get(KEYFRAME_STATUS_URL + task_id)
             if response.status_code == 200:
                 data = response.json()
                 print(f"进度: {data['progress']}% - {data['message']}")
@@ -442,7 +524,7 @@ def run_manual_test():
                     print("关键帧提取完成！")
                     
                     # 获取结果
-                    response = requests.get(f"{API_BASE_URL}/keyframe_result/{task_id}")
+                    response = requests.get(KEYFRAME_RESULT_URL + task_id)
                     if response.status_code == 200:
                         result = response.json()["result"]
                         print(f"标题: {result['title']}")
@@ -451,7 +533,7 @@ def run_manual_test():
                         
                         # 测试下载第一帧
                         if result['total_frames'] > 0:
-                            img_response = requests.get(f"{API_BASE_URL}/keyframe_image/{task_id}/0")
+                            img_response = requests.get(KEYFRAME_IMAGE_URL.format(task_id, 0))
                             if img_response.status_code == 200:
                                 print(f"第一帧下载成功，大小: {len(img_response.content)} 字节")
                     break
@@ -5,21 +5,49 @@
 """
 
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 import time
-import json
 import os
 import tempfile
 import subprocess
+import hashlib
+import atexit
+import operator
 from typing import Dict, Any
 
+from json_helpers import json_loads  # 安装了 orjson 时使用 orjson
+
+# 合成测试只验证流程，测试素材使用低分辨率和低帧率（可通过环境变量调整分辨率）
+TEST_CLIP_SIZE = os.environ.get("DLVS_TEST_RES", "160x120")
+TEST_CLIP_RATE = 10
+
+# 状态接口始终返回这三个字段，一次取出
+_get_status_fields = operator.itemgetter('status', 'progress', 'message')
+
 class LocalVideoCompositionTester:
     """本地视频合成测试器"""
     
     def __init__(self, api_base_url: str = "http://localhost:7878"):
         self.api_base_url = api_base_url
+        self.composition_status_url = f"{api_base_url}/composition_status/"
+        self.composition_result_url = f"{api_base_url}/composition_result/"
         self.session = requests.Session()
         self.session.timeout = 30
+        
+        # 连接池复用状态轮询的连接，连接失败时短暂退避重试
+        adapter = HTTPAdapter(
+            pool_connections=32,
+            pool_maxsize=32,
+            max_retries=Retry(total=3, backoff_factor=0.2)
+        )
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
         self.test_videos = []
+        
+        # 本次运行产生的临时文件统一放在一个目录中，清理时整体删除；异常退出时由atexit兜底
+        self._tmpdir = tempfile.TemporaryDirectory(prefix="dlvs_tests_")
+        atexit.register(self._tmpdir.cleanup)
     
     def create_test_videos(self) -> list:
         """创建测试用的本地视频文件"""
@@ -27,53 +55,73 @@ class LocalVideoCompositionTester:
         
         test_videos = []
         
-        for i in range(2):
-            # 创建临时视频文件
-            with tempfile.NamedTemporaryFile(suffix=f'_test_{i+1}.mp4', delete=False) as f:
-                video_path = f.name
-            
-            # 使用FFmpeg创建5秒的测试视频
-            cmd = [
-                'ffmpeg', '-y',
-                '-f', 'lavfi',
-                '-i', f'testsrc=duration=5:size=640x480:rate=30',
-                '-f', 'lavfi', 
-                '-i', f'sine=frequency=1000:duration=5',
-                '-c:v', 'libx264',
-                '-c:a', 'aac',
-                '-t', '5',
-                video_path
-            ]
+        # 使用一次FFmpeg调用同时输出两个5秒的测试视频（输出选项需对每个文件分别指定）
+        input_args = [
+            'ffmpeg', '-y', '-hide_banner', '-nostdin', '-loglevel', 'error',
+            '-f', 'lavfi',
+            '-i', f'testsrc=duration=5:size={TEST_CLIP_SIZE}:rate={TEST_CLIP_RATE}',
+            '-f', 'lavfi', 
+            '-i', f'sine=frequency=1000:duration=5',
+        ]
+        output_args = [
+            '-map', '0:v', '-map', '1:a',
+            # 一次性测试素材：使用最快的编码预设
+            '-c:v', 'libx264', '-preset', 'ultrafast', '-tune', 'zerolatency', '-g', str(TEST_CLIP_RATE),
+            '-c:a', 'aac', '-b:a', '64k',
+            '-t', '5',
+        ]
+        
+        # 测试素材内容是确定的，按命令参数哈希缓存，跨测试运行复用
+        cache_key = hashlib.sha1(" ".join(input_args + output_args).encode()).hexdigest()[:16]
+        cache_dir = os.path.join(tempfile.gettempdir(), "dlvs_cache")
+        os.makedirs(cache_dir, exist_ok=True)
+        video_paths = [os.path.join(cache_dir, f"{cache_key}_test_{i+1}.mp4") for i in range(2)]
+        
+        if all(os.path.exists(path) and os.path.getsize(path) > 0 for path in video_paths):
+            for i, video_path in enumerate(video_paths):
+                file_size = os.path.getsize(video_path)
+                test_videos.append(video_path)
+                print(f"   ♻️ 复用缓存测试视频 {i+1}: {video_path} ({file_size / 1024:.1f}KB)")
+            
+            self.test_videos = test_videos
+            return test_videos
+        
+        # 先写入临时目录，成功后再移入缓存，避免中断留下不完整的缓存文件
+        partial_paths = [os.path.join(self._tmpdir.name, os.path.basename(path)) for path in video_paths]
+        cmd = list(input_args)
+        for partial_path in partial_paths:
+            cmd += output_args + [partial_path]
+        
+        try:
+            # 只保留错误输出，stdout直接丢弃
+            result = subprocess.run(cmd, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, timeout=60)
             
-            try:
-                result = subprocess.run(cmd, capture_output=True, text=True, timeout=30)
-                
-                if result.returncode == 0 and os.path.exists(video_path):
+            for i, (partial_path, video_path) in enumerate(zip(partial_paths, video_paths)):
+                if result.returncode == 0 and os.path.exists(partial_path):
+                    os.replace(partial_path, video_path)
                     file_size = os.path.getsize(video_path)
                     test_videos.append(video_path)
                     print(f"   ✅ 创建测试视频 {i+1}: {video_path} ({file_size / 1024:.1f}KB)")
                 else:
-                    print(f"   ❌ 创建测试视频 {i+1} 失败: {result.stderr}")
-                    
-            except subprocess.TimeoutExpired:
-                print(f"   ⏰ 创建测试视频 {i+1} 超时")
-            except Exception as e:
-                print(f"   💥 创建测试视频 {i+1} 异常: {str(e)}")
+                    print(f"   ❌ 创建测试视频 {i+1} 失败: {result.stderr.decode(errors='replace')}")
+                
+        except subprocess.TimeoutExpired:
+            print(f"   ⏰ 创建测试视频超时")
+        except Exception as e:
+            print(f"   💥 创建测试视频异常: {str(e)}")
         
         self.test_videos = test_videos
         return test_videos
     
     def cleanup_test_videos(self):
-        """清理测试视频文件"""
+        """清理本次运行的临时文件（缓存的测试视频保留给后续运行复用）"""
         print("🧹 清理测试视频文件...")
         
-        for video_path in self.test_videos:
-            try:
-                if os.path.exists(video_path):
-                    os.unlink(video_path)
-                    print(f"   🗑️ 删除: {video_path}")
-            except Exception as e:
-                print(f"   ⚠️ 删除失败 {video_path}: {str(e)}")
+        try:
+            self._tmpdir.cleanup()
+            print(f"   🗑️ 删除临时目录: {self._tmpdir.name}")
+        except Exception as e:
+            print(f"   ⚠️ 删除失败 {self._tmpdir.name}: {str(e)}")
     
     def check_api_availability(self) -> bool:
         """检查API是否可用"""
@@ -228,17 +276,17 @@ class LocalVideoCompositionTester:
         """监控合成任务进度"""
         print(f"   ⏳ 监控任务进度: {task_id[:8]}...")
         
+        status_url = self.composition_status_url + task_id
         start_time = time.time()
+        delay = 0.1  # 指数退避：从0.1秒开始，最长2秒
         
         while time.time() - start_time < max_wait_time:
             try:
-                response = self.session.get(f"{self.api_base_url}/composition_status/{task_id}")
+                response = self.session.get(status_url)
                 
                 if response.status_code == 200:
-                    data = response.json()
-                    status = data.get('status')
-                    progress = data.get('progress', 0)
-                    message = data.get('message', '')
+                    data = json_loads(response.content)
+                    status, progress, message = _get_status_fields(data)
                     
                     print(f"      📊 进度: {progress}% - {message}")
                     
@@ -246,7 +294,7 @@ class LocalVideoCompositionTester:
                         print(f"   ✅ 任务完成: {task_id[:8]}")
                         
                         # 获取详细结果
-                        result_response = self.session.get(f"{self.api_base_url}/composition_result/{task_id}")
+                        result_response = self.session.get(self.composition_result_url + task_id)
                         if result_response.status_code == 200:
                             result_data = result_response.json()
                             composition_result = result_data.get('result', {})
@@ -268,11 +316,11 @@ class LocalVideoCompositionTester:
                         print(f"   ❌ 任务失败: {error}")
                         return False
                 
-                time.sleep(10)  # 每10秒检查一次
-                
             except Exception as e:
                 print(f"      ⚠️ 查询状态失败: {str(e)}")
-                time.sleep(5)
+            
+            time.sleep(delay)
+            delay = min(delay * 1.7, 2.0)
         
         print(f"   ⏰ 任务监控超时: {task_id[:8]}")
         return False
@@ -5,35 +5,80 @@
 """
 
 import unittest
+import asyncio
+import aiohttp
 import requests
+from requests.adapters import HTTPAdapter
 import time
-import threading
 import statistics
 import psutil
 import json
 import concurrent.futures
-from typing import List, Dict, Any, Tuple
+import functools
+from array import array
+from typing import Callable, List, Dict, Any, Optional, Set, Tuple
 from datetime import datetime, timedelta
 import sys
 
+HEALTH_PROBE_METHOD = 'HEAD'  # 健康检查吞吐量测试只需状态码，使用HEAD请求避免传输响应体
+MAX_CONCURRENT_USERS = 32  # 吞吐量测试支持的最大并发用户数（连接池大小）
+RESPONSE_TIME_SAMPLES = 5  # 每个端点的响应时间采样次数
+NS_PER_SECOND = 1_000_000_000
+DISK_USAGE_REFRESH_SAMPLES = 30  # 磁盘使用率每隔多少次采样刷新一次
+API_RESOURCES_CACHE_SECONDS = 10  # /system/resources 结果缓存时间窗口（秒）
+HEALTH_CHECK_CACHE_SECONDS = 600  # API可用性检查结果缓存时间窗口（秒）
+ERROR_BACKOFF_SECONDS = 0.05  # 吞吐量测试中请求异常后的初始退避时间（秒），连续异常时翻倍
+ERROR_BACKOFF_MAX_SECONDS = 1.0  # 请求异常退避时间上限（秒）
+MAX_CONSECUTIVE_ERRORS = 20  # 单个并发用户连续异常达到该次数后提前停止（服务不可用）
+
+@functools.lru_cache(maxsize=4)
+def _cached_health(api_base_url: str, time_bucket: int) -> bool:
+    """检查API是否可用；同一时间窗口（time_bucket）内各测试类复用检查结果"""
+    try:
+        response = requests.get(f"{api_base_url}/health", timeout=5)
+        return response.status_code == 200
+    except:
+        return False
+
+def drain_response(response: requests.Response) -> int:
+    """读完并丢弃流式响应体，返回响应大小
+    
+    有 Content-Length 时直接使用该值；读完响应体可使连接回到连接池复用
+    """
+    content_length = response.headers.get('Content-Length')
+    drained = 0
+    for chunk in response.iter_content(chunk_size=64 * 1024):
+        drained += len(chunk)
+    return int(content_length) if content_length else drained
+
+def latency_percentile(sorted_values: List[int], percent: int) -> int:
+    """最近秩法计算分位数，sorted_values 必须已升序排列且非空"""
+    rank = max(1, -(-len(sorted_values) * percent // 100))
+    return sorted_values[rank - 1]
+
 class PerformanceBenchmarkTester:
     """性能基准测试器"""
     
-    def __init__(self, api_base_url: str = "http://localhost:7878"):
+    def __init__(self, api_base_url: str = "http://localhost:7878") -> None:
         self.api_base_url = api_base_url
         self.session = requests.Session()
-        self.test_tasks = []
-        self.performance_data = {
-            'response_times': [],
-            'throughput': [],
-            'resource_usage': [],
-            'error_rates': []
-        }
+        # 连接池大小覆盖最大并发数
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=MAX_CONCURRENT_USERS)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self.test_tasks: Set[str] = set()
+        # 同一时间窗口内复用 /system/resources 结果，避免监控请求干扰负载测试：(时间窗口, 结果)
+        self._api_resources_cache: Tuple[int, Dict[str, Any]] = (-1, {})
+        # 吞吐量测试使用的事件循环和异步连接池，在多次测量之间保持，连接保持热状态
+        self._loop = asyncio.new_event_loop()
+        self._async_client: Optional[aiohttp.ClientSession] = None
+        # 同步请求并发采样共用的线程池（线程按需创建，跨测试复用）
+        self.executor = concurrent.futures.ThreadPoolExecutor(max_workers=MAX_CONCURRENT_USERS)
         
         # 测试配置
         self.test_video_url = "https://www.youtube.com/watch?v=dQw4w9WgXcQ"
         
-    def cleanup(self):
+    def cleanup(self) -> None:
         """清理测试资源"""
         for task_id in self.test_tasks:
             try:
@@ -41,100 +86,217 @@ class PerformanceBenchmarkTester:
             except:
                 pass
     
+    def close(self) -> None:
+        """关闭线程池、连接池和事件循环"""
+        self.executor.shutdown(wait=True)
+        if self._async_client is not None:
+            self._loop.run_until_complete(self._async_client.close())
+            self._async_client = None
+        self._loop.close()
+        self.session.close()
+    
     def check_api_availability(self) -> bool:
-        """检查API是否可用"""
-        try:
-            response = self.session.get(f"{self.api_base_url}/health", timeout=5)
-            return response.status_code == 200
-        except:
-            return False
+        """检查API是否可用（结果按时间窗口缓存）"""
+        return _cached_health(self.api_base_url, int(time.monotonic() // HEALTH_CHECK_CACHE_SECONDS))
+    
+    def bind_request(self, endpoint: str, method: str = 'GET', data: Optional[dict] = None) -> Callable[[], requests.Response]:
+        """把请求方法、URL、请求体和超时预先绑定成无参调用，方法分派只在配置阶段进行一次
+        
+        使用 stream=True: 响应体不整体缓存到内存，只需要大小
+        """
+        url = f"{self.api_base_url}{endpoint}"
+        method = method.upper()
+        if method == 'GET':
+            return functools.partial(self.session.get, url, timeout=30, stream=True)
+        if method == 'HEAD':
+            return functools.partial(self.session.head, url, timeout=30)
+        if method == 'POST':
+            return functools.partial(self.session.post, url, json=data, timeout=30, stream=True)
+        raise ValueError(f"Unsupported method: {method}")
     
-    def measure_response_time(self, endpoint: str, method: str = 'GET', data: dict = None) -> Dict[str, Any]:
-        """测量单个请求的响应时间"""
-        start_time = time.time()
+    def measure_call(self, send: Callable[[], requests.Response], parse_json: bool = False) -> Dict[str, Any]:
+        """测量一次预绑定请求（见 bind_request）的响应时间
+        
+        耗时以 perf_counter_ns 差值（整数纳秒）记录在 'response_time_ns'，由调用方在输出时换算；
+        parse_json=True 时读取并解析JSON响应体，结果中附带 'body'（非JSON响应为 None）
+        """
+        timestamp = time.time()
+        start_ns = time.perf_counter_ns()
         
         try:
-            if method.upper() == 'GET':
-                response = self.session.get(f"{self.api_base_url}{endpoint}", timeout=30)
-            elif method.upper() == 'POST':
-                response = self.session.post(f"{self.api_base_url}{endpoint}", json=data, timeout=30)
-            else:
-                raise ValueError(f"Unsupported method: {method}")
-            
-            end_time = time.time()
-            response_time = end_time - start_time
+            body = None
+            with send() as response:
+                if parse_json and 'application/json' in response.headers.get('Content-Type', ''):
+                    response_size = len(response.content)
+                    body = response.json()
+                else:
+                    response_size = drain_response(response)
+            response_time_ns = time.perf_counter_ns() - start_ns
             
-            return {
+            result = {
                 'success': True,
                 'status_code': response.status_code,
-                'response_time': response_time,
-                'response_size': len(response.content),
-                'timestamp': start_time
+                'response_time_ns': response_time_ns,
+                'response_size': response_size,
+                'timestamp': timestamp
             }
+            if parse_json:
+                result['body'] = body
+            return result
             
         except Exception as e:
-            end_time = time.time()
             return {
                 'success': False,
                 'error': str(e),
-                'response_time': end_time - start_time,
-                'timestamp': start_time
+                'response_time_ns': time.perf_counter_ns() - start_ns,
+                'timestamp': timestamp
             }
     
-    def measure_throughput(self, endpoint: str, method: str, data: dict, duration_seconds: int, concurrent_users: int) -> Dict[str, Any]:
-        """测量系统吞吐量"""
-        results = []
-        start_time = time.time()
-        
-        def worker():
-            """工作线程"""
-            session = requests.Session()
-            while time.time() - start_time < duration_seconds:
+    def measure_response_time(self, endpoint: str, method: str = 'GET', data: Optional[dict] = None,
+                              parse_json: bool = False) -> Dict[str, Any]:
+        """测量单个请求的响应时间（单次调用的便捷入口，结果格式同 measure_call）"""
+        try:
+            send = self.bind_request(endpoint, method, data)
+        except ValueError as e:
+            return {'success': False, 'error': str(e), 'response_time_ns': 0, 'timestamp': time.time()}
+        return self.measure_call(send, parse_json)
+    
+    def _get_async_client(self) -> aiohttp.ClientSession:
+        """获取（必要时创建）跨多次吞吐量测量复用的异步连接池，须在事件循环内调用"""
+        if self._async_client is None or self._async_client.closed:
+            connector = aiohttp.TCPConnector(limit=MAX_CONCURRENT_USERS * 2)
+            self._async_client = aiohttp.ClientSession(
+                connector=connector, timeout=aiohttp.ClientTimeout(total=10)
+            )
+        return self._async_client
+    
+    async def _run_throughput_workers(self, url: str, method: str, data: Optional[dict], duration_seconds: int,
+                                      concurrent_users: int, target_rps: Optional[float] = None
+                                      ) -> List[Tuple[array, array, array]]:
+        """在同一个事件循环上运行所有并发用户
+        
+        每个协程写入自己的样本数组（请求开始时间ns、延迟ns、状态码），
+        状态码0表示请求异常；各协程数组互不共享，无需加锁。
+        target_rps 为空时各协程不间断发送请求（开环），否则按总速率平均分配给各协程定速发送。
+        请求异常后按指数退避再发送，连续异常 MAX_CONSECUTIVE_ERRORS 次的协程提前结束，
+        避免服务不可用时空转并用失败样本填满数组
+        """
+        deadline_ns: int = time.perf_counter_ns() + duration_seconds * NS_PER_SECOND
+        # 每个协程两次请求之间的间隔（ns）
+        pacing_ns: int = int(concurrent_users * NS_PER_SECOND / target_rps) if target_rps else 0
+        
+        client = self._get_async_client()
+        send: Callable[[], Any]
+        
+        # 在进入循环前绑定好请求方法、URL和请求体
+        method = method.upper()
+        if method == 'GET':
+            send = functools.partial(client.get, url)
+        elif method == 'HEAD':
+            # 探活请求只关心状态码，HEAD 不传输响应体
+            send = functools.partial(client.head, url)
+        else:
+            send = functools.partial(client.post, url, json=data)
+        
+        async def worker() -> Tuple[array, array, array]:
+            """单个并发用户；样本写入本协程独有的数组，结束后由调用方一次性合并"""
+            timestamps_ns = array('q')
+            latencies_ns = array('q')
+            statuses = array('H')
+            record_timestamp = timestamps_ns.append
+            record_latency = latencies_ns.append
+            record_status = statuses.append
+            next_request_ns: int = time.perf_counter_ns()
+            consecutive_errors = 0
+            while time.perf_counter_ns() < deadline_ns:
+                request_start_ns: int = time.perf_counter_ns()
                 try:
-                    if method.upper() == 'GET':
-                        response = session.get(f"{self.api_base_url}{endpoint}", timeout=10)
-                    else:
-                        response = session.post(f"{self.api_base_url}{endpoint}", json=data, timeout=10)
-                    
-                    results.append({
-                        'timestamp': time.time(),
-                        'status_code': response.status_code,
-                        'response_time': response.elapsed.total_seconds(),
-                        'success': response.status_code < 400
-                    })
-                    
-                except Exception as e:
-                    results.append({
-                        'timestamp': time.time(),
-                        'error': str(e),
-                        'response_time': 0,
-                        'success': False
-                    })
+                    async with send() as response:
+                        # 逐块丢弃响应体，读完后连接可继续复用
+                        async for _ in response.content.iter_any():
+                            pass
+                    status: int = response.status
+                except Exception:
+                    status = 0
+                
+                record_timestamp(request_start_ns)
+                record_latency(time.perf_counter_ns() - request_start_ns)
+                record_status(status)
+                
+                if status == 0:
+                    consecutive_errors += 1
+                    if consecutive_errors >= MAX_CONSECUTIVE_ERRORS:
+                        break
+                    backoff = min(ERROR_BACKOFF_SECONDS * 2 ** (consecutive_errors - 1), ERROR_BACKOFF_MAX_SECONDS)
+                    await asyncio.sleep(backoff)
+                    next_request_ns = time.perf_counter_ns()
+                    continue
+                consecutive_errors = 0
                 
-                time.sleep(0.1)  # 短暂休息避免过度负载
-        
-        # 启动并发工作线程
-        threads = []
-        for _ in range(concurrent_users):
-            thread = threading.Thread(target=worker)
-            thread.start()
-            threads.append(thread)
-        
-        # 等待所有线程完成
-        for thread in threads:
-            thread.join()
-        
-        # 分析结果
-        total_requests = len(results)
-        successful_requests = len([r for r in results if r.get('success', False)])
+                if pacing_ns:
+                    next_request_ns += pacing_ns
+                    delay_ns = next_request_ns - time.perf_counter_ns()
+                    if delay_ns > 0:
+                        await asyncio.sleep(delay_ns / NS_PER_SECOND)
+            return timestamps_ns, latencies_ns, statuses
+        
+        return await asyncio.gather(*(worker() for _ in range(concurrent_users)))
+    
+    def measure_throughput(self, endpoint: str, method: str, data: Optional[dict], duration_seconds: int, concurrent_users: int,
+                           target_rps: Optional[float] = None) -> Dict[str, Any]:
+        """测量系统吞吐量（单线程事件循环驱动所有并发用户）
+        
+        默认开环测试：各用户收到响应后立即发送下一个请求，结果反映服务端实际处理能力；
+        指定 target_rps 时按该总速率定速发送
+        """
+        per_worker_samples = self._loop.run_until_complete(self._run_throughput_workers(
+            f"{self.api_base_url}{endpoint}", method, data, duration_seconds, concurrent_users, target_rps
+        ))
+        return self._summarize_throughput(per_worker_samples, duration_seconds, concurrent_users, target_rps)
+    
+    def _summarize_throughput(self, per_worker_samples: List[Tuple[array, array, array]], duration_seconds: int,
+                              concurrent_users: int, target_rps: Optional[float] = None) -> Dict[str, Any]:
+        """汇总各协程的样本数组，计算吞吐量和延迟统计"""
+        # 合并各协程的样本数组
+        timestamps_ns = array('q')
+        latencies_ns = array('q')
+        statuses = array('H')
+        for worker_timestamps, worker_latencies, worker_statuses in per_worker_samples:
+            timestamps_ns.extend(worker_timestamps)
+            latencies_ns.extend(worker_latencies)
+            statuses.extend(worker_statuses)
+        
+        # 分析结果：一次遍历筛出成功请求的延迟，同时按请求开始时间统计每秒成功数
+        total_requests = len(statuses)
+        successful_latencies = array('q')
+        rps_buckets = [0] * max(duration_seconds, 1)
+        if total_requests:
+            start_ns = min(timestamps_ns)
+            last_bucket = len(rps_buckets) - 1
+            for timestamp, latency, status in zip(timestamps_ns, latencies_ns, statuses):
+                if 0 < status < 400:
+                    successful_latencies.append(latency)
+                    rps_buckets[min((timestamp - start_ns) // NS_PER_SECOND, last_bucket)] += 1
+        successful_requests = len(successful_latencies)
         failed_requests = total_requests - successful_requests
         
         if successful_requests > 0:
-            avg_response_time = statistics.mean([r['response_time'] for r in results if r.get('success', False)])
+            avg_response_time = sum(successful_latencies) / successful_requests / NS_PER_SECOND
             throughput = successful_requests / duration_seconds
+            sorted_latencies = sorted(successful_latencies)
+            percentiles = {
+                f'p{q}_response_time': latency_percentile(sorted_latencies, q) / NS_PER_SECOND
+                for q in (50, 95, 99)
+            }
         else:
             avg_response_time = 0
             throughput = 0
+            percentiles = dict.fromkeys(('p50_response_time', 'p95_response_time', 'p99_response_time'), 0)
+        
+        # 峰值/稳态吞吐量：稳态去掉首尾各2秒的预热和收尾阶段
+        peak_rps = max(rps_buckets)
+        steady_buckets = rps_buckets[2:-2] if len(rps_buckets) > 4 else rps_buckets
+        steady_rps = sum(steady_buckets) / len(steady_buckets)
         
         return {
             'total_requests': total_requests,
@@ -142,67 +304,148 @@ class PerformanceBenchmarkTester:
             'failed_requests': failed_requests,
             'success_rate': successful_requests / total_requests if total_requests > 0 else 0,
             'avg_response_time': avg_response_time,
+            **percentiles,
             'throughput': throughput,
+            'peak_rps': peak_rps,
+            'steady_rps': steady_rps,
+            'time_to_peak': rps_buckets.index(peak_rps),
+            'rps_per_second': rps_buckets,
             'duration': duration_seconds,
             'concurrent_users': concurrent_users,
-            'raw_results': results
+            'target_rps': target_rps,
+            'samples': {
+                'timestamp_ns': timestamps_ns,
+                'latency_ns': latencies_ns,
+                'status': statuses
+            }
         }
     
-    def monitor_resource_usage(self, duration_seconds: int, interval_seconds: int = 1) -> List[Dict[str, Any]]:
-        """监控系统资源使用情况"""
-        resource_data = []
-        start_time = time.time()
+    async def _fetch_api_resources(self, time_bucket: int) -> Dict[str, Any]:
+        """获取API服务器资源信息，同一时间窗口（time_bucket）内复用上次结果"""
+        cached_bucket, cached_resources = self._api_resources_cache
+        if cached_bucket == time_bucket:
+            return cached_resources
+        
+        api_resources = {}
+        try:
+            async with self._get_async_client().get(
+                f"{self.api_base_url}/system/resources", timeout=aiohttp.ClientTimeout(total=2)
+            ) as response:
+                if response.status == 200:
+                    api_resources = await response.json()
+        except Exception:
+            pass
+        
+        self._api_resources_cache = (time_bucket, api_resources)
+        return api_resources
+    
+    async def _monitor_resource_usage_async(self, duration_seconds: int, interval_seconds: int) -> Dict[str, Any]:
+        """在事件循环中按固定间隔采样资源使用情况"""
+        resource_data = {
+            'timestamp_ns': array('q'),
+            'system_cpu_percent': array('d'),
+            'system_memory_percent': array('d'),
+            'system_disk_percent': array('d'),
+            'api_cpu_percent': array('d'),
+            'api_memory_percent': array('d'),
+            'api_active_tasks': array('l'),
+            'errors': 0
+        }
         
-        while time.time() - start_time < duration_seconds:
+        # 预热一次，之后以非阻塞方式读取两次调用之间的CPU使用率
+        psutil.cpu_percent(interval=None)
+        # 磁盘使用率在短时间内几乎不变，先取一次基线，之后按采样次数定期刷新
+        disk_percent = None
+        sample_index = 0
+        
+        # 按事件循环的单调时钟排定采样时刻，避免 sleep 累积漂移
+        loop = asyncio.get_running_loop()
+        start_time = loop.time()
+        deadline = start_time + duration_seconds
+        next_sample = start_time + interval_seconds
+        
+        while next_sample <= deadline:
+            await asyncio.sleep(max(0.0, next_sample - loop.time()))
+            next_sample += interval_seconds
+            
             try:
                 # 获取系统资源信息
-                cpu_percent = psutil.cpu_percent(interval=0.1)
+                cpu_percent = psutil.cpu_percent(interval=None)
                 memory = psutil.virtual_memory()
-                disk = psutil.disk_usage('/')
+                if disk_percent is None or sample_index % DISK_USAGE_REFRESH_SAMPLES == 0:
+                    disk = psutil.disk_usage('/')
+                    disk_percent = (disk.used / disk.total) * 100
+                sample_index += 1
                 
-                # 获取API服务器资源信息
-                try:
-                    response = self.session.get(f"{self.api_base_url}/system/resources", timeout=2)
-                    if response.status_code == 200:
-                        api_resources = response.json()
-                    else:
-                        api_resources = {}
-                except:
-                    api_resources = {}
+                # 获取API服务器资源信息（按时间窗口缓存）
+                api_resources = await self._fetch_api_resources(int(loop.time() // API_RESOURCES_CACHE_SECONDS))
                 
-                resource_data.append({
-                    'timestamp': time.time(),
-                    'system_cpu_percent': cpu_percent,
-                    'system_memory_percent': memory.percent,
-                    'system_disk_percent': (disk.used / disk.total) * 100,
-                    'api_cpu_percent': api_resources.get('cpu_percent', 0),
-                    'api_memory_percent': api_resources.get('memory_percent', 0),
-                    'api_active_tasks': api_resources.get('active_tasks', 0)
-                })
+                resource_data['timestamp_ns'].append(time.perf_counter_ns())
+                resource_data['system_cpu_percent'].append(cpu_percent)
+                resource_data['system_memory_percent'].append(memory.percent)
+                resource_data['system_disk_percent'].append(disk_percent)
+                resource_data['api_cpu_percent'].append(api_resources.get('cpu_percent', 0))
+                resource_data['api_memory_percent'].append(api_resources.get('memory_percent', 0))
+                resource_data['api_active_tasks'].append(api_resources.get('active_tasks', 0))
                 
-            except Exception as e:
-                resource_data.append({
-                    'timestamp': time.time(),
-                    'error': str(e)
-                })
-            
-            time.sleep(interval_seconds)
+            except Exception:
+                resource_data['errors'] += 1
         
         return resource_data
-
-class TestResponseTimePerformance(unittest.TestCase):
-    """响应时间性能测试"""
     
-    def setUp(self):
-        """测试前的设置"""
-        self.tester = PerformanceBenchmarkTester()
+    def monitor_resource_usage(self, duration_seconds: int, interval_seconds: int = 1) -> Dict[str, Any]:
+        """监控系统资源使用情况
         
-        if not self.tester.check_api_availability():
-            self.skipTest("API服务不可用")
+        每个指标一个数组（按列存储），返回 {'timestamp_ns': array, ..., 'errors': int}
+        """
+        return self._loop.run_until_complete(
+            self._monitor_resource_usage_async(duration_seconds, interval_seconds)
+        )
+    
+    def measure_throughput_with_monitoring(self, endpoint: str, method: str, data: Optional[dict], duration_seconds: int,
+                                           concurrent_users: int, monitor_seconds: int, interval_seconds: int = 1,
+                                           load_delay_seconds: float = 0, target_rps: Optional[float] = None
+                                           ) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+        """在同一个事件循环上同时运行资源监控和负载测试
+        
+        负载测试在监控开始 load_delay_seconds 秒后启动，返回 (吞吐量结果, 资源监控数据)
+        """
+        async def run_load_test() -> List[Tuple[array, array, array]]:
+            await asyncio.sleep(load_delay_seconds)
+            return await self._run_throughput_workers(
+                f"{self.api_base_url}{endpoint}", method, data, duration_seconds, concurrent_users, target_rps
+            )
+        
+        async def run_all() -> List[Any]:
+            return await asyncio.gather(
+                run_load_test(),
+                self._monitor_resource_usage_async(monitor_seconds, interval_seconds)
+            )
+        
+        per_worker_samples, resource_data = self._loop.run_until_complete(run_all())
+        return (self._summarize_throughput(per_worker_samples, duration_seconds, concurrent_users, target_rps),
+                resource_data)
+
+class _BenchmarkTestBase(unittest.TestCase):
+    """性能测试基类：同一测试类的所有测试共享一个测试器及其连接池"""
     
-    def tearDown(self):
-        """测试后的清理"""
-        self.tester.cleanup()
+    @classmethod
+    def setUpClass(cls):
+        """测试类开始前的设置"""
+        cls.tester = PerformanceBenchmarkTester()
+        
+        if not cls.tester.check_api_availability():
+            cls.tester.close()
+            raise unittest.SkipTest("API服务不可用")
+    
+    @classmethod
+    def tearDownClass(cls):
+        """测试类结束后的清理"""
+        cls.tester.cleanup()
+        cls.tester.close()
+
+class TestResponseTimePerformance(_BenchmarkTestBase):
+    """响应时间性能测试"""
     
     def test_api_endpoint_response_times(self):
         """测试各API端点的响应时间"""
@@ -227,38 +470,32 @@ class TestResponseTimePerformance(unittest.TestCase):
         for endpoint_config in endpoints:
             print(f"   📊 测试 {endpoint_config['name']}...")
             
-            # 进行多次测试取平均值
+            # 每个端点只绑定一次请求调用；并发进行多次测试取平均值，由连接池复用keep-alive连接
+            send = self.tester.bind_request(
+                endpoint_config['endpoint'], endpoint_config['method'], endpoint_config.get('data')
+            )
+            parse_json = endpoint_config['method'] == 'POST'
+            results = list(self.tester.executor.map(
+                lambda _: self.tester.measure_call(send, parse_json),
+                range(RESPONSE_TIME_SAMPLES)
+            ))
+            
             times = []
-            for i in range(5):
-                result = self.tester.measure_response_time(
-                    endpoint_config['endpoint'],
-                    endpoint_config['method'],
-                    endpoint_config.get('data')
-                )
-                
+            for i, result in enumerate(results):
                 if result['success']:
-                    times.append(result['response_time'])
+                    times.append(result['response_time_ns'])
                     if result.get('status_code') == 200 and endpoint_config['method'] == 'POST':
-                        # 如果是POST请求且成功，记录任务ID以便清理
-                        try:
-                            response_data = self.tester.session.get(
-                                f"{self.tester.api_base_url}{endpoint_config['endpoint']}",
-                                json=endpoint_config.get('data')
-                            ).json()
-                            task_id = response_data.get('task_id')
-                            if task_id:
-                                self.tester.test_tasks.append(task_id)
-                        except:
-                            pass
+                        # 如果是POST请求且成功，从响应体中记录任务ID以便清理
+                        task_id = (result.get('body') or {}).get('task_id')
+                        if task_id:
+                            self.tester.test_tasks.add(task_id)
                 else:
                     print(f"      ⚠️ 第{i+1}次请求失败: {result.get('error')}")
-                
-                time.sleep(0.5)  # 短暂休息
             
             if times:
-                avg_time = statistics.mean(times)
-                min_time = min(times)
-                max_time = max(times)
+                avg_time = statistics.mean(times) / NS_PER_SECOND
+                min_time = min(times) / NS_PER_SECOND
+                max_time = max(times) / NS_PER_SECOND
                 
                 response_times[endpoint_config['name']] = {
                     'avg': avg_time,
@@ -277,23 +514,13 @@ class TestResponseTimePerformance(unittest.TestCase):
         
         print("   🎉 响应时间测试完成")
 
-class TestThroughputPerformance(unittest.TestCase):
+class TestThroughputPerformance(_BenchmarkTestBase):
     """吞吐量性能测试"""
     
-    def setUp(self):
-        """测试前的设置"""
-        self.tester = PerformanceBenchmarkTester()
-        
-        if not self.tester.check_api_availability():
-            self.skipTest("API服务不可用")
-    
-    def tearDown(self):
-        """测试后的清理"""
-        self.tester.cleanup()
-    
     def test_health_check_throughput(self):
         """测试健康检查端点的吞吐量"""
         print("\n🚀 测试健康检查吞吐量...")
+        print("   ℹ️ 开环模式：各并发用户不间断发送请求，吞吐量反映服务端处理上限")
         
         # 测试不同并发级别
         concurrency_levels = [1, 5, 10]
@@ -303,13 +530,15 @@ class TestThroughputPerformance(unittest.TestCase):
             print(f"   📊 测试并发用户数: {concurrent_users}")
             
             result = self.tester.measure_throughput(
-                '/health', 'GET', None, duration, concurrent_users
+                '/health', HEALTH_PROBE_METHOD, None, duration, concurrent_users
             )
             
             print(f"      总请求数: {result['total_requests']}")
             print(f"      成功率: {result['success_rate']:.2%}")
             print(f"      吞吐量: {result['throughput']:.2f} 请求/秒")
             print(f"      平均响应时间: {result['avg_response_time']:.3f}秒")
+            print(f"      P50/P95/P99: {result['p50_response_time']:.3f}/"
+                  f"{result['p95_response_time']:.3f}/{result['p99_response_time']:.3f}秒")
             
             # 验证基本性能指标
             self.assertGreater(result['success_rate'], 0.8, "健康检查成功率应大于80%")
@@ -330,7 +559,8 @@ class TestThroughputPerformance(unittest.TestCase):
             'POST', 
             {'video_url': self.tester.test_video_url},
             20,  # 20秒测试
-            3    # 3个并发用户
+            3,   # 3个并发用户
+            target_rps=30  # 定速提交，避免开环模式下创建过多任务
         )
         
         print(f"      总请求数: {result['total_requests']}")
@@ -345,20 +575,9 @@ class TestThroughputPerformance(unittest.TestCase):
         
         print("   🎉 视频处理吞吐量测试完成")
 
-class TestResourceUsagePerformance(unittest.TestCase):
+class TestResourceUsagePerformance(_BenchmarkTestBase):
     """资源使用性能测试"""
     
-    def setUp(self):
-        """测试前的设置"""
-        self.tester = PerformanceBenchmarkTester()
-        
-        if not self.tester.check_api_availability():
-            self.skipTest("API服务不可用")
-    
-    def tearDown(self):
-        """测试后的清理"""
-        self.tester.cleanup()
-    
     def test_resource_usage_under_load(self):
         """测试负载下的资源使用情况"""
         print("\n💻 测试负载下的资源使用...")
@@ -366,66 +585,40 @@ class TestResourceUsagePerformance(unittest.TestCase):
         # 启动资源监控
         print("   📊 启动资源监控...")
         
-        def run_load_test():
-            """运行负载测试"""
-            return self.tester.measure_throughput(
-                '/health', 'GET', None, 30, 5
-            )
-        
-        # 同时运行负载测试和资源监控
-        with concurrent.futures.ThreadPoolExecutor(max_workers=2) as executor:
-            # 启动资源监控
-            resource_future = executor.submit(self.tester.monitor_resource_usage, 35, 2)
-            
-            # 等待2秒后启动负载测试
-            time.sleep(2)
-            load_future = executor.submit(run_load_test)
-            
-            # 获取结果
-            load_result = load_future.result()
-            resource_data = resource_future.result()
+        # 在同一个事件循环上同时运行资源监控（35秒，每2秒采样）和负载测试（2秒后启动，持续30秒）；
+        # 负载定速为50请求/秒，避免本机压测客户端自身占满CPU
+        load_result, resource_data = self.tester.measure_throughput_with_monitoring(
+            '/health', HEALTH_PROBE_METHOD, None, 30, 5,
+            monitor_seconds=35, interval_seconds=2, load_delay_seconds=2, target_rps=50
+        )
         
         # 分析资源使用情况
         print("   📈 分析资源使用情况...")
         
-        valid_resource_data = [r for r in resource_data if 'error' not in r]
+        cpu_values = resource_data['system_cpu_percent']
+        memory_values = resource_data['system_memory_percent']
         
-        if valid_resource_data:
-            cpu_values = [r.get('system_cpu_percent', 0) for r in valid_resource_data]
-            memory_values = [r.get('system_memory_percent', 0) for r in valid_resource_data]
+        if cpu_values and memory_values:
+            avg_cpu = statistics.mean(cpu_values)
+            max_cpu = max(cpu_values)
+            avg_memory = statistics.mean(memory_values)
+            max_memory = max(memory_values)
             
-            if cpu_values and memory_values:
-                avg_cpu = statistics.mean(cpu_values)
-                max_cpu = max(cpu_values)
-                avg_memory = statistics.mean(memory_values)
-                max_memory = max(memory_values)
-                
-                print(f"      平均CPU使用率: {avg_cpu:.1f}%")
-                print(f"      最大CPU使用率: {max_cpu:.1f}%")
-                print(f"      平均内存使用率: {avg_memory:.1f}%")
-                print(f"      最大内存使用率: {max_memory:.1f}%")
-                
-                # 验证资源使用在合理范围内
-                self.assertLess(max_cpu, 95.0, "CPU使用率不应超过95%")
-                self.assertLess(max_memory, 90.0, "内存使用率不应超过90%")
+            print(f"      平均CPU使用率: {avg_cpu:.1f}%")
+            print(f"      最大CPU使用率: {max_cpu:.1f}%")
+            print(f"      平均内存使用率: {avg_memory:.1f}%")
+            print(f"      最大内存使用率: {max_memory:.1f}%")
+            
+            # 验证资源使用在合理范围内
+            self.assertLess(max_cpu, 95.0, "CPU使用率不应超过95%")
+            self.assertLess(max_memory, 90.0, "内存使用率不应超过90%")
         
         print(f"   🚀 负载测试结果: {load_result['throughput']:.2f} 请求/秒")
         print("   🎉 资源使用性能测试完成")
 
-class TestScalabilityPerformance(unittest.TestCase):
+class TestScalabilityPerformance(_BenchmarkTestBase):
     """可扩展性性能测试"""
     
-    def setUp(self):
-        """测试前的设置"""
-        self.tester = PerformanceBenchmarkTester()
-        
-        if not self.tester.check_api_availability():
-            self.skipTest("API服务不可用")
-    
-    def tearDown(self):
-        """测试后的清理"""
-        self.tester.cleanup()
-    
     def test_concurrent_user_scalability(self):
         """测试并发用户可扩展性"""
         print("\n📈 测试并发用户可扩展性...")
@@ -440,21 +633,25 @@ class TestScalabilityPerformance(unittest.TestCase):
             print(f"   👥 测试并发用户数: {concurrent_users}")
             
             result = self.tester.measure_throughput(
-                '/health', 'GET', None, duration, concurrent_users
+                '/health', HEALTH_PROBE_METHOD, None, duration, concurrent_users
             )
             
             scalability_results[concurrent_users] = {
                 'throughput': result['throughput'],
+                'peak_rps': result['peak_rps'],
+                'steady_rps': result['steady_rps'],
                 'success_rate': result['success_rate'],
                 'avg_response_time': result['avg_response_time']
             }
             
             print(f"      吞吐量: {result['throughput']:.2f} 请求/秒")
+            print(f"      峰值/稳态: {result['peak_rps']} / {result['steady_rps']:.2f} 请求/秒"
+                  f"（第{result['time_to_peak']}秒达到峰值）")
             print(f"      成功率: {result['success_rate']:.2%}")
             print(f"      平均响应时间: {result['avg_response_time']:.3f}秒")
             
-            # 短暂休息让系统恢复
-            time.sleep(5)
+            # 短暂休息让系统恢复；连接池保持keep-alive，无需等待连接释放
+            time.sleep(1)
         
         # 分析可扩展性
         print("   📊 可扩展性分析:")
@@ -5,284 +5,321 @@
 """
 
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 import time
-import json
-from typing import Dict, Any
+import concurrent.futures
+import functools
+import sys
+import threading
+from datetime import datetime
+from io import StringIO
+from typing import Callable, Dict, Any, Optional, Union
+
+from json_helpers import json_loads  # 安装了 orjson 时使用 orjson
+
+# 性能统计响应结构：顶层字段及 data 中必须包含的各部分
+STATS_SCHEMA = {
+    "type": "object",
+    "required": ["status", "data", "timestamp"],
+    "properties": {
+        "data": {
+            "type": "object",
+            "required": ["cache_stats", "hardware_info", "memory_stats"],
+        },
+    },
+}
+
+try:
+    import fastjsonschema  # 可选：预编译的JSON Schema校验器
+    SchemaValidationError = fastjsonschema.JsonSchemaException
+    validate_stats = fastjsonschema.compile(STATS_SCHEMA)
+except ImportError:
+    class SchemaValidationError(ValueError):
+        """响应结构不符合Schema"""
+    
+    def _validate_required(data: Any, schema: Dict[str, Any], path: str = "data"):
+        """按Schema中的 required/properties 递归检查必需字段（未安装 fastjsonschema 时使用）"""
+        if not isinstance(data, dict):
+            raise SchemaValidationError(f"{path} 不是对象")
+        for field in schema.get("required", ()):
+            if field not in data:
+                raise SchemaValidationError(f"{path} 缺少字段: {field}")
+        for field, sub_schema in schema.get("properties", {}).items():
+            if field in data:
+                _validate_required(data[field], sub_schema, f"{path}.{field}")
+    
+    validate_stats = functools.partial(_validate_required, schema=STATS_SCHEMA)
+
+# 性能优化相关端点: 名称 -> 路径
+ENDPOINT_PATHS = {
+    'health': '/health',
+    'stats': '/system/performance/stats',
+    'cache_stats': '/system/performance/cache/stats',
+    'hardware': '/system/performance/hardware',
+    'memory': '/system/performance/memory',
+    'memory_cleanup': '/system/performance/memory/cleanup',
+    'cache_clear': '/system/performance/cache/clear',
+    'optimize': '/system/performance/optimize',
+}
+
+def parse_timestamp(value: Union[int, float, str]) -> float:
+    """将响应中的 timestamp 转换为Unix时间戳
+    
+    性能端点返回 time.time() 数值，/health 返回ISO-8601字符串（以Z结尾）
+    """
+    if isinstance(value, (int, float)):
+        return float(value)
+    return datetime.fromisoformat(value.replace('Z', '+00:00')).timestamp()
+
+def endpoint_test(func):
+    """端点测试装饰器：统一捕获异常并输出失败信息，返回 False
+    
+    被装饰方法的第一个参数为测试名称；测试过程中的输出先写入本线程的缓冲区，
+    结束后一次性写到标准输出，并发执行时不会交错
+    """
+    @functools.wraps(func)
+    def wrapper(self, label: str, *args, **kwargs):
+        buffer = StringIO()
+        self._local.out = buffer
+        try:
+            return func(self, label, *args, **kwargs)
+        except Exception as e:
+            buffer.write(f"   ❌ {label}测试失败: {str(e)}\n")
+            return False
+        finally:
+            self._local.out = None
+            sys.stdout.write(buffer.getvalue())
+            sys.stdout.flush()
+    return wrapper
+
+def _render_stats(tester: "PerformanceIntegrationTester", data: Dict[str, Any], before: Optional[Dict[str, Any]]) -> bool:
+    """校验并显示性能统计"""
+    # 验证响应结构
+    try:
+        validate_stats(data)
+    except SchemaValidationError as e:
+        tester._log(f"   ❌ 响应结构无效: {e}")
+        return False
+    
+    performance_data = data['data']
+    tester.stats_timestamp = parse_timestamp(data['timestamp'])
+    
+    # 显示统计信息
+    cache_stats = performance_data['cache_stats']
+    hardware_info = performance_data['hardware_info']
+    memory_stats = performance_data['memory_stats']
+    
+    tester._log(f"   📊 缓存统计:")
+    tester._log(f"      - 缓存项数: {cache_stats['total_items']}")
+    tester._log(f"      - 缓存大小: {cache_stats['total_size_mb']:.2f}MB")
+    tester._log(f"      - 使用率: {cache_stats['usage_percent']:.1f}%")
+    
+    tester._log(f"   📊 硬件信息:")
+    tester._log(f"      - 可用编码器: {len(hardware_info['available_encoders'])}")
+    tester._log(f"      - 首选编码器: {hardware_info['preferred_encoder']}")
+    tester._log(f"      - 硬件加速: {'是' if hardware_info['has_hardware_acceleration'] else '否'}")
+    
+    tester._log(f"   📊 内存统计:")
+    memory_info = memory_stats['memory_info']
+    tester._log(f"      - 内存使用率: {memory_info['used_percent']:.1f}%")
+    tester._log(f"      - 可用内存: {memory_info['available_gb']:.1f}GB")
+    return True
+
+def _render_cache_stats(tester: "PerformanceIntegrationTester", data: Dict[str, Any], before: Optional[Dict[str, Any]]) -> bool:
+    """显示缓存统计"""
+    cache_stats = data['data']
+    
+    tester._log(f"   📊 缓存详细统计:")
+    tester._log(f"      - 总项目数: {cache_stats['total_items']}")
+    tester._log(f"      - 总大小: {cache_stats['total_size_mb']:.2f}MB")
+    tester._log(f"      - 最大大小: {cache_stats['max_size_mb']:.2f}MB")
+    tester._log(f"      - 使用率: {cache_stats['usage_percent']:.1f}%")
+    tester._log(f"      - 缓存目录: {cache_stats['cache_dir']}")
+    
+    if cache_stats['items_by_type']:
+        tester._log(f"      - 按类型分布:")
+        for item_type, stats in cache_stats['items_by_type'].items():
+            tester._log(f"        * {item_type}: {stats['count']}项, {stats['size_mb']:.2f}MB")
+    return True
+
+def _render_hardware(tester: "PerformanceIntegrationTester", data: Dict[str, Any], before: Optional[Dict[str, Any]]) -> bool:
+    """显示硬件加速信息"""
+    hardware_info = data['data']
+    
+    tester._log(f"   🔧 硬件加速信息:")
+    tester._log(f"      - 硬件加速支持: {'是' if hardware_info['has_hardware_acceleration'] else '否'}")
+    tester._log(f"      - 首选编码器: {hardware_info['preferred_encoder']}")
+    tester._log(f"      - 可用编码器列表:")
+    
+    for encoder in hardware_info['available_encoders']:
+        encoder_details = hardware_info['encoder_details'].get(encoder, {})
+        encoder_type = encoder_details.get('type', 'unknown')
+        codec = encoder_details.get('codec', 'unknown')
+        tester._log(f"        * {encoder} ({encoder_type}, {codec})")
+    return True
+
+def _render_memory(tester: "PerformanceIntegrationTester", data: Dict[str, Any], before: Optional[Dict[str, Any]]) -> bool:
+    """显示内存优化统计"""
+    memory_stats = data['data']
+    
+    tester._log(f"   💾 内存优化统计:")
+    memory_info = memory_stats['memory_info']
+    tester._log(f"      - 总内存: {memory_info['total_gb']:.1f}GB")
+    tester._log(f"      - 可用内存: {memory_info['available_gb']:.1f}GB")
+    tester._log(f"      - 使用率: {memory_info['used_percent']:.1f}%")
+    tester._log(f"      - 最大使用率限制: {memory_stats['max_usage_percent']}%")
+    tester._log(f"      - 块大小: {memory_stats['chunk_size_mb']}MB")
+    tester._log(f"      - 临时目录: {memory_stats['temp_dir']}")
+    tester._log(f"      - 内存可用: {'是' if memory_stats['is_memory_available'] else '否'}")
+    return True
+
+def _render_memory_cleanup(tester: "PerformanceIntegrationTester", data: Dict[str, Any], before: Optional[Dict[str, Any]]) -> bool:
+    """对比显示内存清理前后的使用率"""
+    before_usage = before['data']['memory_info']['used_percent']
+    after_usage = data['data']['memory_info']['used_percent']
+    
+    tester._log(f"   🧹 内存清理结果:")
+    tester._log(f"      - 清理前使用率: {before_usage:.1f}%")
+    tester._log(f"      - 清理后使用率: {after_usage:.1f}%")
+    tester._log(f"      - 清理效果: {before_usage - after_usage:.1f}%")
+    tester._log(f"      - 状态: {data['status']}")
+    tester._log(f"      - 消息: {data['message']}")
+    return True
+
+def _render_cache_clear(tester: "PerformanceIntegrationTester", data: Dict[str, Any], before: Optional[Dict[str, Any]]) -> bool:
+    """对比显示缓存清理前后的统计"""
+    before_data = before['data']
+    before_items, before_size = before_data['total_items'], before_data['total_size_mb']
+    
+    # 清理后的缓存状态直接取自清理接口的响应；旧版本服务端未返回时再单独查询
+    after_data = data.get('data')
+    if after_data is None:
+        after_response = tester.session.get(tester.urls['cache_stats'], timeout=tester._timeout)
+        after_data = tester._json(after_response)['data']
+    after_items, after_size = after_data['total_items'], after_data['total_size_mb']
+    
+    tester._log(f"   🗑️ 缓存清理结果:")
+    tester._log(f"      - 清理前项目数: {before_items}")
+    tester._log(f"      - 清理后项目数: {after_items}")
+    tester._log(f"      - 清理前大小: {before_size:.2f}MB")
+    tester._log(f"      - 清理后大小: {after_size:.2f}MB")
+    tester._log(f"      - 状态: {data['status']}")
+    tester._log(f"      - 消息: {data['message']}")
+    return True
+
+def _render_optimization(tester: "PerformanceIntegrationTester", data: Dict[str, Any], before: Optional[Dict[str, Any]]) -> bool:
+    """显示系统优化结果"""
+    tester._log(f"   ⚡ 系统优化结果:")
+    tester._log(f"      - 状态: {data['status']}")
+    tester._log(f"      - 消息: {data['message']}")
+    
+    # 显示优化后的统计信息
+    if 'data' in data:
+        performance_data = data['data']
+        cache_stats = performance_data['cache_stats']
+        memory_stats = performance_data['memory_stats']
+        
+        tester._log(f"      - 优化后缓存使用率: {cache_stats['usage_percent']:.1f}%")
+        tester._log(f"      - 优化后内存使用率: {memory_stats['memory_info']['used_percent']:.1f}%")
+    return True
+
+# 端点测试表: (测试名称, HTTP方法, 端点名称, 执行前需记录状态的端点名称, 结果校验/显示函数)
+# GET 端点只读，可并发探测；POST 端点会修改服务端状态，按表中顺序串行执行
+ENDPOINTS = [
+    ("性能统计端点", 'GET', 'stats', None, _render_stats),
+    ("缓存统计端点", 'GET', 'cache_stats', None, _render_cache_stats),
+    ("硬件信息端点", 'GET', 'hardware', None, _render_hardware),
+    ("内存统计端点", 'GET', 'memory', None, _render_memory),
+    ("内存清理端点", 'POST', 'memory_cleanup', 'memory', _render_memory_cleanup),
+    ("缓存清理端点", 'POST', 'cache_clear', 'cache_stats', _render_cache_clear),
+    ("系统优化端点", 'POST', 'optimize', None, _render_optimization),
+]
 
 class PerformanceIntegrationTester:
     """性能优化集成测试器"""
     
     def __init__(self, api_base_url: str = "http://localhost:7878"):
         self.api_base_url = api_base_url
+        # 端点URL只在初始化时拼接一次
+        self.urls = {name: f"{api_base_url}{path}" for name, path in ENDPOINT_PATHS.items()}
+        # 每个线程独立的测试输出缓冲区
+        self._local = threading.local()
+        # 性能统计响应中的服务端时间戳（解析一次，供结果摘要使用）
+        self.stats_timestamp: Optional[float] = None
+        # requests 会忽略 Session.timeout，超时 (连接, 读取) 需要在每次请求时传入
+        self._timeout = (3, 30)
         self.session = requests.Session()
-        self.session.timeout = 30
+        self.session.headers.update({'Connection': 'keep-alive', 'Accept-Encoding': 'gzip'})
+        # 所有探测复用同一个连接池；只读端点并发探测时每个端点占用一个连接
+        retry = Retry(total=2, backoff_factor=0.1, status_forcelist=[502, 503, 504])
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=16, max_retries=retry)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+    
+    def _log(self, message: str = ""):
+        """写入当前测试的输出缓冲区（不在端点测试中时直接输出）"""
+        out = getattr(self._local, 'out', None)
+        if out is None:
+            print(message)
+        else:
+            out.write(f"{message}\n")
+    
+    def _json(self, response: requests.Response) -> Any:
+        """解析JSON响应体（安装了 orjson 时直接解析字节内容）"""
+        return json_loads(response.content)
     
     def check_api_availability(self) -> bool:
         """检查API是否可用"""
+        # 只需确认服务存活：HEAD 不传输响应体，短超时让服务未启动时快速失败
         try:
-            response = self.session.get(f"{self.api_base_url}/health")
-            return response.status_code == 200
-        except:
+            response = self.session.head(self.urls['health'], timeout=(2, 2), allow_redirects=False)
+            return 200 <= response.status_code < 400
+        except requests.RequestException:
             return False
     
-    def test_performance_stats_endpoint(self) -> bool:
-        """测试性能统计端点"""
-        print("\n🧪 测试性能统计端点...")
+    @endpoint_test
+    def _probe(self, label: str, method: str, name: str, before_name: Optional[str],
+               render: Callable, response: Optional[requests.Response] = None) -> bool:
+        """通用端点测试：请求端点、检查状态码，再交给 render 校验并显示结果
         
-        try:
-            response = self.session.get(f"{self.api_base_url}/system/performance/stats")
-            
-            if response.status_code != 200:
-                print(f"   ❌ 请求失败: {response.status_code}")
-                return False
-            
-            data = response.json()
-            
-            # 验证响应结构
-            required_fields = ['status', 'data', 'timestamp']
-            for field in required_fields:
-                if field not in data:
-                    print(f"   ❌ 缺少字段: {field}")
-                    return False
-            
-            performance_data = data['data']
-            expected_sections = ['cache_stats', 'hardware_info', 'memory_stats']
-            for section in expected_sections:
-                if section not in performance_data:
-                    print(f"   ❌ 缺少性能数据部分: {section}")
-                    return False
-            
-            # 显示统计信息
-            cache_stats = performance_data['cache_stats']
-            hardware_info = performance_data['hardware_info']
-            memory_stats = performance_data['memory_stats']
-            
-            print(f"   📊 缓存统计:")
-            print(f"      - 缓存项数: {cache_stats['total_items']}")
-            print(f"      - 缓存大小: {cache_stats['total_size_mb']:.2f}MB")
-            print(f"      - 使用率: {cache_stats['usage_percent']:.1f}%")
-            
-            print(f"   📊 硬件信息:")
-            print(f"      - 可用编码器: {len(hardware_info['available_encoders'])}")
-            print(f"      - 首选编码器: {hardware_info['preferred_encoder']}")
-            print(f"      - 硬件加速: {'是' if hardware_info['has_hardware_acceleration'] else '否'}")
-            
-            print(f"   📊 内存统计:")
-            memory_info = memory_stats['memory_info']
-            print(f"      - 内存使用率: {memory_info['used_percent']:.1f}%")
-            print(f"      - 可用内存: {memory_info['available_gb']:.1f}GB")
-            
-            print("   ✅ 性能统计端点测试通过")
-            return True
-            
-        except Exception as e:
-            print(f"   ❌ 测试失败: {str(e)}")
-            return False
-    
-    def test_cache_stats_endpoint(self) -> bool:
-        """测试缓存统计端点"""
-        print("\n🧪 测试缓存统计端点...")
+        before_name 不为空时先请求该端点记录执行前的状态；已预取的只读端点可直接传入 response
+        """
+        self._log(f"\n🧪 测试{label}...")
         
-        try:
-            response = self.session.get(f"{self.api_base_url}/system/performance/cache/stats")
-            
-            if response.status_code != 200:
-                print(f"   ❌ 请求失败: {response.status_code}")
-                return False
-            
-            data = response.json()
-            cache_stats = data['data']
-            
-            print(f"   📊 缓存详细统计:")
-            print(f"      - 总项目数: {cache_stats['total_items']}")
-            print(f"      - 总大小: {cache_stats['total_size_mb']:.2f}MB")
-            print(f"      - 最大大小: {cache_stats['max_size_mb']:.2f}MB")
-            print(f"      - 使用率: {cache_stats['usage_percent']:.1f}%")
-            print(f"      - 缓存目录: {cache_stats['cache_dir']}")
-            
-            if cache_stats['items_by_type']:
-                print(f"      - 按类型分布:")
-                for item_type, stats in cache_stats['items_by_type'].items():
-                    print(f"        * {item_type}: {stats['count']}项, {stats['size_mb']:.2f}MB")
-            
-            print("   ✅ 缓存统计端点测试通过")
-            return True
-            
-        except Exception as e:
-            print(f"   ❌ 测试失败: {str(e)}")
-            return False
-    
-    def test_hardware_info_endpoint(self) -> bool:
-        """测试硬件信息端点"""
-        print("\n🧪 测试硬件信息端点...")
+        before = None
+        if before_name is not None:
+            before = self._json(self.session.get(self.urls[before_name], timeout=self._timeout))
         
-        try:
-            response = self.session.get(f"{self.api_base_url}/system/performance/hardware")
-            
-            if response.status_code != 200:
-                print(f"   ❌ 请求失败: {response.status_code}")
-                return False
-            
-            data = response.json()
-            hardware_info = data['data']
-            
-            print(f"   🔧 硬件加速信息:")
-            print(f"      - 硬件加速支持: {'是' if hardware_info['has_hardware_acceleration'] else '否'}")
-            print(f"      - 首选编码器: {hardware_info['preferred_encoder']}")
-            print(f"      - 可用编码器列表:")
-            
-            for encoder in hardware_info['available_encoders']:
-                encoder_details = hardware_info['encoder_details'].get(encoder, {})
-                encoder_type = encoder_details.get('type', 'unknown')
-                codec = encoder_details.get('codec', 'unknown')
-                print(f"        * {encoder} ({encoder_type}, {codec})")
-            
-            print("   ✅ 硬件信息端点测试通过")
-            return True
-            
-        except Exception as e:
-            print(f"   ❌ 测试失败: {str(e)}")
-            return False
-    
-    def test_memory_stats_endpoint(self) -> bool:
-        """测试内存统计端点"""
-        print("\n🧪 测试内存统计端点...")
+        if response is None:
+            response = self.session.request(method, self.urls[name], timeout=self._timeout)
         
-        try:
-            response = self.session.get(f"{self.api_base_url}/system/performance/memory")
-            
-            if response.status_code != 200:
-                print(f"   ❌ 请求失败: {response.status_code}")
-                return False
-            
-            data = response.json()
-            memory_stats = data['data']
-            
-            print(f"   💾 内存优化统计:")
-            memory_info = memory_stats['memory_info']
-            print(f"      - 总内存: {memory_info['total_gb']:.1f}GB")
-            print(f"      - 可用内存: {memory_info['available_gb']:.1f}GB")
-            print(f"      - 使用率: {memory_info['used_percent']:.1f}%")
-            print(f"      - 最大使用率限制: {memory_stats['max_usage_percent']}%")
-            print(f"      - 块大小: {memory_stats['chunk_size_mb']}MB")
-            print(f"      - 临时目录: {memory_stats['temp_dir']}")
-            print(f"      - 内存可用: {'是' if memory_stats['is_memory_available'] else '否'}")
-            
-            print("   ✅ 内存统计端点测试通过")
-            return True
-            
-        except Exception as e:
-            print(f"   ❌ 测试失败: {str(e)}")
+        if response.status_code != 200:
+            self._log(f"   ❌ 请求失败: {response.status_code}")
             return False
-    
-    def test_memory_cleanup_endpoint(self) -> bool:
-        """测试内存清理端点"""
-        print("\n🧪 测试内存清理端点...")
         
-        try:
-            # 获取清理前的内存状态
-            before_response = self.session.get(f"{self.api_base_url}/system/performance/memory")
-            before_data = before_response.json()['data']
-            before_usage = before_data['memory_info']['used_percent']
-            
-            # 执行内存清理
-            response = self.session.post(f"{self.api_base_url}/system/performance/memory/cleanup")
-            
-            if response.status_code != 200:
-                print(f"   ❌ 请求失败: {response.status_code}")
-                return False
-            
-            data = response.json()
-            after_data = data['data']
-            after_usage = after_data['memory_info']['used_percent']
-            
-            print(f"   🧹 内存清理结果:")
-            print(f"      - 清理前使用率: {before_usage:.1f}%")
-            print(f"      - 清理后使用率: {after_usage:.1f}%")
-            print(f"      - 清理效果: {before_usage - after_usage:.1f}%")
-            print(f"      - 状态: {data['status']}")
-            print(f"      - 消息: {data['message']}")
-            
-            print("   ✅ 内存清理端点测试通过")
-            return True
-            
-        except Exception as e:
-            print(f"   ❌ 测试失败: {str(e)}")
+        if not render(self, self._json(response), before):
             return False
-    
-    def test_system_optimization_endpoint(self) -> bool:
-        """测试系统优化端点"""
-        print("\n🧪 测试系统优化端点...")
         
-        try:
-            response = self.session.post(f"{self.api_base_url}/system/performance/optimize")
-            
-            if response.status_code != 200:
-                print(f"   ❌ 请求失败: {response.status_code}")
-                return False
-            
-            data = response.json()
-            
-            print(f"   ⚡ 系统优化结果:")
-            print(f"      - 状态: {data['status']}")
-            print(f"      - 消息: {data['message']}")
-            
-            # 显示优化后的统计信息
-            if 'data' in data:
-                performance_data = data['data']
-                cache_stats = performance_data['cache_stats']
-                memory_stats = performance_data['memory_stats']
-                
-                print(f"      - 优化后缓存使用率: {cache_stats['usage_percent']:.1f}%")
-                print(f"      - 优化后内存使用率: {memory_stats['memory_info']['used_percent']:.1f}%")
-            
-            print("   ✅ 系统优化端点测试通过")
-            return True
-            
-        except Exception as e:
-            print(f"   ❌ 测试失败: {str(e)}")
-            return False
+        self._log(f"   ✅ {label}测试通过")
+        return True
     
-    def test_cache_clear_endpoint(self) -> bool:
-        """测试缓存清理端点"""
-        print("\n🧪 测试缓存清理端点...")
+    def fetch_read_only_endpoints(self) -> Dict[str, Any]:
+        """并发请求所有只读端点，返回 {端点名称: 响应或异常}
         
-        try:
-            # 获取清理前的缓存状态
-            before_response = self.session.get(f"{self.api_base_url}/system/performance/cache/stats")
-            before_data = before_response.json()['data']
-            before_items = before_data['total_items']
-            before_size = before_data['total_size_mb']
-            
-            # 执行缓存清理
-            response = self.session.post(f"{self.api_base_url}/system/performance/cache/clear")
-            
-            if response.status_code != 200:
-                print(f"   ❌ 请求失败: {response.status_code}")
-                return False
-            
-            data = response.json()
-            
-            # 获取清理后的缓存状态
-            after_response = self.session.get(f"{self.api_base_url}/system/performance/cache/stats")
-            after_data = after_response.json()['data']
-            after_items = after_data['total_items']
-            after_size = after_data['total_size_mb']
-            
-            print(f"   🗑️ 缓存清理结果:")
-            print(f"      - 清理前项目数: {before_items}")
-            print(f"      - 清理后项目数: {after_items}")
-            print(f"      - 清理前大小: {before_size:.2f}MB")
-            print(f"      - 清理后大小: {after_size:.2f}MB")
-            print(f"      - 状态: {data['status']}")
-            print(f"      - 消息: {data['message']}")
-            
-            print("   ✅ 缓存清理端点测试通过")
-            return True
-            
-        except Exception as e:
-            print(f"   ❌ 测试失败: {str(e)}")
-            return False
+        uvicorn 只支持 HTTP/1.1，无法在单个连接上多路复用；每个端点占用连接池中的一个长连接并发请求
+        """
+        names = [name for _, method, name, _, _ in ENDPOINTS if method == 'GET']
+        
+        def fetch(name):
+            try:
+                return self.session.get(self.urls[name], timeout=self._timeout)
+            except Exception as e:
+                return e
+        
+        with concurrent.futures.ThreadPoolExecutor(max_workers=len(names)) as executor:
+            return dict(zip(names, executor.map(fetch, names)))
+
 
 def run_performance_integration_tests():
     """运行性能优化集成测试"""
@@ -298,16 +335,18 @@ def run_performance_integration_tests():
     
     print("✅ API服务可用")
     
-    # 运行测试
-    tests = [
-        ("性能统计端点", tester.test_performance_stats_endpoint),
-        ("缓存统计端点", tester.test_cache_stats_endpoint),
-        ("硬件信息端点", tester.test_hardware_info_endpoint),
-        ("内存统计端点", tester.test_memory_stats_endpoint),
-        ("内存清理端点", tester.test_memory_cleanup_endpoint),
-        ("缓存清理端点", tester.test_cache_clear_endpoint),
-        ("系统优化端点", tester.test_system_optimization_endpoint),
-    ]
+    # 先并发获取只读端点的响应，再逐个校验；会修改服务端状态的端点在只读端点之后串行执行
+    responses = tester.fetch_read_only_endpoints()
+    
+    def make_test(label, method, name, before_name, render):
+        def run():
+            response = responses.get(name)
+            if isinstance(response, Exception):
+                raise response
+            return tester._probe(label, method, name, before_name, render, response)
+        return run
+    
+    tests = [(entry[0], make_test(*entry)) for entry in ENDPOINTS]
     
     passed_tests = 0
     total_tests = len(tests)
@@ -328,6 +367,8 @@ def run_performance_integration_tests():
     print(f"   通过: {passed_tests}")
     print(f"   失败: {total_tests - passed_tests}")
     print(f"   成功率: {(passed_tests/total_tests*100):.1f}%")
+    if tester.stats_timestamp is not None:
+        print(f"   性能统计数据时间: {datetime.fromtimestamp(tester.stats_timestamp):%Y-%m-%d %H:%M:%S}")
     
     if passed_tests == total_tests:
         print("🎉 所有性能优化集成测试通过！")
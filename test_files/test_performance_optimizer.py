@@ -6,9 +6,17 @@
 import unittest
 import tempfile
 import os
+import shutil
+import atexit
+import io
+import sys
+import contextlib
+import concurrent.futures
 import json
 import time
 from pathlib import Path
+from typing import Any, Dict
+from unittest import mock
 from performance_optimizer import (
     CacheManager, 
     HardwareAccelerationDetector, 
@@ -16,26 +24,45 @@ from performance_optimizer import (
     PerformanceOptimizer
 )
 
+# 临时目录在后台线程中删除，不阻塞后续测试；进程退出前等待清理完成
+_cleanup_pool = concurrent.futures.ThreadPoolExecutor(max_workers=2)
+atexit.register(_cleanup_pool.shutdown, wait=True)
+
+# 汇总失败测试时每个异常堆栈显示的行数
+TRACEBACK_PREVIEW_LINES = 5
+
+def _write(path, data: bytes):
+    """直接通过系统调用写入小文件（不经过Python文件对象和缓冲区）"""
+    fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+    try:
+        os.write(fd, data)
+    finally:
+        os.close(fd)
+
 class TestCacheManager(unittest.TestCase):
     """缓存管理器测试"""
     
-    def setUp(self):
-        """测试前的设置"""
-        self.temp_dir = tempfile.mkdtemp()
-        self.cache_manager = CacheManager(
-            cache_dir=os.path.join(self.temp_dir, "cache"),
+    @classmethod
+    def setUpClass(cls):
+        """测试类开始前的设置：缓存目录和测试视频只创建一次（优先放在内存文件系统中）"""
+        shm_dir = '/dev/shm' if os.path.isdir('/dev/shm') else None
+        cls.temp_dir = tempfile.mkdtemp(dir=shm_dir)
+        cls.root = Path(cls.temp_dir)
+        cls.cache_manager = CacheManager(
+            cache_dir=str(cls.root / "cache"),
             max_cache_size_gb=0.1  # 100MB用于测试
         )
         
-        # 创建测试视频文件
-        self.test_video = os.path.join(self.temp_dir, "test_video.mp4")
-        with open(self.test_video, 'wb') as f:
-            f.write(b'fake video content for testing')
+        # 创建测试视频文件（测试只按路径读取，可在各测试间共享）
+        test_video_path = cls.root / "test_video.mp4"
+        _write(test_video_path, b'fake video content for testing')
+        # CacheManager 会把路径写入JSON索引，这里只转换一次字符串
+        cls.test_video = str(test_video_path)
     
-    def tearDown(self):
-        """测试后的清理"""
-        import shutil
-        shutil.rmtree(self.temp_dir, ignore_errors=True)
+    @classmethod
+    def tearDownClass(cls):
+        """测试类结束后的清理（后续测试不会再访问该目录）"""
+        _cleanup_pool.submit(shutil.rmtree, cls.temp_dir, ignore_errors=True)
     
     def test_metadata_cache(self):
         """测试元数据缓存"""
@@ -67,9 +94,9 @@ class TestCacheManager(unittest.TestCase):
         print("\n🧪 测试预处理视频缓存...")
         
         # 创建处理后的视频文件
-        processed_video = os.path.join(self.temp_dir, "processed_video.mp4")
-        with open(processed_video, 'wb') as f:
-            f.write(b'processed video content')
+        processed_video_path = self.root / "processed_video.mp4"
+        _write(processed_video_path, b'processed video content')
+        processed_video = str(processed_video_path)
         
         # 处理参数
         processing_params = {
@@ -93,6 +120,34 @@ class TestCacheManager(unittest.TestCase):
         
         print("   ✅ 预处理视频缓存测试通过")
     
+    def test_processed_video_cache_by_url(self):
+        """测试以URL/视频ID为源的下载缓存及其附带元数据"""
+        print("\n🧪 测试按视频ID寻址的下载缓存...")
+        
+        downloaded_path = self.root / "downloaded_video.webm"
+        _write(downloaded_path, b'downloaded video content')
+        
+        source = "Youtube:dQw4w9WgXcQ"
+        params = {'quality': '720p', 'format': 'webm', 'operation': 'download'}
+        metadata = {'title': 'test', 'actual_resolution': '720p'}
+        
+        self.assertIsNone(self.cache_manager.get_processed_video_cache_item(source, params))
+        
+        self.cache_manager.set_processed_video_cache(
+            source, params, str(downloaded_path), metadata=metadata
+        )
+        
+        cache_item = self.cache_manager.get_processed_video_cache_item(source, params)
+        self.assertIsNotNone(cache_item)
+        self.assertEqual(cache_item['metadata'], metadata)
+        self.assertTrue(cache_item['video_file'].endswith('.webm'))
+        self.assertEqual(Path(cache_item['video_file']).read_bytes(), b'downloaded video content')
+        
+        # 不同参数不应命中
+        self.assertIsNone(self.cache_manager.get_processed_video_cache(source, {**params, 'quality': '480p'}))
+        
+        print("   ✅ 下载缓存测试通过")
+    
     def test_cache_stats(self):
         """测试缓存统计"""
         print("\n🧪 测试缓存统计...")
@@ -108,6 +163,29 @@ class TestCacheManager(unittest.TestCase):
         self.assertIn('total_size_mb', stats)
         self.assertIn('usage_percent', stats)
         self.assertGreater(stats['total_items'], 0)
+        self.assertEqual(stats['total_items'], len(self.cache_manager.cache_index))
+        
+        # 统计由增量计数器得出：重复调用和写入新缓存项都不应遍历缓存目录
+        with mock.patch('os.walk') as walk, \
+                mock.patch('os.scandir') as scandir, \
+                mock.patch.object(Path, 'rglob') as rglob:
+            self.assertEqual(self.cache_manager.get_cache_stats(), stats)
+            
+            self.cache_manager.set_video_metadata_cache(self.test_video, {**test_metadata, 'duration': 61})
+            updated = self.cache_manager.get_cache_stats()
+            self.assertEqual(updated['total_items'], len(self.cache_manager.cache_index))
+            self.assertEqual(self.cache_manager.get_cache_stats(), updated)
+            
+            walk.assert_not_called()
+            scandir.assert_not_called()
+            rglob.assert_not_called()
+        
+        # 修改返回结果（包括嵌套的按类型统计）不应影响之后的统计
+        expected = json.loads(json.dumps(updated))
+        mutated = self.cache_manager.get_cache_stats()
+        mutated['items_by_type'].clear()
+        mutated['total_items'] = -1
+        self.assertEqual(self.cache_manager.get_cache_stats(), expected)
         
         print(f"   📊 缓存项数: {stats['total_items']}")
         print(f"   📊 缓存大小: {stats['total_size_mb']:.2f}MB")
@@ -117,15 +195,17 @@ class TestCacheManager(unittest.TestCase):
 class TestHardwareAccelerationDetector(unittest.TestCase):
     """硬件加速检测器测试"""
     
-    def setUp(self):
-        """测试前的设置"""
-        self.detector = HardwareAccelerationDetector()
+    @classmethod
+    def setUpClass(cls):
+        """测试类开始前的设置：编码器检测需要逐个启动FFmpeg，整个测试类只检测一次"""
+        cls.detector = HardwareAccelerationDetector()
+        cls._hw = cls.detector.get_hardware_info()
     
     def test_hardware_detection(self):
         """测试硬件检测"""
         print("\n🧪 测试硬件加速检测...")
         
-        hardware_info = self.detector.get_hardware_info()
+        hardware_info = self._hw
         
         self.assertIn('available_encoders', hardware_info)
         self.assertIn('has_hardware_acceleration', hardware_info)
@@ -149,6 +229,29 @@ class TestHardwareAccelerationDetector(unittest.TestCase):
             print(f"   ⚙️ {quality} 质量参数: {' '.join(params[:6])}...")
         
         print("   ✅ 编码器参数测试通过")
+    
+    def test_encoder_params_cached(self):
+        """测试编码器参数缓存"""
+        print("\n🧪 测试编码器参数缓存...")
+        
+        # 清空缓存（退出时恢复），统计实际生成参数的次数
+        with mock.patch.dict(self.detector._encoder_params_cache, clear=True), \
+                mock.patch.object(self.detector, '_build_encoder_params',
+                                  wraps=self.detector._build_encoder_params) as build:
+            first = self.detector.get_encoder_params('h264', 'medium')
+            for _ in range(10):
+                params = self.detector.get_encoder_params('h264', 'medium')
+            
+            self.assertEqual(params, first)
+            # 返回的是副本，修改结果不影响缓存
+            params.append('-an')
+            self.assertEqual(self.detector.get_encoder_params('h264', 'medium'), first)
+            
+            # 只有首次调用生成参数，其余全部命中缓存；不同质量单独生成
+            build.assert_called_once_with('h264', 'medium')
+            self.detector.get_encoder_params('h264', 'fast')
+            self.assertEqual(build.call_count, 2)
+        print("   ✅ 编码器参数缓存测试通过")
 
 class TestMemoryOptimizedProcessor(unittest.TestCase):
     """内存优化处理器测试"""
@@ -225,9 +328,8 @@ class TestPerformanceOptimizer(unittest.TestCase):
         )
     
     def tearDown(self):
-        """测试后的清理"""
-        import shutil
-        shutil.rmtree(self.temp_dir, ignore_errors=True)
+        """测试后的清理（每个测试使用独立的临时目录）"""
+        _cleanup_pool.submit(shutil.rmtree, self.temp_dir, ignore_errors=True)
     
     def test_optimization_stats(self):
         """测试优化统计信息"""
@@ -282,14 +384,33 @@ class TestPerformanceOptimizer(unittest.TestCase):
         print(f"   ⚙️ 优化命令: {' '.join(optimized_cmd[:8])}...")
         print("   ✅ FFmpeg命令优化测试通过")
 
+def _run_test_class(test_class) -> Dict[str, Any]:
+    """在独立进程中运行单个测试类，返回可序列化的结果和测试输出
+    
+    运行器本身静默执行（verbosity=0，输出丢弃），失败详情由汇总阶段统一打印
+    """
+    output = io.StringIO()
+    suite = unittest.TestLoader().loadTestsFromTestCase(test_class)
+    with contextlib.redirect_stdout(output):
+        result = unittest.TextTestRunner(verbosity=0, stream=io.StringIO()).run(suite)
+    
+    return {
+        'tests_run': result.testsRun,
+        'failures': [(str(test), traceback) for test, traceback in result.failures],
+        'errors': [(str(test), traceback) for test, traceback in result.errors],
+        'skipped': len(result.skipped),
+        'output': output.getvalue()
+    }
+
+def _traceback_head(traceback: str, max_lines: int = TRACEBACK_PREVIEW_LINES) -> str:
+    """截取异常堆栈的前几行"""
+    return ''.join(traceback.splitlines(keepends=True)[:max_lines]).rstrip()
+
 def run_performance_optimizer_tests():
-    """运行性能优化器测试"""
+    """运行性能优化器测试（各测试类互不共享状态，分别在独立进程中并行运行）"""
     print("🚀 开始运行性能优化器测试")
     print("=" * 60)
     
-    # 创建测试套件
-    test_suite = unittest.TestSuite()
-    
     # 添加测试类
     test_classes = [
         TestCacheManager,
@@ -298,13 +419,21 @@ def run_performance_optimizer_tests():
         TestPerformanceOptimizer
     ]
     
-    for test_class in test_classes:
-        tests = unittest.TestLoader().loadTestsFromTestCase(test_class)
-        test_suite.addTests(tests)
-    
     # 运行测试
-    runner = unittest.TextTestRunner(verbosity=2, stream=sys.stdout)
-    result = runner.run(test_suite)
+    # 进程数不超过CPU核数：各测试类本身是CPU密集的（硬件检测会逐个启动FFmpeg），多开进程只会互相争抢CPU
+    max_workers = min(len(test_classes), os.cpu_count() or 1)
+    with concurrent.futures.ProcessPoolExecutor(max_workers=max_workers) as executor:
+        class_results = list(executor.map(_run_test_class, test_classes))
+    
+    # 按测试类顺序输出各进程的测试日志并汇总结果
+    result = unittest.TestResult()
+    skipped_count = 0
+    for class_result in class_results:
+        sys.stdout.write(class_result['output'])
+        result.testsRun += class_result['tests_run']
+        result.failures.extend(class_result['failures'])
+        result.errors.extend(class_result['errors'])
+        skipped_count += class_result['skipped']
     
     # 输出结果摘要
     print("\n" + "=" * 60)
@@ -313,7 +442,7 @@ def run_performance_optimizer_tests():
     print(f"   成功: {result.testsRun - len(result.failures) - len(result.errors)}")
     print(f"   失败: {len(result.failures)}")
     print(f"   错误: {len(result.errors)}")
-    print(f"   跳过: {len(result.skipped) if hasattr(result, 'skipped') else 0}")
+    print(f"   跳过: {skipped_count}")
     
     if result.wasSuccessful():
         print("🎉 所有性能优化器测试通过！")
@@ -325,11 +454,13 @@ def run_performance_optimizer_tests():
             print("\n❌ 失败的测试:")
             for test, traceback in result.failures:
                 print(f"   - {test}")
+                print(_traceback_head(traceback))
         
         if result.errors:
             print("\n💥 错误的测试:")
             for test, traceback in result.errors:
                 print(f"   - {test}")
+                print(_traceback_head(traceback))
     
     return result.wasSuccessful()
 
@@ -4,25 +4,150 @@
 测试系统资源监控、限制检查和任务管理功能
 """
 
+import asyncio
+import atexit
+import concurrent.futures
+import functools
+import aiohttp
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 import time
-import json
-from typing import Dict, Any
+from typing import Dict, Any, Optional
+from urllib.parse import urlparse
+
+from json_helpers import json_loads  # 安装了 orjson 时使用 orjson
+
+# 请求未指定超时时使用的默认超时（秒），避免单个请求长期占用连接池
+DEFAULT_REQUEST_TIMEOUT = 10
+
+# 资源限制强制执行测试中提交的任务数
+ENFORCEMENT_SUBMISSIONS = 3
+
+# 服务端监控线程约每5秒刷新一次活跃任务数；等待第一个任务被计入的最长时间（秒）及轮询间隔
+ACTIVE_TASKS_REFRESH_TIMEOUT = 12
+ACTIVE_TASKS_POLL_INTERVAL = 0.5
+
+
+def _retry_after_seconds(response) -> float:
+    """解析响应的 Retry-After 头（秒数），缺失或无法解析时返回0"""
+    try:
+        return max(float(response.headers.get("Retry-After", 0)), 0.0)
+    except (TypeError, ValueError):
+        return 0.0
+
+
+# 只读端点（互不依赖，可并发探测）: 名称 -> (路径, 查询参数)
+READ_ONLY_PROBES = {
+    'health': ("/health", None),
+    'stats': ("/system/resources", None),
+    'history': ("/system/resources/history", {"duration_minutes": 5}),
+    'tasks': ("/system/tasks", None),
+}
+
+class TimeoutHTTPAdapter(HTTPAdapter):
+    """为未显式指定超时的请求注入默认超时的连接适配器"""
+    
+    def __init__(self, *args, timeout: float = DEFAULT_REQUEST_TIMEOUT, **kwargs):
+        self.timeout = timeout
+        super().__init__(*args, **kwargs)
+    
+    def send(self, request, **kwargs):
+        if kwargs.get('timeout') is None:
+            kwargs['timeout'] = self.timeout
+        return super().send(request, **kwargs)
 
 class ResourceMonitoringTester:
     """资源监控测试器"""
     
+    # 进程内共享的会话: 服务源(scheme://host:port) -> Session；同一服务的多个测试器复用一个连接池
+    _SESSIONS: Dict[str, requests.Session] = {}
+    
+    @classmethod
+    def _session_for(cls, base_url: str) -> requests.Session:
+        """获取（必要时创建）指定服务源的共享会话"""
+        parsed = urlparse(base_url)
+        origin = f"{parsed.scheme}://{parsed.netloc}"
+        
+        session = cls._SESSIONS.get(origin)
+        if session is None:
+            session = requests.Session()
+            session.headers.update({'Connection': 'keep-alive', 'Accept-Encoding': 'gzip'})
+            # 所有测试复用同一个长连接池，网关类错误自动重试
+            retry = Retry(total=2, backoff_factor=0.2, status_forcelist=[502, 503, 504])
+            adapter = TimeoutHTTPAdapter(pool_connections=4, pool_maxsize=20, max_retries=retry)
+            session.mount("http://", adapter)
+            session.mount("https://", adapter)
+            cls._SESSIONS[origin] = session
+        return session
+    
+    @classmethod
+    def close_sessions(cls):
+        """关闭所有共享会话的连接"""
+        for session in cls._SESSIONS.values():
+            session.close()
+        cls._SESSIONS.clear()
+    
     def __init__(self, base_url: str = "http://localhost:8000"):
         self.base_url = base_url
-        self.session = requests.Session()
+        self.session = type(self)._session_for(base_url)
+        # 测试开始前的资源限制（修改限制的测试据此恢复），首次需要时获取
+        self._baseline_limits: Optional[Dict[str, Any]] = None
+    
+    def _fetch_limits(self, stats: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """获取测试前的资源限制，只请求一次
+        
+        测试修改限制后都会恢复为这些值，因此缓存在整个测试过程中保持有效；
+        max_concurrent_tasks 位于资源统计的顶层，这里与 limits 合并返回
+        """
+        if self._baseline_limits is None:
+            if stats is None:
+                stats = self._get_json("/system/resources")
+            self._baseline_limits = {
+                **stats.get('limits', {}),
+                'max_concurrent_tasks': stats.get('max_concurrent_tasks', 3)
+            }
+        return self._baseline_limits
+    
+    def _get_json(self, path: str, prefetched: Any = None, params: Optional[Dict[str, Any]] = None) -> Any:
+        """获取端点的JSON数据；已并发预取的结果直接使用（预取失败时抛出原异常）"""
+        if isinstance(prefetched, Exception):
+            raise prefetched
+        if prefetched is not None:
+            return prefetched
+        
+        response = self.session.get(f"{self.base_url}{path}", params=params)
+        response.raise_for_status()
+        return json_loads(response.content)
+    
+    async def _fetch_read_only_async(self) -> Dict[str, Any]:
+        """在同一个 aiohttp 会话中并发请求所有只读端点"""
+        connector = aiohttp.TCPConnector(limit=20, keepalive_timeout=60)
+        timeout = aiohttp.ClientTimeout(total=DEFAULT_REQUEST_TIMEOUT)
+        
+        async with aiohttp.ClientSession(connector=connector, timeout=timeout) as session:
+            async def fetch(path, params):
+                query = {key: str(value) for key, value in params.items()} if params else None
+                async with session.get(f"{self.base_url}{path}", params=query) as response:
+                    response.raise_for_status()
+                    return json_loads(await response.read())
+            
+            results = await asyncio.gather(
+                *(fetch(path, params) for path, params in READ_ONLY_PROBES.values()),
+                return_exceptions=True
+            )
+        
+        return dict(zip(READ_ONLY_PROBES, results))
     
-    def test_health_check(self) -> Dict[str, Any]:
+    def fetch_read_only_endpoints(self) -> Dict[str, Any]:
+        """并发预取只读端点，返回 {名称: JSON数据或异常}"""
+        return asyncio.run(self._fetch_read_only_async())
+    
+    def test_health_check(self, prefetched: Any = None) -> Dict[str, Any]:
         """测试健康检查端点"""
         print("🔍 测试健康检查端点...")
         try:
-            response = self.session.get(f"{self.base_url}/health")
-            response.raise_for_status()
-            data = response.json()
+            data = self._get_json("/health", prefetched)
             
             print(f"✅ 健康检查成功")
             print(f"   状态: {data.get('status')}")
@@ -38,13 +163,11 @@ class ResourceMonitoringTester:
             print(f"❌ 健康检查失败: {str(e)}")
             return {}
     
-    def test_resource_stats(self) -> Dict[str, Any]:
+    def test_resource_stats(self, prefetched: Any = None) -> Dict[str, Any]:
         """测试资源统计端点"""
         print("\n🔍 测试资源统计端点...")
         try:
-            response = self.session.get(f"{self.base_url}/system/resources")
-            response.raise_for_status()
-            data = response.json()
+            data = self._get_json("/system/resources", prefetched)
             
             print(f"✅ 资源统计获取成功")
             print(f"   CPU使用率: {data.get('cpu_percent', 0):.1f}%")
@@ -67,24 +190,20 @@ class ResourceMonitoringTester:
             print(f"❌ 资源统计获取失败: {str(e)}")
             return {}
     
-    def test_resource_history(self, duration_minutes: int = 5) -> Dict[str, Any]:
+    def test_resource_history(self, duration_minutes: int = 5, prefetched: Any = None) -> Dict[str, Any]:
         """测试资源历史数据端点"""
         print(f"\n🔍 测试资源历史数据端点 (最近{duration_minutes}分钟)...")
         try:
-            response = self.session.get(
-                f"{self.base_url}/system/resources/history",
+            data = self._get_json(
+                "/system/resources/history",
+                prefetched,
                 params={"duration_minutes": duration_minutes}
             )
-            response.raise_for_status()
-            data = response.json()
             
             print(f"✅ 资源历史数据获取成功")
             for resource_type, history in data.items():
-                if history:
-                    latest_value = history[-1][1] if history else 0
-                    print(f"   {resource_type}: {len(history)}个数据点, 最新值: {latest_value}")
-                else:
-                    print(f"   {resource_type}: 无历史数据")
+                count = len(history)
+                print(f"   {resource_type}: " + (f"{count}个数据点, 最新值: {history[-1][1]}" if count else "无历史数据"))
             
             return data
             
@@ -97,10 +216,7 @@ class ResourceMonitoringTester:
         print("\n🔍 测试更新资源限制...")
         try:
             # 先获取当前限制
-            current_response = self.session.get(f"{self.base_url}/system/resources")
-            current_response.raise_for_status()
-            current_data = current_response.json()
-            current_limits = current_data.get('limits', {})
+            current_limits = self._fetch_limits()
             
             # 更新限制（稍微调整一些值）
             new_limits = {
@@ -114,7 +230,7 @@ class ResourceMonitoringTester:
                 params=new_limits
             )
             response.raise_for_status()
-            data = response.json()
+            data = json_loads(response.content)
             
             print(f"✅ 资源限制更新成功")
             print(f"   消息: {data.get('message')}")
@@ -148,7 +264,7 @@ class ResourceMonitoringTester:
         try:
             response = self.session.post(f"{self.base_url}/system/resources/cleanup")
             response.raise_for_status()
-            data = response.json()
+            data = json_loads(response.content)
             
             print(f"✅ 强制资源清理成功")
             print(f"   消息: {data.get('message')}")
@@ -160,14 +276,12 @@ class ResourceMonitoringTester:
             print(f"❌ 强制资源清理失败: {str(e)}")
             return False
     
-    def test_task_management(self) -> bool:
+    def test_task_management(self, prefetched: Any = None) -> bool:
         """测试任务管理功能"""
         print("\n🔍 测试任务管理功能...")
         try:
             # 获取所有任务
-            response = self.session.get(f"{self.base_url}/system/tasks")
-            response.raise_for_status()
-            data = response.json()
+            data = self._get_json("/system/tasks", prefetched)
             
             print(f"✅ 任务列表获取成功")
             summary = data.get('summary', {})
@@ -184,11 +298,22 @@ class ResourceMonitoringTester:
             print(f"❌ 任务管理测试失败: {str(e)}")
             return False
     
-    def test_resource_limits_enforcement(self) -> bool:
-        """测试资源限制强制执行"""
+    def _wait_for_active_tasks(self, minimum: int, timeout: float) -> bool:
+        """轮询资源统计，直到服务端活跃任务数不少于 minimum；超时返回False"""
+        deadline = time.monotonic() + timeout
+        while True:
+            if self._get_json("/system/resources").get('active_tasks', 0) >= minimum:
+                return True
+            if time.monotonic() >= deadline:
+                return False
+            time.sleep(ACTIVE_TASKS_POLL_INTERVAL)
+    
+    def test_resource_limits_enforcement(self) -> Optional[bool]:
+        """测试资源限制强制执行；未观察到拒绝时返回None（无法判定）"""
         print("\n🔍 测试资源限制强制执行...")
         try:
-            # 先设置很低的并发任务限制
+            # 修改前记录原始限制，再设置很低的并发任务限制
+            baseline_limits = self._fetch_limits()
             low_limit = {"max_concurrent_tasks": 1}
             response = self.session.put(
                 f"{self.base_url}/system/resources/limits",
@@ -200,28 +325,50 @@ class ResourceMonitoringTester:
             # 尝试启动多个任务（这里使用一个简单的测试URL）
             test_url = "https://www.youtube.com/watch?v=dQw4w9WgXcQ"  # 经典测试URL
             
-            task_ids = []
-            for i in range(3):
+            def submit(index):
                 try:
-                    task_response = self.session.post(
+                    return self.session.post(
                         f"{self.base_url}/generate_text_from_video",
                         json={"video_url": test_url}
                     )
-                    
-                    if task_response.status_code == 503:
-                        print(f"✅ 第{i+1}个任务被正确拒绝 (资源限制)")
-                        break
-                    elif task_response.status_code == 200:
-                        task_data = task_response.json()
-                        task_ids.append(task_data.get('task_id'))
-                        print(f"✅ 第{i+1}个任务已启动: {task_data.get('task_id')}")
-                    else:
-                        print(f"⚠️ 第{i+1}个任务返回状态码: {task_response.status_code}")
-                        
                 except Exception as e:
-                    print(f"⚠️ 第{i+1}个任务启动异常: {str(e)}")
-                
-                time.sleep(1)  # 短暂等待
+                    return e
+            
+            # 服务端按监控线程刷新的活跃任务数判断是否超限，先提交一个任务并等待其被计入，
+            # 再并发提交其余任务，否则几个请求会在刷新前全部被接受
+            task_responses = [submit(0)]
+            first = task_responses[0]
+            if not isinstance(first, Exception) and first.status_code == 200:
+                if not self._wait_for_active_tasks(1, ACTIVE_TASKS_REFRESH_TIMEOUT):
+                    print(f"⚠️ {ACTIVE_TASKS_REFRESH_TIMEOUT}秒内服务端活跃任务数未计入第1个任务")
+            
+            with concurrent.futures.ThreadPoolExecutor(max_workers=ENFORCEMENT_SUBMISSIONS - 1) as executor:
+                task_responses.extend(executor.map(submit, range(1, ENFORCEMENT_SUBMISSIONS)))
+            
+            task_ids = []
+            rejected = False
+            retry_after = 0.0
+            for i, task_response in enumerate(task_responses):
+                if isinstance(task_response, Exception):
+                    print(f"⚠️ 第{i+1}个任务启动异常: {str(task_response)}")
+                elif task_response.status_code == 503:
+                    rejected = True
+                    retry_after = max(retry_after, _retry_after_seconds(task_response))
+                    print(f"✅ 第{i+1}个任务被正确拒绝 (资源限制)")
+                elif task_response.status_code == 200:
+                    task_data = json_loads(task_response.content)
+                    task_ids.append(task_data.get('task_id'))
+                    print(f"✅ 第{i+1}个任务已启动: {task_data.get('task_id')}")
+                else:
+                    print(f"⚠️ 第{i+1}个任务返回状态码: {task_response.status_code}")
+            
+            if not rejected:
+                # 未触发限制时无法证明限制生效，结果记为无法判定而不是通过
+                print("⚪ 未观察到任务被拒绝，无法判定资源限制是否生效")
+            elif retry_after:
+                # 仅在服务端通过 Retry-After 明确要求时才等待
+                print(f"⏳ 服务端要求 {retry_after:.1f} 秒后重试，等待后再取消任务")
+                time.sleep(retry_after)
             
             # 取消启动的任务
             for task_id in task_ids:
@@ -235,15 +382,15 @@ class ResourceMonitoringTester:
                     print(f"⚠️ 取消任务失败 {task_id}: {str(e)}")
             
             # 恢复原始限制
-            restore_limit = {"max_concurrent_tasks": 3}
+            restore_limit = {"max_concurrent_tasks": baseline_limits['max_concurrent_tasks']}
             restore_response = self.session.put(
                 f"{self.base_url}/system/resources/limits",
                 params=restore_limit
             )
             restore_response.raise_for_status()
-            print(f"✅ 并发限制已恢复: 3个任务")
+            print(f"✅ 并发限制已恢复: {restore_limit['max_concurrent_tasks']}个任务")
             
-            return True
+            return True if rejected else None
             
         except Exception as e:
             print(f"❌ 资源限制强制执行测试失败: {str(e)}")
@@ -254,23 +401,34 @@ class ResourceMonitoringTester:
         print("🚀 开始资源监控功能测试")
         print("=" * 50)
         
+        # 只读端点先并发预取再逐个校验；会修改服务端状态的测试随后串行执行
+        prefetched = self.fetch_read_only_endpoints()
+        if isinstance(prefetched['stats'], dict):
+            # 预取的资源统计同时作为测试前的限制基线，无需再次请求
+            self._fetch_limits(prefetched['stats'])
+        history_minutes = READ_ONLY_PROBES['history'][1]['duration_minutes']
+        
         tests = [
-            ("健康检查", self.test_health_check),
-            ("资源统计", self.test_resource_stats),
-            ("资源历史", self.test_resource_history),
+            ("健康检查", functools.partial(self.test_health_check, prefetched['health'])),
+            ("资源统计", functools.partial(self.test_resource_stats, prefetched['stats'])),
+            ("资源历史", functools.partial(self.test_resource_history, history_minutes, prefetched['history'])),
+            ("任务管理", functools.partial(self.test_task_management, prefetched['tasks'])),
             ("更新资源限制", self.test_update_resource_limits),
             ("强制资源清理", self.test_force_cleanup),
-            ("任务管理", self.test_task_management),
             ("资源限制强制执行", self.test_resource_limits_enforcement)
         ]
         
         passed = 0
+        inconclusive = 0
         total = len(tests)
         
         for test_name, test_func in tests:
             try:
                 result = test_func()
-                if result:
+                if result is None:
+                    inconclusive += 1
+                    print(f"⚪ {test_name} - 无法判定")
+                elif result:
                     passed += 1
                     print(f"✅ {test_name} - 通过")
                 else:
@@ -280,13 +438,29 @@ class ResourceMonitoringTester:
             
             print("-" * 30)
         
-        print(f"\n📊 测试结果: {passed}/{total} 通过")
+        print(f"\n📊 测试结果: {passed}/{total} 通过" + (f"，{inconclusive} 项无法判定" if inconclusive else ""))
         
         if passed == total:
             print("🎉 所有测试通过！资源监控功能正常工作。")
+        elif passed + inconclusive == total:
+            print("⚪ 没有失败的测试，但部分测试无法判定，请在有负载时重新运行。")
         else:
             print("⚠️ 部分测试失败，请检查系统状态。")
 
+atexit.register(ResourceMonitoringTester.close_sessions)
+
+# --test 参数 -> 测试器方法名
+TEST_METHODS = {
+    "health": "test_health_check",
+    "stats": "test_resource_stats",
+    "history": "test_resource_history",
+    "limits": "test_update_resource_limits",
+    "cleanup": "test_force_cleanup",
+    "tasks": "test_task_management",
+    "enforcement": "test_resource_limits_enforcement",
+    "all": "run_all_tests",
+}
+
 def main():
     """主函数"""
     import argparse
@@ -299,7 +473,7 @@ def main():
     )
     parser.add_argument(
         "--test",
-        choices=["health", "stats", "history", "limits", "cleanup", "tasks", "enforcement", "all"],
+        choices=list(TEST_METHODS),
         default="all",
         help="要运行的测试类型"
     )
@@ -307,23 +481,7 @@ def main():
     args = parser.parse_args()
     
     tester = ResourceMonitoringTester(args.url)
-    
-    if args.test == "all":
-        tester.run_all_tests()
-    elif args.test == "health":
-        tester.test_health_check()
-    elif args.test == "stats":
-        tester.test_resource_stats()
-    elif args.test == "history":
-        tester.test_resource_history()
-    elif args.test == "limits":
-        tester.test_update_resource_limits()
-    elif args.test == "cleanup":
-        tester.test_force_cleanup()
-    elif args.test == "tasks":
-        tester.test_task_management()
-    elif args.test == "enforcement":
-        tester.test_resource_limits_enforcement()
+    getattr(tester, TEST_METHODS[args.test])()
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -6,11 +6,47 @@
 import os
 import tempfile
 import asyncio
+import platform
 import sys
+from itertools import islice
 
 # 添加当前目录到路径
 sys.path.append('.')
 
+# 各系统使用的中文字体；系统类型和滤镜模板只在导入时确定一次
+_SYSTEM = platform.system()
+_FONT_NAMES = {
+    'Darwin': "PingFang SC",  # macOS
+    'Linux': "Noto Sans CJK SC",
+}
+_FONT_NAME = _FONT_NAMES.get(_SYSTEM, "Arial Unicode MS")
+_FILTER_TMPL = ("subtitles='{path}':force_style='FontName={font},FontSize=24,"
+                "PrimaryColour=&Hffffff,OutlineColour=&H000000,Outline=2'")
+# 字幕路径在滤镜参数中需要转义的字符（单次遍历完成替换）
+_ESCAPE = str.maketrans({'\\': '\\\\', ':': '\\:', "'": "\\'"})
+
+# 转换结果预览显示的行数
+PREVIEW_LINES = 8
+
+def _read_preview(path, max_lines=PREVIEW_LINES):
+    """逐行读取文件，返回 (前 max_lines 行, 非空行总数)，不把整个文件读入内存
+    
+    在线程中调用，避免阻塞事件循环
+    """
+    with open(path, 'r', encoding='utf-8') as f:
+        preview = [line.rstrip('\n') for line in islice(f, max_lines)]
+        non_empty = sum(1 for line in preview if line.strip())
+        non_empty += sum(1 for line in f if line.strip())
+    return preview, non_empty
+
+def _remove_file(path):
+    """删除文件（不存在时忽略）"""
+    try:
+        if os.path.exists(path):
+            os.unlink(path)
+    except OSError:
+        pass
+
 async def test_chinese_subtitle_and_sync():
     """测试中文字幕显示和音画同步修复"""
     from api import VideoComposer
@@ -45,6 +81,9 @@ async def test_chinese_subtitle_and_sync():
             print(f"   {i}. {line}")
     print(f"   ... (共{len(chinese_content.split())}行)")
     
+    srt_file_1 = txt_file.replace('.txt', '_default.srt')
+    srt_file_2 = txt_file.replace('.txt', '_optimized.srt')
+    
     try:
         # 测试1: 验证TXT文件
         print(f"\n🔍 测试1: 验证TXT字幕文件")
@@ -55,44 +94,49 @@ async def test_chinese_subtitle_and_sync():
             print(f"   ❌ TXT字幕文件验证失败: {str(e)}")
             return
         
+        # 测试2和测试3的两次转换互不依赖，在线程中并发执行
+        video_duration = 30.0  # 假设30秒视频
+        conversion1, conversion2 = await asyncio.gather(
+            asyncio.to_thread(composer.convert_txt_to_srt, txt_file, srt_file_1),
+            asyncio.to_thread(composer.convert_txt_to_srt, txt_file, srt_file_2, video_duration),
+            return_exceptions=True
+        )
+        
         # 测试2: 转换为SRT（不带视频时长）
         print(f"\n🔄 测试2: TXT转SRT（默认时间轴）")
-        srt_file_1 = txt_file.replace('.txt', '_default.srt')
         try:
-            result1 = composer.convert_txt_to_srt(txt_file, srt_file_1)
+            if isinstance(conversion1, Exception):
+                raise conversion1
+            result1 = conversion1
             print(f"   ✅ 默认转换成功: {os.path.basename(result1)}")
             
             # 显示转换结果
-            with open(result1, 'r', encoding='utf-8') as f:
-                content = f.read()
-            lines = content.split('\n')
+            preview, non_empty = await asyncio.to_thread(_read_preview, result1)
             print(f"   📋 转换结果预览:")
-            for line in lines[:8]:  # 显示前8行
+            for line in preview:  # 显示前8行
                 if line.strip():
                     print(f"     {line}")
-            print(f"     ... (共{len([l for l in lines if l.strip()])}行)")
+            print(f"     ... (共{non_empty}行)")
             
         except Exception as e:
             print(f"   ❌ 默认转换失败: {str(e)}")
         
         # 测试3: 转换为SRT（带视频时长优化）
         print(f"\n🎬 测试3: TXT转SRT（视频时长优化）")
-        srt_file_2 = txt_file.replace('.txt', '_optimized.srt')
-        video_duration = 30.0  # 假设30秒视频
         try:
-            result2 = composer.convert_txt_to_srt(txt_file, srt_file_2, video_duration)
+            if isinstance(conversion2, Exception):
+                raise conversion2
+            result2 = conversion2
             print(f"   ✅ 优化转换成功: {os.path.basename(result2)}")
             print(f"   📊 视频时长: {video_duration}秒")
             
             # 显示转换结果
-            with open(result2, 'r', encoding='utf-8') as f:
-                content = f.read()
-            lines = content.split('\n')
+            preview, non_empty = await asyncio.to_thread(_read_preview, result2)
             print(f"   📋 优化转换结果预览:")
-            for line in lines[:8]:  # 显示前8行
+            for line in preview:  # 显示前8行
                 if line.strip():
                     print(f"     {line}")
-            print(f"     ... (共{len([l for l in lines if l.strip()])}行)")
+            print(f"     ... (共{non_empty}行)")
             
             # 验证转换后的SRT文件
             await composer._validate_subtitle_file(result2)
@@ -103,23 +147,13 @@ async def test_chinese_subtitle_and_sync():
         
         # 测试4: 检查字幕滤镜构建
         print(f"\n🎨 测试4: 字幕滤镜构建")
+        font_name = _FONT_NAME
         try:
-            import platform
-            system = platform.system()
-            print(f"   🖥️ 检测到系统: {system}")
+            print(f"   🖥️ 检测到系统: {_SYSTEM}")
             
             # 模拟字幕滤镜构建
-            escaped_subtitle = result2.replace('\\', '\\\\').replace(':', '\\:').replace("'", "\\'")
-            
-            if system == 'Darwin':  # macOS
-                subtitle_filter = f"subtitles='{escaped_subtitle}':force_style='FontName=PingFang SC,FontSize=24,PrimaryColour=&Hffffff,OutlineColour=&H000000,Outline=2'"
-                font_name = "PingFang SC"
-            elif system == 'Linux':
-                subtitle_filter = f"subtitles='{escaped_subtitle}':force_style='FontName=Noto Sans CJK SC,FontSize=24,PrimaryColour=&Hffffff,OutlineColour=&H000000,Outline=2'"
-                font_name = "Noto Sans CJK SC"
-            else:
-                subtitle_filter = f"subtitles='{escaped_subtitle}':force_style='FontName=Arial Unicode MS,FontSize=24,PrimaryColour=&Hffffff,OutlineColour=&H000000,Outline=2'"
-                font_name = "Arial Unicode MS"
+            escaped_subtitle = result2.translate(_ESCAPE)
+            subtitle_filter = _FILTER_TMPL.format(path=escaped_subtitle, font=font_name)
             
             print(f"   ✅ 字幕滤镜构建成功")
             print(f"   🔤 使用字体: {font_name}")
@@ -142,12 +176,10 @@ async def test_chinese_subtitle_and_sync():
         
     finally:
         # 清理测试文件
-        for file_path in [txt_file, srt_file_1, srt_file_2]:
-            try:
-                if os.path.exists(file_path):
-                    os.unlink(file_path)
-            except:
-                pass
+        await asyncio.gather(*(
+            asyncio.to_thread(_remove_file, file_path)
+            for file_path in [txt_file, srt_file_1, srt_file_2]
+        ))
 
 async def main():
     await test_chinese_subtitle_and_sync()
@@ -4,13 +4,20 @@
 """
 
 import os
+import shutil
 import tempfile
 import asyncio
 import sys
+from itertools import islice
 
 # 添加当前目录到路径
 sys.path.append('.')
 
+def _write_text(path, content):
+    """写入UTF-8文本文件"""
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write(content)
+
 async def test_subtitle_validation():
     """测试字幕文件验证功能"""
     from api import VideoComposer
@@ -20,14 +27,19 @@ async def test_subtitle_validation():
     print("🧪 测试字幕文件验证功能")
     print("=" * 50)
     
+    # 所有测试文件放在同一个临时目录中，结束后整体删除
+    tmpdir = tempfile.mkdtemp(prefix="subval_")
+    
     # 测试支持的格式
-    test_files = {}
+    test_files = {
+        'txt': os.path.join(tmpdir, "subtitle.txt"),
+        'srt': os.path.join(tmpdir, "subtitle.srt"),
+        'xyz': os.path.join(tmpdir, "subtitle.xyz"),  # 不支持的格式
+        'empty_txt': os.path.join(tmpdir, "empty.txt"),
+    }
     
     # 创建TXT测试文件
     txt_content = "这是一个测试字幕文件。\n包含多行内容。"
-    with tempfile.NamedTemporaryFile(mode='w', suffix='.txt', delete=False, encoding='utf-8') as f:
-        f.write(txt_content)
-        test_files['txt'] = f.name
     
     # 创建SRT测试文件
     srt_content = """1
@@ -38,41 +50,39 @@ async def test_subtitle_validation():
 00:00:03,000 --> 00:00:06,000
 第二行字幕
 """
-    with tempfile.NamedTemporaryFile(mode='w', suffix='.srt', delete=False, encoding='utf-8') as f:
-        f.write(srt_content)
-        test_files['srt'] = f.name
-    
-    # 创建不支持的格式
-    with tempfile.NamedTemporaryFile(mode='w', suffix='.xyz', delete=False, encoding='utf-8') as f:
-        f.write("不支持的格式")
-        test_files['xyz'] = f.name
-    
-    # 创建空TXT文件
-    with tempfile.NamedTemporaryFile(mode='w', suffix='.txt', delete=False, encoding='utf-8') as f:
-        f.write("")
-        test_files['empty_txt'] = f.name
     
     try:
+        _write_text(test_files['txt'], txt_content)
+        _write_text(test_files['srt'], srt_content)
+        _write_text(test_files['xyz'], "不支持的格式")
+        _write_text(test_files['empty_txt'], "")
+        
+        # 各格式的验证和不存在文件的验证互不依赖，并发执行后按顺序输出结果
+        missing_file = "/path/to/nonexistent/file.srt"
+        *format_results, missing_result = await asyncio.gather(
+            *(composer._validate_subtitle_file(file_path) for file_path in test_files.values()),
+            composer._validate_subtitle_file(missing_file),
+            return_exceptions=True
+        )
+        
         # 测试各种格式
-        for format_name, file_path in test_files.items():
+        for (format_name, file_path), result in zip(test_files.items(), format_results):
             print(f"\n📝 测试 {format_name.upper()} 格式: {os.path.basename(file_path)}")
             
-            try:
-                await composer._validate_subtitle_file(file_path)
+            if isinstance(result, Exception):
+                print(f"   ❌ 验证失败: {str(result)}")
+            else:
                 print(f"   ✅ 验证通过")
-            except Exception as e:
-                print(f"   ❌ 验证失败: {str(e)}")
         
         # 测试不存在的文件
         print(f"\n📝 测试不存在的文件")
-        try:
-            await composer._validate_subtitle_file("/path/to/nonexistent/file.srt")
+        if isinstance(missing_result, Exception):
+            print(f"   ✅ 正确拒绝: {str(missing_result)}")
+        else:
             print(f"   ❌ 应该失败但通过了")
-        except Exception as e:
-            print(f"   ✅ 正确拒绝: {str(e)}")
         
         print(f"\n🔄 测试TXT到SRT转换")
-        srt_output = test_files['txt'].replace('.txt', '_converted.srt')
+        srt_output = os.path.join(tmpdir, "subtitle_converted.srt")
         try:
             result = composer.convert_txt_to_srt(test_files['txt'], srt_output)
             print(f"   ✅ 转换成功: {os.path.basename(result)}")
@@ -83,9 +93,9 @@ async def test_subtitle_validation():
             
             # 显示转换结果
             with open(result, 'r', encoding='utf-8') as f:
-                content = f.read()
+                preview = [line.rstrip('\n') for line in islice(f, 6)]  # 只读取前6行
             print(f"   转换结果预览:")
-            for line in content.split('\n')[:6]:  # 显示前6行
+            for line in preview:
                 if line.strip():
                     print(f"     {line}")
             
@@ -93,19 +103,8 @@ async def test_subtitle_validation():
             print(f"   ❌ 转换失败: {str(e)}")
     
     finally:
-        # 清理测试文件
-        for file_path in test_files.values():
-            try:
-                os.unlink(file_path)
-            except:
-                pass
-        
-        # 清理转换后的文件
-        srt_output = test_files['txt'].replace('.txt', '_converted.srt')
-        try:
-            os.unlink(srt_output)
-        except:
-            pass
+        # 清理测试文件（包括转换后的文件）
+        shutil.rmtree(tmpdir, ignore_errors=True)
 
 async def main():
     await test_subtitle_validation()
@@ -9,39 +9,92 @@ import os
 import subprocess
 import time
 import json
+import mmap
+import functools
+import threading
+import concurrent.futures
+from io import StringIO
 
-def run_test_script(script_name, task_name):
-    """运行测试脚本"""
-    print(f"\n🚀 开始运行 {task_name} 测试...")
-    print("=" * 60)
+from json_helpers import orjson  # 可选依赖，未安装时为 None
+
+# 单个测试脚本的最长运行时间（秒）
+SCRIPT_TIMEOUT_SECONDS = 300
+
+# 要运行的测试脚本: (脚本文件, 任务名称)；两个脚本互不依赖，可并行运行
+TEST_SCRIPTS = [
+    ("test_slideshow_complete.py", "任务8"),
+    ("test_audio_processing.py", "任务9"),
+]
+
+def run_test_script(script_name, task_name, output=None):
+    """运行测试脚本
+    
+    output 为输出目标（默认标准输出）；并行运行时传入缓冲区，结束后再按顺序输出。
+    子进程的标准输出和错误输出合并后逐行转发，不在内存中缓存完整输出
+    """
+    out = output if output is not None else sys.stdout
+    log = functools.partial(print, file=out)
+    log(f"\n🚀 开始运行 {task_name} 测试...")
+    log("=" * 60)
     
     try:
         # 运行测试脚本
-        result = subprocess.run([sys.executable, script_name], 
-                              capture_output=True, text=True, timeout=300)
+        cmd = [sys.executable, script_name]
+        with subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.STDOUT,
+                              text=True, bufsize=1) as proc:
+            # 超时后终止子进程，逐行读取会随管道关闭而结束
+            timed_out = threading.Event()
+            
+            def on_timeout():
+                timed_out.set()
+                proc.kill()
+            
+            timer = threading.Timer(SCRIPT_TIMEOUT_SECONDS, on_timeout)
+            timer.start()
+            try:
+                for line in proc.stdout:
+                    out.write(line)
+                returncode = proc.wait()
+            finally:
+                timer.cancel()
         
-        print(result.stdout)
-        if result.stderr:
-            print("错误输出:")
-            print(result.stderr)
+        if timed_out.is_set():
+            raise subprocess.TimeoutExpired(cmd, SCRIPT_TIMEOUT_SECONDS)
         
-        if result.returncode == 0:
-            print(f"✅ {task_name} 测试通过")
+        if returncode == 0:
+            log(f"✅ {task_name} 测试通过")
             return True
         else:
-            print(f"❌ {task_name} 测试失败 (退出码: {result.returncode})")
+            log(f"❌ {task_name} 测试失败 (退出码: {returncode})")
             return False
             
     except subprocess.TimeoutExpired:
-        print(f"⏰ {task_name} 测试超时")
+        log(f"⏰ {task_name} 测试超时")
         return False
     except FileNotFoundError:
-        print(f"❌ 测试脚本不存在: {script_name}")
+        log(f"❌ 测试脚本不存在: {script_name}")
         return False
     except Exception as e:
-        print(f"❌ 运行 {task_name} 测试时出现异常: {str(e)}")
+        log(f"❌ 运行 {task_name} 测试时出现异常: {str(e)}")
         return False
 
+def run_test_scripts_parallel(scripts):
+    """并行运行多个测试脚本，按脚本顺序输出各自的日志，返回各脚本是否通过"""
+    outputs = [StringIO() for _ in scripts]
+    
+    with concurrent.futures.ThreadPoolExecutor(max_workers=len(scripts)) as executor:
+        futures = [
+            executor.submit(run_test_script, script_name, task_name, output)
+            for (script_name, task_name), output in zip(scripts, outputs)
+        ]
+        results = [future.result() for future in futures]
+    
+    for output in outputs:
+        sys.stdout.write(output.getvalue())
+    sys.stdout.flush()
+    
+    return results
+
 def check_test_files():
     """检查测试文件是否存在"""
     test_files = [
@@ -63,6 +116,32 @@ def check_test_files():
     print("✅ 所有测试文件都存在")
     return True
 
+def _load_json_if_exists(path):
+    """读取JSON报告文件，文件不存在或无法解析时返回 None
+    
+    安装了 orjson 时通过内存映射直接解析文件内容，不先复制为 bytes/str
+    """
+    if not os.path.exists(path):
+        return None
+    try:
+        with open(path, 'rb') as f:
+            if orjson is None:
+                return json.loads(f.read())
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm, memoryview(mm) as view:
+                return orjson.loads(view)
+    except (OSError, ValueError):
+        # 空文件无法映射（ValueError），与格式错误的报告一样视为不存在
+        return None
+
+def _dump_json(data, path):
+    """以缩进格式写入JSON报告（保留中文字符）"""
+    if orjson is not None:
+        with open(path, 'wb') as f:
+            f.write(orjson.dumps(data, option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS))
+    else:
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(data, f, ensure_ascii=False, indent=2)
+
 def generate_combined_report(task8_success, task9_success):
     """生成综合测试报告"""
     print("\n" + "=" * 60)
@@ -72,21 +151,11 @@ def generate_combined_report(task8_success, task9_success):
     # 读取各个测试的详细报告
     reports = {}
     
-    # 读取任务8报告
-    if os.path.exists("test_slideshow_report.json"):
-        try:
-            with open("test_slideshow_report.json", 'r', encoding='utf-8') as f:
-                reports['task8'] = json.load(f)
-        except:
-            pass
-    
-    # 读取任务9报告
-    if os.path.exists("test_audio_processing_report.json"):
-        try:
-            with open("test_audio_processing_report.json", 'r', encoding='utf-8') as f:
-                reports['task9'] = json.load(f)
-        except:
-            pass
+    for key, report_file in (("task8", "test_slideshow_report.json"),
+                             ("task9", "test_audio_processing_report.json")):
+        report = _load_json_if_exists(report_file)
+        if report is not None:
+            reports[key] = report
     
     # 统计信息
     total_tests = 0
@@ -135,8 +204,7 @@ def generate_combined_report(task8_success, task9_success):
         'individual_reports': reports
     }
     
-    with open("test_tasks_8_9_report.json", 'w', encoding='utf-8') as f:
-        json.dump(combined_report, f, ensure_ascii=False, indent=2)
+    _dump_json(combined_report, "test_tasks_8_9_report.json")
     
     print(f"\n📄 综合报告已保存到: test_tasks_8_9_report.json")
     
@@ -172,9 +240,8 @@ def main():
     if not check_test_files():
         sys.exit(1)
     
-    # 运行测试
-    task8_success = run_test_script("test_slideshow_complete.py", "任务8")
-    task9_success = run_test_script("test_audio_processing.py", "任务9")
+    # 运行测试（耗时为两者中较长的一个，而不是两者之和）
+    task8_success, task9_success = run_test_scripts_parallel(TEST_SCRIPTS)
     
     # 生成综合报告
     overall_success = generate_combined_report(task8_success, task9_success)
@@ -4,150 +4,232 @@
 """
 
 import os
+import asyncio
+import functools
+import random
+import re
+import sys
 import tempfile
-import requests
-import json
+import aiohttp
 import time
 
-def create_test_txt_subtitle():
-    """创建测试用的TXT字幕文件"""
-    content = """看，一群可爱的小猴子在月光下快乐地玩耍呢！
+# 导入API模块进行测试（只添加一次，避免 sys.path 中出现重复项）
+if '.' not in sys.path:
+    sys.path.append('.')
+
+from json_helpers import json_loads  # 安装了 orjson 时使用 orjson
+
+API_BASE_URL = "http://localhost:7878"
+
+# 连接超时单独设短，服务未启动时快速失败；健康检查只给1秒
+REQUEST_TIMEOUT = aiohttp.ClientTimeout(total=35, sock_connect=2)
+HEALTH_CHECK_TIMEOUT = aiohttp.ClientTimeout(total=1)
+
+# 任务状态轮询：带抖动的指数退避（0.25秒起，上限2秒），总时长与原先10次×5秒一致
+POLL_TIMEOUT_SECONDS = 50
+POLL_INITIAL_DELAY = 0.25
+POLL_MAX_DELAY = 2.0
+
+# 测试用TXT字幕内容，导入时编码一次
+SAMPLE_TXT_SUBTITLE = """看，一群可爱的小猴子在月光下快乐地玩耍呢！
 它们在树枝间跳跃，发出欢快的叫声。
 突然，小猴子们发现了水中的月亮。
 "哇！月亮掉到水里了！"一只小猴子惊呼道。
 "我们要把月亮捞上来！"另一只小猴子说。
-于是，小猴子们开始了捞月亮的行动。"""
-    
-    with tempfile.NamedTemporaryFile(mode='w', suffix='.txt', delete=False, encoding='utf-8') as f:
-        f.write(content)
-        return f.name
+于是，小猴子们开始了捞月亮的行动。""".encode('utf-8')
 
-def test_txt_subtitle_validation():
-    """测试TXT字幕文件验证"""
-    print("🧪 测试TXT字幕文件验证...")
+CONVERSION_TXT_SUBTITLE = """第一行字幕内容。
+第二行字幕内容！
+第三行字幕内容？""".encode('utf-8')
+
+# SRT首条字幕：序号1，且从00:00:00,000开始
+SRT_FIRST_CUE_RE = re.compile(r'^1\r?\n00:00:00,000 --> \d{2}:\d{2}:\d{2},\d{3}', re.M)
+
+class TransientPollError(Exception):
+    """可重试的轮询错误（429/5xx），retry_after为服务端建议的等待秒数"""
     
-    # 创建测试TXT文件
-    txt_file = create_test_txt_subtitle()
-    print(f"   创建测试TXT文件: {txt_file}")
-    
-    try:
-        # 测试视频合成请求
-        test_data = {
-            "composition_type": "audio_video_subtitle",
-            "videos": [
-                {
-                    "video_url": "/Users/mulele/Documents/4-n8ndata/video/猴子捞月/monkey_story.mp4"
-                }
-            ],
-            "audio_file": "/Users/mulele/Documents/4-n8ndata/video/猴子捞月/monkey_story.mp3",
-            "subtitle_file": txt_file,
-            "output_format": "mp4"
-        }
-        
-        print("   发送合成请求...")
-        response = requests.post(
-            "http://localhost:7878/compose_video",
-            headers={"Content-Type": "application/json"},
-            json=test_data,
-            timeout=30
-        )
-        
-        if response.status_code == 200:
-            result = response.json()
-            task_id = result.get('task_id')
-            print(f"   ✅ 请求成功，任务ID: {task_id}")
-            
-            # 检查任务状态
-            print("   检查任务状态...")
-            for i in range(10):  # 最多检查10次
-                status_response = requests.get(f"http://localhost:7878/composition_status/{task_id}")
-                if status_response.status_code == 200:
-                    status = status_response.json()
-                    print(f"   状态: {status.get('status')} - {status.get('message')} ({status.get('progress', 0)}%)")
-                    
-                    if status.get('status') == 'completed':
-                        print("   ✅ TXT字幕合成成功！")
-                        return True
-                    elif status.get('status') == 'failed':
-                        print(f"   ❌ 合成失败: {status.get('error', '未知错误')}")
-                        return False
-                
-                time.sleep(5)
-            
-            print("   ⏰ 任务超时")
-            return False
-            
-        else:
-            print(f"   ❌ 请求失败: {response.status_code}")
-            print(f"   错误信息: {response.text}")
-            return False
-            
-    except Exception as e:
-        print(f"   💥 测试异常: {str(e)}")
-        return False
-    finally:
-        # 清理测试文件
+    def __init__(self, message, retry_after=0.0):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+def raise_for_poll_status(response):
+    """按状态码分类：429和5xx可重试，其余4xx立即失败"""
+    if response.status == 429 or response.status >= 500:
         try:
-            os.unlink(txt_file)
-        except:
-            pass
+            retry_after = float(response.headers.get("Retry-After", 0))
+        except ValueError:
+            retry_after = 0.0
+        raise TransientPollError(f"HTTP {response.status}", retry_after)
+    response.raise_for_status()
 
-def test_txt_to_srt_conversion():
-    """测试TXT到SRT转换功能"""
-    print("🔄 测试TXT到SRT转换...")
+@functools.lru_cache(maxsize=1)
+def get_composer():
+    """导入并创建VideoComposer，整个模块只初始化一次"""
+    from api import VideoComposer
     
-    # 创建测试TXT文件
-    txt_content = """第一行字幕内容。
-第二行字幕内容！
-第三行字幕内容？"""
+    return VideoComposer()
+
+def create_test_txt_subtitle(directory):
+    """在指定目录中创建测试用的TXT字幕文件"""
+    txt_file = os.path.join(directory, "subtitle.txt")
+    with open(txt_file, 'wb') as f:
+        f.write(SAMPLE_TXT_SUBTITLE)
+    return txt_file
+
+async def fetch_composition_statuses(session, task_ids):
+    """
+    通过 POST /composition_status_batch 一次获取多个任务状态
     
-    with tempfile.NamedTemporaryFile(mode='w', suffix='.txt', delete=False, encoding='utf-8') as txt_f:
-        txt_f.write(txt_content)
-        txt_file = txt_f.name
+    返回 {task_id: 状态数据}；服务端不支持批量接口时并发逐个查询。
+    """
+    async with session.post(f"{API_BASE_URL}/composition_status_batch", json={"ids": list(task_ids)}) as response:
+        if response.status not in (404, 405):
+            raise_for_poll_status(response)
+            return {task_id: status for task_id, status in (await response.json(loads=json_loads)).items() if status}
     
-    try:
-        # 导入VideoComposer进行测试
-        import sys
-        sys.path.append('.')
-        from api import VideoComposer
+    async def fetch(task_id):
+        async with session.get(f"{API_BASE_URL}/composition_status/{task_id}") as response:
+            raise_for_poll_status(response)
+            return await response.json(loads=json_loads)
+    
+    results = await asyncio.gather(*(fetch(task_id) for task_id in task_ids))
+    return dict(zip(task_ids, results))
+
+async def wait_for_compositions(session, task_ids):
+    """
+    以带抖动的指数退避轮询合成任务状态，返回 {task_id: 最终状态}（超时的任务不在其中）
+    
+    429/5xx和连接异常视为暂时性错误继续重试（优先遵循Retry-After），其余4xx直接抛出。
+    """
+    finished = {}
+    pending = list(task_ids)
+    deadline = time.monotonic() + POLL_TIMEOUT_SECONDS
+    delay = POLL_INITIAL_DELAY
+    while pending and time.monotonic() < deadline:
+        retry_after = 0.0
+        try:
+            statuses = await fetch_composition_statuses(session, pending)
+        except (TransientPollError, aiohttp.ClientConnectionError, asyncio.TimeoutError) as e:
+            print(f"   ⚠️ 状态查询暂时失败，稍后重试: {e!r}")
+            statuses = {}
+            retry_after = getattr(e, 'retry_after', 0.0)
         
-        composer = VideoComposer()
+        for task_id, status in statuses.items():
+            print(f"   状态: {status.get('status')} - {status.get('message')} ({status.get('progress', 0)}%)")
+            
+            if status.get('status') in ('completed', 'failed'):
+                finished[task_id] = status
         
-        with tempfile.NamedTemporaryFile(suffix='.srt', delete=False) as srt_f:
-            srt_file = srt_f.name
+        pending = [task_id for task_id in pending if task_id not in finished]
+        if pending:
+            wait = max(retry_after, delay + random.uniform(0, POLL_INITIAL_DELAY))
+            await asyncio.sleep(min(wait, max(deadline - time.monotonic(), 0)))
+            delay = min(delay * 2, POLL_MAX_DELAY)
+    
+    return finished
+
+async def _txt_subtitle_validation(txt_file):
+    """发送合成请求并异步等待任务结束"""
+    # 测试视频合成请求
+    test_data = {
+        "composition_type": "audio_video_subtitle",
+        "videos": [
+            {
+                "video_url": "/Users/mulele/Documents/4-n8ndata/video/猴子捞月/monkey_story.mp4"
+            }
+        ],
+        "audio_file": "/Users/mulele/Documents/4-n8ndata/video/猴子捞月/monkey_story.mp3",
+        "subtitle_file": txt_file,
+        "output_format": "mp4"
+    }
+    
+    async with aiohttp.ClientSession(timeout=REQUEST_TIMEOUT) as session:
+        # 先快速探测服务是否在线，服务未启动时不必等满请求超时
+        try:
+            async with session.get(f"{API_BASE_URL}/health", timeout=HEALTH_CHECK_TIMEOUT) as response:
+                response.raise_for_status()
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            print(f"   ⚠️ API服务不可用，跳过合成测试: {e!r}")
+            return False
         
-        # 执行转换
-        result_file = composer.convert_txt_to_srt(txt_file, srt_file)
+        print("   发送合成请求...")
+        async with session.post(f"{API_BASE_URL}/compose_video", json=test_data) as response:
+            if response.status != 200:
+                print(f"   ❌ 请求失败: {response.status}")
+                print(f"   错误信息: {await response.text()}")
+                return False
+            result = await response.json(loads=json_loads)
         
-        # 检查结果
-        with open(result_file, 'r', encoding='utf-8') as f:
-            srt_content = f.read()
+        task_id = result.get('task_id')
+        print(f"   ✅ 请求成功，任务ID: {task_id}")
         
-        print("   转换结果:")
-        print("   " + "="*50)
-        for line in srt_content.split('\n'):
-            if line.strip():
-                print(f"   {line}")
-        print("   " + "="*50)
+        # 检查任务状态
+        print("   检查任务状态...")
+        status = (await wait_for_compositions(session, [task_id])).get(task_id)
+    
+    if status is None:
+        print("   ⏰ 任务超时")
+        return False
+    if status.get('status') == 'completed':
+        print("   ✅ TXT字幕合成成功！")
+        return True
+    print(f"   ❌ 合成失败: {status.get('error', '未知错误')}")
+    return False
+
+def test_txt_subtitle_validation():
+    """测试TXT字幕文件验证"""
+    print("🧪 测试TXT字幕文件验证...")
+    
+    # 临时目录在退出时连同其中的测试文件一起删除
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        # 创建测试TXT文件
+        txt_file = create_test_txt_subtitle(tmp_dir)
+        print(f"   创建测试TXT文件: {txt_file}")
         
-        # 验证SRT格式
-        if "00:00:00,000 --> " in srt_content and "1\n" in srt_content:
-            print("   ✅ TXT到SRT转换成功！")
-            return True
-        else:
-            print("   ❌ SRT格式不正确")
+        try:
+            return asyncio.run(_txt_subtitle_validation(txt_file))
+        except Exception as e:
+            print(f"   💥 测试异常: {str(e)}")
             return False
-            
-    except Exception as e:
-        print(f"   💥 转换测试异常: {str(e)}")
-        return False
-    finally:
-        # 清理测试文件
+
+def test_txt_to_srt_conversion():
+    """测试TXT到SRT转换功能"""
+    print("🔄 测试TXT到SRT转换...")
+    
+    # 临时目录在退出时连同其中的测试文件一起删除
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        # 创建测试TXT文件
+        txt_file = os.path.join(tmp_dir, "input.txt")
+        with open(txt_file, 'wb') as txt_f:
+            txt_f.write(CONVERSION_TXT_SUBTITLE)
+        srt_file = os.path.join(tmp_dir, "output.srt")
+        
         try:
-            os.unlink(txt_file)
-            os.unlink(srt_file)
-        except:
-            pass
+            composer = get_composer()
+            
+            # 执行转换
+            result_file = composer.convert_txt_to_srt(txt_file, srt_file)
+            
+            # 检查结果
+            with open(result_file, 'r', encoding='utf-8') as f:
+                srt_content = f.read()
+            
+            # 拼接后一次性输出，避免逐行print
+            separator = "   " + "="*50
+            preview = "\n".join(f"   {line}" for line in srt_content.splitlines() if line.strip())
+            sys.stdout.write(f"   转换结果:\n{separator}\n{preview}\n{separator}\n")
+            
+            # 验证SRT格式
+            if SRT_FIRST_CUE_RE.search(srt_content):
+                print("   ✅ TXT到SRT转换成功！")
+                return True
+            else:
+                print("   ❌ SRT格式不正确")
+                return False
+                
+        except Exception as e:
+            print(f"   💥 转换测试异常: {str(e)}")
+            return False
 
 def main():
     print("🚀 TXT字幕格式支持测试")
@@ -8,28 +8,68 @@ import unittest
 import asyncio
 import tempfile
 import os
-import json
+import subprocess
 import time
 from unittest.mock import Mock, patch, AsyncMock
 import requests
+from requests.adapters import HTTPAdapter
 from typing import Dict, Any
+import aiohttp
 
 # 导入API模块进行测试
 import sys
 sys.path.append('.')
 
+from json_helpers import json_loads  # 安装了 orjson 时使用 orjson
+
+API_BASE_URL = "http://localhost:8000"
+
+# 并发请求测试的探测次数（可通过环境变量放大规模）与同时在途请求上限
+CONCURRENT_REQUESTS = int(os.environ.get("CONCURRENT_REQUESTS", "5"))
+CONCURRENCY_LIMIT = 64
+
+# 等待错误记录出现的上限与轮询间隔（秒）
+ERROR_RECORD_TIMEOUT = 1.0
+ERROR_POLL_INTERVAL = 0.05
+
 class TestVideoProcessingAPI(unittest.TestCase):
     """视频处理API单元测试类"""
     
+    @classmethod
+    def setUpClass(cls):
+        """整个测试类共享连接池，避免每个测试重新建立连接"""
+        # 服务未启动时整个类直接跳过，而不是每个测试各自等待连接失败
+        try:
+            requests.get(f"{API_BASE_URL}/health", timeout=(2, 5))
+        except requests.RequestException as e:
+            raise unittest.SkipTest(f"API服务不可用: {str(e)}")
+        
+        cls.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=32, pool_maxsize=64)
+        cls.session.mount('http://', adapter)
+        cls.session.mount('https://', adapter)
+        
+        # 异步测试共用同一个事件循环和 aiohttp 会话
+        cls.loop = asyncio.new_event_loop()
+        cls.aio_session = cls.loop.run_until_complete(cls._create_aio_session())
+    
+    @classmethod
+    def tearDownClass(cls):
+        """关闭共享会话和事件循环"""
+        cls.session.close()
+        cls.loop.run_until_complete(cls.aio_session.close())
+        cls.loop.close()
+    
+    @staticmethod
+    async def _create_aio_session():
+        """aiohttp 会话需要在事件循环内创建"""
+        connector = aiohttp.TCPConnector(limit_per_host=CONCURRENCY_LIMIT, keepalive_timeout=30)
+        return aiohttp.ClientSession(connector=connector)
+    
     def setUp(self):
         """测试前的设置"""
-        self.api_base_url = "http://localhost:8000"
-        self.session = requests.Session()
+        self.api_base_url = API_BASE_URL
         self.test_video_url = "https://www.youtube.com/watch?v=dQw4w9WgXcQ"  # 经典测试URL
-        
-    def tearDown(self):
-        """测试后的清理"""
-        self.session.close()
     
     def test_api_health_check(self):
         """测试API健康检查"""
@@ -37,7 +77,7 @@ class TestVideoProcessingAPI(unittest.TestCase):
             response = self.session.get(f"{self.api_base_url}/health", timeout=5)
             self.assertEqual(response.status_code, 200)
             
-            data = response.json()
+            data = json_loads(response.content)
             self.assertIn('status', data)
             self.assertIn('timestamp', data)
             self.assertIn('resource_status', data)
@@ -46,107 +86,87 @@ class TestVideoProcessingAPI(unittest.TestCase):
         except Exception as e:
             self.skipTest(f"API服务不可用: {str(e)}")
     
+    async def _post_concurrently(self, path, payloads):
+        """并发提交互不依赖的请求，返回各请求的状态码"""
+        async def post(payload):
+            async with self.aio_session.post(f"{self.api_base_url}{path}", json=payload) as response:
+                return response.status
+        
+        return await asyncio.gather(*(post(payload) for payload in payloads))
+    
+    def _assert_all_rejected(self, path, payloads, expected_status=400):
+        """并发提交所有无效输入，并逐个断言被拒绝"""
+        statuses = self.loop.run_until_complete(self._post_concurrently(path, payloads))
+        for payload, status in zip(payloads, statuses):
+            with self.subTest(payload=payload):
+                self.assertEqual(status, expected_status)
+    
     def test_input_validation_video_transcription(self):
         """测试视频转录输入验证"""
-        # 测试空URL
-        response = self.session.post(
-            f"{self.api_base_url}/generate_text_from_video",
-            json={"video_url": ""}
-        )
-        self.assertEqual(response.status_code, 400)
-        
-        # 测试无效URL格式
-        response = self.session.post(
-            f"{self.api_base_url}/generate_text_from_video",
-            json={"video_url": "not-a-valid-url"}
-        )
-        self.assertEqual(response.status_code, 400)
+        self._assert_all_rejected("/generate_text_from_video", [
+            {"video_url": ""},                 # 空URL
+            {"video_url": "not-a-valid-url"},  # 无效URL格式
+        ])
         
         print("✅ 视频转录输入验证测试通过")
     
     def test_input_validation_video_download(self):
         """测试视频下载输入验证"""
-        # 测试无效质量参数
-        response = self.session.post(
-            f"{self.api_base_url}/download_video",
-            json={
+        self._assert_all_rejected("/download_video", [
+            # 无效质量参数
+            {
                 "video_url": self.test_video_url,
                 "quality": "invalid_quality",
                 "format": "mp4"
-            }
-        )
-        self.assertEqual(response.status_code, 400)
-        
-        # 测试无效格式参数
-        response = self.session.post(
-            f"{self.api_base_url}/download_video",
-            json={
+            },
+            # 无效格式参数
+            {
                 "video_url": self.test_video_url,
                 "quality": "720p",
                 "format": "invalid_format"
-            }
-        )
-        self.assertEqual(response.status_code, 400)
+            },
+        ])
         
         print("✅ 视频下载输入验证测试通过")
     
     def test_input_validation_keyframe_extraction(self):
         """测试关键帧提取输入验证"""
-        # 测试无效方法
-        response = self.session.post(
-            f"{self.api_base_url}/extract_keyframes",
-            json={
+        self._assert_all_rejected("/extract_keyframes", [
+            # 无效方法
+            {
                 "video_url": self.test_video_url,
                 "method": "invalid_method"
-            }
-        )
-        self.assertEqual(response.status_code, 400)
-        
-        # 测试无效间隔
-        response = self.session.post(
-            f"{self.api_base_url}/extract_keyframes",
-            json={
+            },
+            # 无效间隔
+            {
                 "video_url": self.test_video_url,
                 "method": "interval",
                 "interval": -1
-            }
-        )
-        self.assertEqual(response.status_code, 400)
+            },
+        ])
         
         print("✅ 关键帧提取输入验证测试通过")
     
     def test_input_validation_video_composition(self):
         """测试视频合成输入验证"""
-        # 测试无效合成类型
-        response = self.session.post(
-            f"{self.api_base_url}/compose_video",
-            json={
+        self._assert_all_rejected("/compose_video", [
+            # 无效合成类型
+            {
                 "composition_type": "invalid_type",
                 "videos": [{"video_url": self.test_video_url}]
-            }
-        )
-        self.assertEqual(response.status_code, 400)
-        
-        # 测试concat类型视频数量不足
-        response = self.session.post(
-            f"{self.api_base_url}/compose_video",
-            json={
+            },
+            # concat类型视频数量不足
+            {
                 "composition_type": "concat",
                 "videos": [{"video_url": self.test_video_url}]  # 只有一个视频
-            }
-        )
-        self.assertEqual(response.status_code, 400)
-        
-        # 测试audio_video_subtitle类型缺少音频
-        response = self.session.post(
-            f"{self.api_base_url}/compose_video",
-            json={
+            },
+            # audio_video_subtitle类型缺少音频
+            {
                 "composition_type": "audio_video_subtitle",
                 "videos": [{"video_url": self.test_video_url}]
                 # 缺少audio_file
-            }
-        )
-        self.assertEqual(response.status_code, 400)
+            },
+        ])
         
         print("✅ 视频合成输入验证测试通过")
     
@@ -156,7 +176,7 @@ class TestVideoProcessingAPI(unittest.TestCase):
         response = self.session.get(f"{self.api_base_url}/system/resources")
         self.assertEqual(response.status_code, 200)
         
-        data = response.json()
+        data = json_loads(response.content)
         required_fields = ['cpu_percent', 'memory_percent', 'disk_percent', 'active_tasks']
         for field in required_fields:
             self.assertIn(field, data)
@@ -165,7 +185,7 @@ class TestVideoProcessingAPI(unittest.TestCase):
         response = self.session.get(f"{self.api_base_url}/system/errors/stats")
         self.assertEqual(response.status_code, 200)
         
-        data = response.json()
+        data = json_loads(response.content)
         self.assertIn('total_errors', data)
         self.assertIn('error_types', data)
         
@@ -177,7 +197,7 @@ class TestVideoProcessingAPI(unittest.TestCase):
         response = self.session.get(f"{self.api_base_url}/system/tasks")
         self.assertEqual(response.status_code, 200)
         
-        data = response.json()
+        data = json_loads(response.content)
         self.assertIn('tasks', data)
         self.assertIn('summary', data)
         
@@ -185,7 +205,7 @@ class TestVideoProcessingAPI(unittest.TestCase):
         response = self.session.get(f"{self.api_base_url}/system/cleanup/stats")
         self.assertEqual(response.status_code, 200)
         
-        data = response.json()
+        data = json_loads(response.content)
         self.assertIn('cleanup_stats', data)
         self.assertIn('active_processes', data)
         
@@ -193,6 +213,9 @@ class TestVideoProcessingAPI(unittest.TestCase):
     
     def test_error_handling_integration(self):
         """测试错误处理集成"""
+        recent_errors_url = f"{self.api_base_url}/system/errors/recent?limit=1"
+        baseline = json_loads(self.session.get(recent_errors_url).content).get('recent_errors')
+        
         # 故意触发一个错误
         response = self.session.post(
             f"{self.api_base_url}/compose_video",
@@ -203,10 +226,14 @@ class TestVideoProcessingAPI(unittest.TestCase):
         )
         self.assertEqual(response.status_code, 400)
         
-        # 检查错误是否被记录
-        time.sleep(1)  # 等待错误处理完成
-        response = self.session.get(f"{self.api_base_url}/system/errors/recent?limit=1")
-        self.assertEqual(response.status_code, 200)
+        # 检查错误是否被记录：轮询直到最近错误发生变化，最多等待 ERROR_RECORD_TIMEOUT 秒
+        deadline = time.monotonic() + ERROR_RECORD_TIMEOUT
+        while True:
+            response = self.session.get(recent_errors_url)
+            self.assertEqual(response.status_code, 200)
+            if json_loads(response.content).get('recent_errors') != baseline or time.monotonic() >= deadline:
+                break
+            time.sleep(ERROR_POLL_INTERVAL)
         
         # 注意：由于输入验证在API层面处理，可能不会记录到错误统计中
         # 这里主要测试端点的可用性
@@ -225,7 +252,7 @@ class TestVideoProcessingAPI(unittest.TestCase):
             self.skipTest("系统资源不足，跳过任务生命周期测试")
         
         self.assertEqual(response.status_code, 200)
-        data = response.json()
+        data = json_loads(response.content)
         task_id = data.get('task_id')
         self.assertIsNotNone(task_id)
         
@@ -233,7 +260,7 @@ class TestVideoProcessingAPI(unittest.TestCase):
         response = self.session.get(f"{self.api_base_url}/transcription_status/{task_id}")
         self.assertEqual(response.status_code, 200)
         
-        status_data = response.json()
+        status_data = json_loads(response.content)
         self.assertIn('status', status_data)
         self.assertIn('progress', status_data)
         
@@ -243,40 +270,26 @@ class TestVideoProcessingAPI(unittest.TestCase):
         
         print("✅ 任务生命周期测试通过")
     
-    def test_concurrent_requests(self):
-        """测试并发请求处理"""
-        import threading
-        import queue
-        
-        results = queue.Queue()
+    async def _probe_health_concurrently(self, count):
+        """在单个事件循环中并发探测健康检查端点，返回各请求的状态码或异常"""
+        semaphore = asyncio.Semaphore(CONCURRENCY_LIMIT)
         
-        def make_request():
-            try:
-                response = self.session.get(f"{self.api_base_url}/health")
-                results.put(response.status_code)
-            except Exception as e:
-                results.put(str(e))
+        async def probe():
+            async with semaphore:
+                async with self.aio_session.get(f"{self.api_base_url}/health") as response:
+                    return response.status
         
-        # 创建多个并发请求
-        threads = []
-        for _ in range(5):
-            thread = threading.Thread(target=make_request)
-            threads.append(thread)
-            thread.start()
-        
-        # 等待所有请求完成
-        for thread in threads:
-            thread.join()
+        return await asyncio.gather(*(probe() for _ in range(count)), return_exceptions=True)
+    
+    def test_concurrent_requests(self):
+        """测试并发请求处理"""
+        results = self.loop.run_until_complete(self._probe_health_concurrently(CONCURRENT_REQUESTS))
         
         # 检查结果
-        success_count = 0
-        while not results.empty():
-            result = results.get()
-            if result == 200:
-                success_count += 1
+        success_count = results.count(200)
         
         self.assertGreater(success_count, 0, "至少应有一个请求成功")
-        print(f"✅ 并发请求测试通过 ({success_count}/5 成功)")
+        print(f"✅ 并发请求测试通过 ({success_count}/{CONCURRENT_REQUESTS} 成功)")
     
     def test_resource_limits_enforcement(self):
         """测试资源限制强制执行"""
@@ -284,7 +297,7 @@ class TestVideoProcessingAPI(unittest.TestCase):
         response = self.session.get(f"{self.api_base_url}/system/resources")
         self.assertEqual(response.status_code, 200)
         
-        original_data = response.json()
+        original_data = json_loads(response.content)
         original_limit = original_data.get('max_concurrent_tasks', 3)
         
         # 设置很低的并发限制
@@ -307,7 +320,7 @@ class TestVideoProcessingAPI(unittest.TestCase):
                     # 资源限制生效
                     break
                 elif response.status_code == 200:
-                    task_data = response.json()
+                    task_data = json_loads(response.content)
                     task_ids.append(task_data.get('task_id'))
             
             # 清理启动的任务
@@ -329,15 +342,22 @@ class TestVideoProcessingAPI(unittest.TestCase):
 class TestFFmpegCommandBuilder(unittest.TestCase):
     """FFmpeg命令构建器测试"""
     
-    def setUp(self):
-        """设置测试环境"""
-        # 这里需要导入实际的FFmpeg命令构建器类
-        # 由于类定义在api.py中，我们需要模拟测试
-        pass
+    @classmethod
+    def setUpClass(cls):
+        """导入api.py中的FFmpeg命令构建器（缺少服务端依赖时跳过）"""
+        try:
+            from api import FFmpegCommandBuilder
+            cls.builder_class = FFmpegCommandBuilder
+        except ImportError as e:
+            cls.builder_class = None
+            cls.import_error = str(e)
     
     def test_command_validation(self):
         """测试命令验证"""
-        # 模拟测试FFmpeg命令的安全性验证
+        if self.builder_class is None:
+            self.skipTest(f"无法导入api模块: {self.import_error}")
+        
+        builder = self.builder_class()
         dangerous_commands = [
             "ffmpeg -i input.mp4 && rm -rf /",
             "ffmpeg -i input.mp4 | cat /etc/passwd",
@@ -345,9 +365,12 @@ class TestFFmpegCommandBuilder(unittest.TestCase):
         ]
         
         for cmd in dangerous_commands:
-            # 这里应该测试命令验证逻辑
-            # 由于需要访问内部类，这里只是示例
-            self.assertTrue(True, f"应该拒绝危险命令: {cmd}")
+            with self.subTest(cmd=cmd):
+                self.assertFalse(builder.validate_command(cmd.split()), f"应该拒绝危险命令: {cmd}")
+        
+        # 滤镜参数中的分号、管道和比较符号是合法的
+        filter_cmd = ['ffmpeg', '-filter_complex', "[0:v]select='gt(scene,0.3)'|n;[1:a]anull", '-y', 'out.mp4']
+        self.assertTrue(builder.validate_command(filter_cmd))
         
         print("✅ FFmpeg命令验证测试通过")
     
@@ -411,6 +434,19 @@ class TestErrorHandling(unittest.TestCase):
         
         print("✅ 错误恢复机制测试通过")
 
+def run_unit_tests_parallel() -> bool:
+    """通过 pytest-xdist 并行运行单元测试（按 conftest.py 中的 xdist_group 分组）"""
+    print("🚀 使用 pytest-xdist 并行运行单元测试")
+    print("=" * 60)
+    
+    # 在项目根目录运行，保证 sys.path 中的 '.' 能找到 api.py
+    result = subprocess.run([
+        sys.executable, "-m", "pytest", os.path.abspath(__file__),
+        "-n", "auto", "--dist=loadgroup"
+    ], cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    
+    return result.returncode == 0
+
 def run_unit_tests():
     """运行所有单元测试"""
     print("🚀 开始运行单元测试")
@@ -461,5 +497,18 @@ def run_unit_tests():
     return result.wasSuccessful()
 
 if __name__ == "__main__":
-    success = run_unit_tests()
+    import argparse
+    
+    parser = argparse.ArgumentParser(description="视频处理API单元测试")
+    parser.add_argument(
+        "--parallel",
+        action="store_true",
+        help="使用 pytest-xdist 并行运行（需要安装 pytest-xdist）"
+    )
+    args = parser.parse_args()
+    
+    if args.parallel:
+        success = run_unit_tests_parallel()
+    else:
+        success = run_unit_tests()
     exit(0 if success else 1)
\ No newline at end of file